@@ -0,0 +1,254 @@
+#!/usr/bin/env python3
+
+"""
+Benchmark du canal de commandes vers l'Arduino (lib/arduino_commands.py)
+- Arduino simulé sur un pseudo-terminal (pty) : liaison série à 9600 bauds, tampons
+  de réception et d'émission de 64 octets, Serial.println bloquant quand le tampon
+  d'émission est plein, logique de vitesse et de balancier du croquis main.ino
+- Rafales de commandes de vitesse (et de mode balancier) envoyées par ArduinoSerialReader
+- Compare l'envoi synchrone (une écriture série par commande, ancien send_command) à la
+  file fusionnée avec accusés : durée de l'appel depuis le thread OSC, octets perdus
+  par débordement, état final de l'Arduino, délai d'application et latence aller-retour
+"""
+
+import argparse
+import collections
+import os
+import pty
+import random
+import re
+import select
+import sys
+import threading
+import time
+import tty
+from pathlib import Path
+
+# Ajout des dossiers parents au path pour permettre l'importation de lib et scripts
+parent_dir = Path(__file__).resolve().parent.parent
+sys.path.append(str(parent_dir))
+sys.path.append(str(parent_dir / "scripts"))
+from lib.arduino_commands import format_command_stats
+from arduino_serial import ArduinoSerialReader
+
+SERIAL_BUFFER = 64      # Tampons série de l'Arduino Uno (octets)
+ACCELERATION = 50       # stepper.setAcceleration(50) (pas/s²)
+SETTLE_TIMEOUT = 10.0   # Attente maximale de l'état final (s)
+
+# Configuration réseau du lecteur : télémétrie vers un port local inutilisé, pas de serveur de commandes
+BENCH_CONFIG = {'osc': {'router': {'ip': '127.0.0.1', 'port': 19905}}}
+
+
+class FakeArduino:
+    """Arduino simulé derrière un pty, au rythme de la liaison série"""
+
+    def __init__(self, baudrate=9600):
+        self.master, self.slave = pty.openpty()
+        tty.setraw(self.slave)
+        self.path = os.ttyname(self.slave)
+        self.byte_time = 10 / baudrate  # 8 bits de données + start + stop
+        self.lock = threading.Lock()
+        self.current = 100              # currentCmd au démarrage du croquis
+        self.pending = None             # (nouvelle vitesse, instant d'application) pendant une décélération
+        self.balancier = False
+        self.lines = 0
+        self.invalid = 0
+        self.overflow = 0
+        self.__incoming = collections.deque()  # (instant d'arrivée, octet) sur le fil
+        self.__outgoing = collections.deque()  # (instant de fin d'émission, ligne)
+        self.__rx = bytearray()
+        self.__wire_in = 0.0
+        self.__wire_out = 0.0
+        self.__busy_until = 0.0
+        self.__running = True
+        self.__thread = threading.Thread(target=self.__run, daemon=True)
+
+    def start(self):
+        now = time.monotonic()
+        self.println("Commande moteur active :", now)
+        self.println("- Tapez 'v' suivi d'un nombre (ex: v100, v-100, v0 pour arrêt)", now)
+        self.println("- Tapez 'b' pour activer le mode balancier du servo.", now)
+        self.__thread.start()
+
+    def stop(self):
+        self.__running = False
+        self.__thread.join()
+        os.close(self.master)
+        os.close(self.slave)
+
+    def state(self):
+        with self.lock:
+            return self.current, self.pending, self.balancier
+
+    def println(self, text, now):
+        """Serial.println : bloque le croquis tant que le tampon d'émission est plein"""
+        data = (text + "\r\n").encode()
+        self.__wire_out = max(self.__wire_out, now) + len(data) * self.byte_time
+        self.__outgoing.append((self.__wire_out, data))
+        self.__busy_until = max(self.__busy_until, self.__wire_out - SERIAL_BUFFER * self.byte_time)
+
+    def handle(self, line, now):
+        """Branche de loop() traitant une commande (main.ino)"""
+        self.lines += 1
+        if line.startswith("v"):
+            match = re.match(r"\s*-?\d+", line[1:])
+            incoming = int(match.group()) if match else 0  # String.toInt()
+            self.balancier = False
+            if incoming == 0 and self.current != 0:
+                self.pending = (0, now + abs(self.current) / ACCELERATION)
+                self.println("Arrêt progressif demandé...", now)
+            elif incoming != 0 and incoming * self.current < 0:
+                self.pending = (incoming, now + abs(self.current) / ACCELERATION)
+                self.println("Changement de direction demandé, décélération...", now)
+            else:
+                self.current = incoming
+                self.pending = None
+                self.println(f"Vitesse réglée à : {self.current}", now)
+        elif line == "b":
+            self.balancier = True
+            self.println("Mode balancier du servo activé.", now)
+        else:
+            self.invalid += 1
+
+    def __run(self):
+        while self.__running:
+            ready, _, _ = select.select([self.master], [], [], 0.0005)
+            now = time.monotonic()
+            if ready:
+                # Octets écrits par le Raspberry : arrivée au rythme du fil
+                for byte in os.read(self.master, 4096):
+                    self.__wire_in = max(self.__wire_in, now) + self.byte_time
+                    self.__incoming.append((self.__wire_in, byte))
+            with self.lock:
+                while self.__incoming and self.__incoming[0][0] <= now:
+                    byte = self.__incoming.popleft()[1]
+                    if len(self.__rx) < SERIAL_BUFFER:
+                        self.__rx.append(byte)
+                    else:
+                        self.overflow += 1
+                while self.__outgoing and self.__outgoing[0][0] <= now:
+                    os.write(self.master, self.__outgoing.popleft()[1])
+                if now < self.__busy_until:
+                    continue
+                if self.pending is not None and now >= self.pending[1]:
+                    self.current, self.pending = self.pending[0], None
+                    if self.current == 0:
+                        self.println("Moteur arrêté.", now)
+                    else:
+                        self.println(f"Nouvelle direction appliquée, vitesse réglée à : {self.current}", now)
+                end = self.__rx.find(b"\n")
+                if end >= 0:
+                    line = self.__rx[:end].decode('utf-8', errors='replace').strip()
+                    del self.__rx[:end + 1]
+                    self.handle(line, now)
+
+
+def burst(count, balancier_every, signed, seed):
+    """Rafale de commandes : ('v', vitesse) ou ('b', None)"""
+    rng = random.Random(seed)
+    commands = []
+    for i in range(count):
+        if balancier_every and i % balancier_every == balancier_every - 1:
+            commands.append(('b', None))
+        else:
+            speed = rng.randint(20, 200)
+            commands.append(('v', -speed if signed and rng.random() < 0.5 else speed))
+    return commands
+
+
+def expected_state(commands):
+    """État final attendu : dernière vitesse et mode balancier"""
+    speed, balancier = 100, False
+    for kind, value in commands:
+        if kind == 'v':
+            speed, balancier = value, False
+        else:
+            balancier = True
+    return speed, balancier
+
+
+def run(mode, commands, rate, baudrate):
+    fake = FakeArduino(baudrate)
+    fake.start()
+    reader = ArduinoSerialReader(fake.path, baudrate, config=BENCH_CONFIG)
+    reader.setup()
+    reader.connect()
+    running = [True]
+
+    def read_loop():
+        while running[0]:
+            reader.read()
+
+    read_thread = threading.Thread(target=read_loop, daemon=True)
+    read_thread.start()
+    if mode == "file":
+        reader.commands.start()
+
+    calls = []
+    for kind, value in commands:
+        start = time.perf_counter()
+        if mode == "file":
+            reader.set_motor_speed(value) if kind == 'v' else reader.toggle_balancier()
+        else:
+            reader.send_command(f"v{value}" if kind == 'v' else "b")
+        calls.append(time.perf_counter() - start)
+        time.sleep(1 / rate)
+    last_call = time.monotonic()
+
+    # Délai jusqu'à l'état final attendu (ou jamais, si des commandes ont été perdues)
+    speed, balancier = expected_state(commands)
+    settle = None
+    while time.monotonic() - last_call < SETTLE_TIMEOUT:
+        current, pending, mode_balancier = fake.state()
+        if current == speed and pending is None and mode_balancier == balancier:
+            settle = time.monotonic() - last_call
+            break
+        time.sleep(0.001)
+
+    stats = reader.commands.stats() if mode == "file" else None
+    running[0] = False
+    reader.commands.stop()
+    read_thread.join()
+    reader.close()
+    fake.stop()
+    calls.sort()
+    return {
+        'call_p99_us': calls[min(len(calls) - 1, int(0.99 * len(calls)))] * 1e6,
+        'lines': fake.lines,
+        'invalid': fake.invalid,
+        'overflow': fake.overflow,
+        'settle': settle,
+        'stats': stats,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark du canal de commandes vers l'Arduino")
+    parser.add_argument("--count", type=int, default=100, help="Commandes par rafale")
+    parser.add_argument("--rate", type=float, default=200, help="Cadence des commandes dans la rafale (Hz)")
+    parser.add_argument("--baudrate", type=int, default=9600, help="Vitesse de la liaison série simulée")
+    parser.add_argument("--seed", type=int, default=1, help="Graine des vitesses aléatoires")
+    args = parser.parse_args()
+
+    scenarios = [
+        ("vitesse", burst(args.count, 0, False, args.seed)),
+        ("vitesse + balancier", burst(args.count, 10, False, args.seed)),
+        ("changements de sens", burst(args.count, 0, True, args.seed)),
+    ]
+    print(f"Rafales de {args.count} commandes à {args.rate:.0f} Hz, liaison série simulée à {args.baudrate} bauds")
+    print(f"{'scénario':>20} {'envoi':>9} {'appel p99':>10} {'lignes':>7} {'invalides':>9} "
+          f"{'octets perdus':>13} {'état final':>11}")
+    for name, commands in scenarios:
+        for mode in ("synchrone", "file"):
+            result = run(mode, commands, args.rate, args.baudrate)
+            settle = "jamais" if result['settle'] is None else f"{result['settle'] * 1000:.0f} ms"
+            print(f"{name:>20} {mode:>9} {result['call_p99_us']:>7.0f} µs {result['lines']:>7} "
+                  f"{result['invalid']:>9} {result['overflow']:>13} {settle:>11}")
+            if result['stats'] is not None:
+                print(f"{'':>20} {'':>9} {format_command_stats(result['stats'])}")
+    print("lignes : commandes lues par l'Arduino ; état final : délai entre la dernière commande et "
+          "l'état attendu (vitesse et mode balancier)")
+
+
+if __name__ == "__main__":
+    main()
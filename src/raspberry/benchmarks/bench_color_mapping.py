@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+
+"""
+Benchmark des tables de correspondance couleur → musique de music_engine.py
+- Temps de construction et empreinte mémoire des tables par préréglage
+- Coût de la correspondance par événement (lecture indexée vs calcul direct, meilleure de
+  plusieurs passes) et vérification que les deux donnent les mêmes paramètres
+- Pire durée d'un pas du moteur pendant des changements de préréglage à chaud
+"""
+
+import argparse
+import contextlib
+import io
+import random
+import sys
+import threading
+import time
+from pathlib import Path
+
+# Ajout des dossiers parents au path pour permettre l'importation de lib et scripts
+parent_dir = Path(__file__).resolve().parent.parent
+sys.path.append(str(parent_dir))
+sys.path.append(str(parent_dir / "scripts"))
+from music_engine import ColorMapping, GenerativeEngine, MappingBank, MAPPING_PRESETS
+
+
+def direct_mapping(preset, h, s, v):
+    """Calcul direct (sans table) des mêmes paramètres, pour comparaison"""
+    scale = preset['scale']
+    steps = len(scale) * preset['octaves']
+    total = min(int(h / 180 * steps), steps - 1)
+    octave = preset['base_octave'] + total // len(scale) + (v >= preset['bright_v'])
+    vmin, vmax = preset['velocity']
+    velocity = int(vmin + (vmax - vmin) * (v / 255.0) ** preset['velocity_gamma'])
+    dmin, dmax = preset['density']
+    density = int(255.0 * (dmin + (dmax - dmin) * s / 255.0))
+    timbre = int(s * v / 255.0)
+    return total % len(scale), octave, velocity, density, timbre
+
+
+def best_time(function, stream, repeat):
+    """Meilleur temps par appel (ns) sur `repeat` passes : écarte les interruptions du système"""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for h, s, v in stream:
+            function(h, s, v)
+        best = min(best, time.perf_counter() - start)
+    return best / len(stream) * 1e9
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark des tables couleur → musique")
+    parser.add_argument("--lookups", type=int, default=200000, help="Nombre de correspondances mesurées")
+    parser.add_argument("--repeat", type=int, default=5, help="Passes par mesure (la meilleure est retenue)")
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    colors = [(rng.randrange(180), rng.randrange(256), rng.randrange(256)) for _ in range(4096)]
+    stream = [colors[i % len(colors)] for i in range(args.lookups)]
+
+    print(f"{'préréglage':>13} {'construction':>12} {'mémoire':>9} {'table':>9} {'direct':>9} {'écarts':>7}")
+    for name, preset in MAPPING_PRESETS.items():
+        start = time.perf_counter()
+        mapping = ColorMapping(name, preset)
+        build_ms = (time.perf_counter() - start) * 1000
+
+        t_table = best_time(mapping.lookup, stream, args.repeat)
+        t_direct = best_time(lambda h, s, v: direct_mapping(preset, h, s, v), stream, args.repeat)
+        mismatches = sum(mapping.lookup(h, s, v) != direct_mapping(preset, h, s, v) for h, s, v in colors)
+
+        print(f"{name:>13} {build_ms:>9.2f} ms {mapping.nbytes / 1e3:>6.1f} ko "
+              f"{t_table:>6.0f} ns {t_direct:>6.0f} ns {mismatches:>7}")
+
+    # Changements de préréglage à chaud pendant que le moteur génère des pas
+    bank = MappingBank()
+    bank.preload().join()
+    engine = GenerativeEngine(mappings=bank, seed=0)
+    stop = threading.Event()
+
+    def swapper():
+        names = list(MAPPING_PRESETS)
+        i = 0
+        while not stop.is_set():
+            bank.select(names[i % len(names)])
+            i += 1
+            time.sleep(0.001)
+
+    # Les messages de changement de préréglage sont masqués pendant la mesure
+    with contextlib.redirect_stdout(io.StringIO()):
+        thread = threading.Thread(target=swapper)
+        thread.start()
+        worst = 0.0
+        total = 0.0
+        for step in range(args.lookups // 10):
+            engine.color.update(zip("hsv", colors[step % len(colors)]))
+            start = time.perf_counter()
+            engine.events_for_step(step)
+            elapsed = time.perf_counter() - start
+            worst = max(worst, elapsed)
+            total += elapsed
+        stop.set()
+        thread.join()
+    steps = args.lookups // 10
+    print(f"Pas du moteur pendant les changements à chaud: moyen {total / steps * 1e6:.1f} µs, "
+          f"pire {worst * 1e6:.1f} µs ; mémoire totale des {len(MAPPING_PRESETS)} préréglages: "
+          f"{bank.nbytes / 1e3:.1f} ko")
+
+
+if __name__ == "__main__":
+    main()
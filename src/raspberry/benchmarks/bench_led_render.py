@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+
+"""
+Benchmark de la qualité du rendu LED (lib/ledrender.py) sur des fondus lents
+- Compare l'ancien lissage de LEDStrip.setcolourrgb (moyenne + EMA tronquée par int(),
+  appliqué à l'arrivée des couleurs, sans gamma) au moteur de rendu à cadence fixe
+  (transition interpolée, courbe gamma, tramage temporel)
+- Fondus sombres et complets, couleurs reçues à 6.7 Hz (cadence active de vision.py)
+  et à 1 Hz (mode veille)
+- Luminance perçue : moyenne sur 50 ms (intégration de l'œil) convertie en clarté CIE L*
+"""
+
+import argparse
+import collections
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+# Ajout du dossier parent au path pour permettre l'importation de lib
+parent_dir = Path(__file__).resolve().parent.parent
+sys.path.append(str(parent_dir))
+from lib.ledrender import DEFAULT_GAMMA, DEFAULT_TRANSITION_MS, ColorTransition, DitheredOutput, luminance_curve
+
+OUTPUT_FPS = 120
+EYE_WINDOW = 0.05  # Intégration temporelle de l'œil (s)
+
+# Scénarios : (nom, valeur de départ, valeur d'arrivée, durée du fondu (s), maintien (s))
+SCENARIOS = [
+    ("sombre", 0, 24, 6.0, 3.0),
+    ("complet", 0, 255, 4.0, 3.0),
+]
+
+
+def legacy_levels(inputs, frames, smoothing_factor=0.15, buffer_size=5):
+    """Niveaux PWM de l'ancien LEDStrip : mis à jour à l'arrivée de chaque couleur"""
+    buffer = collections.deque([0] * buffer_size, maxlen=buffer_size)
+    last = 0
+    levels = np.zeros(len(frames))
+    arrivals = iter(inputs)
+    next_input = next(arrivals, None)
+    for i, t in enumerate(frames):
+        while next_input is not None and next_input[0] <= t:
+            buffer.append(max(0, min(255, int(next_input[1]))))
+            avg = sum(buffer) / len(buffer)
+            last = int(last + smoothing_factor * (avg - last))
+            next_input = next(arrivals, None)
+        levels[i] = last
+    return levels
+
+
+def rendered_levels(inputs, frames, transition_ms, dither):
+    """Niveaux PWM du moteur de rendu : transition interpolée à chaque frame, gamma, tramage"""
+    transition = ColorTransition(3, transition_ms, clock=lambda: 0.0)
+    output = DitheredOutput((1, 3), dither=dither)
+    frame = np.zeros((1, 3), dtype=np.float32)
+    levels = np.zeros(len(frames))
+    arrivals = iter(inputs)
+    next_input = next(arrivals, None)
+    cpu = time.process_time()
+    for i, t in enumerate(frames):
+        while next_input is not None and next_input[0] <= t:
+            transition.set_target(next_input[1], next_input[0])
+            next_input = next(arrivals, None)
+        frame[0] = transition.update(t)
+        levels[i] = output.process(frame)[0, 0]
+    cpu = (time.process_time() - cpu) / len(frames)
+    return levels, cpu
+
+
+def lightness(luminance):
+    """Clarté CIE L* d'une luminance relative"""
+    return np.where(luminance > 0.008856, 116 * np.cbrt(luminance) - 16, 903.3 * luminance)
+
+
+def perceived(levels, fps):
+    """Clarté perçue par fenêtre de 50 ms"""
+    window = max(1, int(EYE_WINDOW * fps))
+    count = len(levels) // window
+    return lightness(levels[:count * window].reshape(count, window).mean(axis=1) / 255.0)
+
+
+def summarize(levels, fps, ideal_lightness):
+    """Marche maximale (ΔL*) et erreur finale (ΔL*)"""
+    seen = perceived(levels, fps)
+    final = seen[-int(0.5 / EYE_WINDOW):].mean()
+    return np.abs(np.diff(seen)).max(), abs(final - ideal_lightness)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de la qualité du rendu LED")
+    parser.add_argument("--transition-ms", type=float, default=DEFAULT_TRANSITION_MS,
+                        help="Durée de transition du moteur de rendu (ms)")
+    parser.add_argument("--fps", type=int, default=OUTPUT_FPS, help="Cadence de sortie du moteur de rendu")
+    parser.add_argument("--input-rates", type=float, nargs="+", default=[1 / 0.15, 1.0],
+                        help="Cadences d'arrivée des couleurs (Hz)")
+    args = parser.parse_args()
+
+    print(f"Sortie à {args.fps} FPS, transition {args.transition_ms:.0f} ms, gamma {DEFAULT_GAMMA}")
+    print(f"{'fondu':>8} {'entrée':>7} {'rendu':>16} {'marche max':>10} {'erreur fin.':>11}")
+    cpu_costs = []
+    for name, start, end, duration, hold in SCENARIOS:
+        frames = np.arange(0, duration + hold, 1 / args.fps)
+        for rate in args.input_rates:
+            times = np.arange(0, duration + hold, 1 / rate)
+            values = start + (end - start) * np.clip(times / duration, 0, 1)
+            inputs = list(zip(times, values))
+
+            # Référence de chaque rendu : la valeur finale affichée selon sa propre courbe
+            legacy = legacy_levels(inputs, frames)
+            results = [("ancien", legacy, lightness(np.array(end / 255.0)))]
+            ideal = lightness(luminance_curve('gamma', DEFAULT_GAMMA, 256)[end])
+            for dither in (False, True):
+                levels, cpu = rendered_levels(inputs, frames, args.transition_ms, dither)
+                cpu_costs.append(cpu)
+                results.append(("gamma + tramage" if dither else "gamma", levels, ideal))
+
+            for label, levels, reference in results:
+                step, error = summarize(levels, args.fps, reference)
+                print(f"{name:>8} {rate:>5.1f}Hz {label:>16} {step:>7.2f} L* {error:>8.2f} L*")
+    print("marche max : plus grand saut de clarté perçue entre deux fenêtres de 50 ms ;")
+    print("erreur fin. : écart à la couleur cible une fois le fondu terminé")
+    print(f"Coût du moteur de rendu (transition + sortie, 1 pixel): {np.mean(cpu_costs) * 1e6:.1f} µs par frame")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+
+"""
+Benchmark de la sortie pixel par pixel de l'anneau LED (lib/ledring.py)
+- Temps de rendu (animation par secteurs), d'étage de sortie (courbe perceptuelle et
+  tramage) et d'écriture (encodage SPI WS2812, empaquetage PWM) d'une frame selon le
+  nombre de pixels
+- Temps de transmission sur le fil (800 kHz) et cadence maximale correspondante
+- Moteur d'animation à la cadence par défaut sur backend simulé : budget CPU, gigue et frames abandonnées
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+# Ajout du dossier parent au path pour permettre l'importation de lib
+parent_dir = Path(__file__).resolve().parent.parent
+sys.path.append(str(parent_dir))
+from lib.ledrender import DitheredOutput
+from lib.ledring import (DEFAULT_FPS, FRAME_BUDGET, SPI_RESET_BYTES, SPI_SPEED, WS2812_FREQ, AnimationEngine,
+                         LEDRing, MockBackend, SectorAnimation, WS2812Encoder, format_ring_stats)
+
+
+def timed(func, repeat):
+    """Temps moyen d'un appel (µs)"""
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return (time.perf_counter() - start) / repeat * 1e6
+
+
+def pack_rgb(frame, packed, channel):
+    """Empaquetage 0x00RRGGBB du backend PWM (sans la boucle d'envoi rpi_ws281x)"""
+    np.left_shift(frame[:, 0], 16, out=packed, dtype=np.uint32)
+    np.left_shift(frame[:, 1], 8, out=channel, dtype=np.uint32)
+    packed |= channel
+    packed |= frame[:, 2]
+    return packed.tolist()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de l'anneau LED pixel par pixel")
+    parser.add_argument("--pixels", type=int, nargs="+", default=[12, 24, 60, 144, 300, 600],
+                        help="Nombres de pixels testés")
+    parser.add_argument("--repeat", type=int, default=2000, help="Frames mesurées par taille")
+    parser.add_argument("--duration", type=float, default=3.0, help="Durée du test du moteur (s)")
+    parser.add_argument("--engine-pixels", type=int, default=60, help="Pixels pour le test du moteur")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    print(f"Budget CPU par frame: {FRAME_BUDGET * 1e6:.0f} µs ({FRAME_BUDGET * DEFAULT_FPS:.0%} d'une frame à {DEFAULT_FPS} FPS)")
+    print(f"{'pixels':>7} {'rendu':>9} {'sortie':>9} {'enc. SPI':>9} {'pack PWM':>9} {'total':>9} "
+          f"{'fil SPI':>9} {'FPS max':>8}")
+    for pixels in args.pixels:
+        animation = SectorAnimation(pixels)
+        animation.sectors[:] = rng.integers(0, 256, animation.sectors.shape)
+        frame = np.zeros((pixels, 3), dtype=np.float32)
+        output = DitheredOutput(frame.shape)
+        levels = output.process(frame)
+        t = [0.0]
+
+        def render():
+            t[0] += 1 / DEFAULT_FPS
+            animation.render(frame, t[0])
+
+        encoder = WS2812Encoder(pixels)
+        packed = np.empty(pixels, dtype=np.uint32)
+        channel = np.empty(pixels, dtype=np.uint32)
+
+        t_render = timed(render, args.repeat)
+        t_output = timed(lambda: output.process(frame), args.repeat)
+        t_spi = timed(lambda: encoder.encode(levels), args.repeat)
+        t_pwm = timed(lambda: pack_rgb(levels, packed, channel), args.repeat)
+        # Transmission : 24 bits par pixel à 800 kHz + reset (même durée en PWM et en SPI)
+        wire = (pixels * 24 / WS2812_FREQ + SPI_RESET_BYTES * 8 / SPI_SPEED) * 1e6
+        print(f"{pixels:>7} {t_render:>6.1f} µs {t_output:>6.1f} µs {t_spi:>6.1f} µs {t_pwm:>6.1f} µs "
+              f"{t_render + t_output + t_spi:>6.1f} µs {wire:>6.0f} µs {1e6 / wire:>8.0f}")
+
+    # Moteur d'animation en temps réel, backend simulé
+    pixels = args.engine_pixels
+    animation = SectorAnimation(pixels)
+    animation.sectors[:] = rng.integers(0, 256, animation.sectors.shape)
+    ring = LEDRing(pixels, MockBackend(pixels), DitheredOutput((pixels, 3)))
+    engine = AnimationEngine(ring, animation, DEFAULT_FPS)
+    cpu_start = time.process_time()
+    engine.start()
+    time.sleep(args.duration)
+    engine.stop()
+    cpu = time.process_time() - cpu_start
+    stats = engine.stats()
+    print(f"Moteur {pixels} pixels à {DEFAULT_FPS} FPS pendant {args.duration:.0f} s: {format_ring_stats(stats)}")
+    print(f"CPU du processus: {cpu / args.duration:.1%} ({cpu / max(1, stats['frames']) * 1e6:.0f} µs par frame, "
+          f"attente comprise)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+
+"""
+Essai de charge multi-disques : vision.py (caméras simulées), osc_router.py et logic.py
+lancés comme en production, avec 1 à N disques déclarés dans une configuration temporaire
+- Chaque disque : un thread de capture fixé sur son cœur, adresses /vision/<disque>/...
+- Un récepteur à la place du module dev compte, par disque, les couleurs de vision et les
+  valeurs lissées de logic reçues via le routeur
+- Cadence par disque comparée à la cadence active de vision (1 / 0.15 s), délai
+  vision → logic → dev (p50/p99) et CPU de chaque processus
+"""
+
+import argparse
+import collections
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+# Ajout des dossiers parents au path pour permettre l'importation de lib et scripts
+parent_dir = Path(__file__).resolve().parent.parent
+sys.path.append(str(parent_dir))
+sys.path.append(str(parent_dir / "scripts"))
+from pythonosc import osc_server
+from lib.osc_patterns import PatternDispatcher
+from vision import ACTIVE_PERIOD
+
+SCRIPTS = parent_dir / "scripts"
+BASE_PORT = 15000
+TARGET_RATIO = 0.95     # Cadence tenue : au moins 95 % de la cadence active par disque
+CLOCK_TICKS = os.sysconf("SC_CLK_TCK")
+
+
+def bench_config(discs, cores):
+    """Configuration réseau temporaire : ports dédiés, dev remplacé par le récepteur"""
+    modules = ("puredata", "logic", "led", "music_engine", "vision", "router", "dev")
+    osc = {name: {"ip": "127.0.0.1", "port": BASE_PORT + i} for i, name in enumerate(modules)}
+    return {
+        "osc": osc,
+        "discs": {f"d{i + 1}": {"camera": i, "cpu": i % cores} for i in range(discs)},
+    }
+
+
+class Sink:
+    """Récepteur des messages routés vers dev : cadences et délais par disque"""
+
+    def __init__(self, port):
+        self.lock = threading.Lock()
+        dispatcher = PatternDispatcher()
+        dispatcher.map("/vision/*/color/raw/hsv/v", self.handle_vision)
+        dispatcher.map("/logic/*/color/ema/v", self.handle_logic)
+        self.server = osc_server.ThreadingOSCUDPServer(("127.0.0.1", port), dispatcher)
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.colors = collections.Counter()
+            self.smoothed = collections.Counter()
+            self.last_color = {}
+            self.delays = []
+
+    def handle_vision(self, address, value):
+        disc = address.split('/')[2]
+        with self.lock:
+            self.colors[disc] += 1
+            self.last_color[disc] = time.perf_counter()
+
+    def handle_logic(self, address, value):
+        disc = address.split('/')[2]
+        now = time.perf_counter()
+        with self.lock:
+            self.smoothed[disc] += 1
+            if disc in self.last_color:
+                self.delays.append(now - self.last_color.pop(disc))
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def cpu_seconds(pid):
+    """Temps CPU (utilisateur + système) d'un processus, threads compris"""
+    with open(f"/proc/{pid}/stat") as f:
+        fields = f.read().rsplit(")", 1)[1].split()
+    return (int(fields[11]) + int(fields[12])) / CLOCK_TICKS
+
+
+def run(discs, duration, warmup, cores, analysis):
+    with tempfile.NamedTemporaryFile("w", suffix=".json", delete=False) as f:
+        json.dump(bench_config(discs, cores), f)
+        config_path = f.name
+    sink = Sink(BASE_PORT + 6)
+    common = ["--network-config", config_path]
+    commands = {
+        "routeur": [sys.executable, str(SCRIPTS / "osc_router.py"), *common],
+        "logic": [sys.executable, str(SCRIPTS / "logic.py"), *common],
+        "vision": [sys.executable, str(SCRIPTS / "vision.py"), "--config", "--synthetic", "--no-idle",
+                   "--analysis", analysis, *common],
+    }
+    processes = {}
+    try:
+        for name, command in commands.items():
+            processes[name] = subprocess.Popen(command, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+            time.sleep(0.5)  # Routeur et logic à l'écoute avant les premières couleurs
+        time.sleep(warmup)
+        for name, process in processes.items():
+            if process.poll() is not None:
+                raise RuntimeError(f"{name} s'est arrêté au démarrage (code {process.returncode})")
+
+        sink.reset()
+        cpu_start = {name: cpu_seconds(p.pid) for name, p in processes.items()}
+        start = time.perf_counter()
+        time.sleep(duration)
+        elapsed = time.perf_counter() - start
+        cpu = {name: (cpu_seconds(p.pid) - cpu_start[name]) / elapsed for name, p in processes.items()}
+        with sink.lock:
+            names = [f"d{i + 1}" for i in range(discs)]
+            colors = [sink.colors[name] / elapsed for name in names]
+            smoothed = [sink.smoothed[name] / elapsed for name in names]
+            delays = sorted(sink.delays)
+    finally:
+        for process in processes.values():
+            process.terminate()
+        for process in processes.values():
+            process.wait()
+        sink.close()
+        os.unlink(config_path)
+
+    def pct(q):
+        return delays[min(len(delays) - 1, int(q * len(delays)))] * 1e3 if delays else float("nan")
+
+    return {
+        'colors_min': min(colors),
+        'colors_mean': sum(colors) / len(colors),
+        'smoothed_min': min(smoothed),
+        'delay_p50': pct(0.5),
+        'delay_p99': pct(0.99),
+        'cpu': cpu,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Essai de charge multi-disques (caméras simulées)")
+    parser.add_argument("--discs", default="1,2,3,4", help="Nombres de disques testés, séparés par des virgules")
+    parser.add_argument("--duration", type=float, default=10.0, help="Durée de mesure par essai (s)")
+    parser.add_argument("--warmup", type=float, default=2.0, help="Durée de chauffe avant la mesure (s)")
+    parser.add_argument("--analysis", choices=("lores", "rgb"), default="lores",
+                        help="Mode d'analyse de vision.py (lores : flux du Raspberry Pi)")
+    args = parser.parse_args()
+
+    cores = os.cpu_count()
+    target = 1 / ACTIVE_PERIOD
+    print(f"Cadence active visée: {target:.2f} couleurs/s par disque, {cores} cœur(s), analyse {args.analysis}")
+    print(f"{'disques':>7} {'couleurs/s min':>14} {'moy.':>6} {'logic/s min':>11} {'délai p50':>10} "
+          f"{'p99':>8} {'CPU vision':>10} {'routeur':>8} {'logic':>6} {'cadence':>8}")
+    for discs in (int(v) for v in args.discs.split(",")):
+        result = run(discs, args.duration, args.warmup, cores, args.analysis)
+        cpu = result['cpu']
+        held = "tenue" if result['colors_min'] >= TARGET_RATIO * target else "NON"
+        print(f"{discs:>7} {result['colors_min']:>14.2f} {result['colors_mean']:>6.2f} "
+              f"{result['smoothed_min']:>11.2f} {result['delay_p50']:>7.2f} ms {result['delay_p99']:>5.2f} ms "
+              f"{cpu['vision']:>10.1%} {cpu['routeur']:>8.1%} {cpu['logic']:>6.1%} {held:>8}")
+    print("délai : arrivée sur dev de la valeur lissée par logic après la couleur brute du même disque")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+
+"""
+Benchmark de la diffusion du routeur : unicast vs multicast
+- N abonnés distants simulés (processus séparés) sur la boucle locale
+- Mesure le temps CPU du routeur par message pour 2, 4 et 8 abonnés
+- Vérifie la réception et le compteur de pertes (/router/seq) côté abonnés
+
+Fonctionne sur une seule machine Linux : le groupe multicast est envoyé et
+rejoint sur l'interface 127.0.0.1 (IP_MULTICAST_LOOP actif).
+"""
+
+import argparse
+import multiprocessing
+import socket
+import sys
+import time
+from pathlib import Path
+
+# Ajout des dossiers parents au path pour permettre l'importation de lib et scripts
+parent_dir = Path(__file__).resolve().parent.parent
+sys.path.append(str(parent_dir))
+sys.path.append(str(parent_dir / "scripts"))
+from lib.osc_multicast import MulticastOSCUDPServer, SequenceTracker, SEQ_ADDRESS
+from lib.osc_patterns import PatternDispatcher, RouteTable
+from osc_router import OSCRouter
+
+GROUP = "239.255.42.99"
+GROUP_PORT = 9190
+BASE_PORT = 9200
+ADDRESSES = [f"/vision/color/raw/{space}/{c}" for space, comps in (("rgb", "rgb"), ("hsv", "hsv")) for c in comps]
+
+
+def unicast_subscriber(port, ready, results, duration):
+    """Abonné unicast : compte les datagrammes reçus"""
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sock.bind(("127.0.0.1", port))
+    sock.settimeout(0.5)
+    ready.set()
+    count = 0
+    deadline = time.monotonic() + duration
+    while time.monotonic() < deadline:
+        try:
+            sock.recv(2048)
+            count += 1
+        except socket.timeout:
+            pass
+    results.put({'received': count, 'lost': 0})
+
+
+def multicast_subscriber(port, ready, results, duration):
+    """Abonné multicast : rejoint le groupe et suit les numéros de séquence"""
+    tracker = SequenceTracker(verbose=False)
+    dispatcher = PatternDispatcher()
+    dispatcher.map(SEQ_ADDRESS, tracker.handle_seq)
+    dispatcher.set_default_handler(lambda *args: None)
+    server = MulticastOSCUDPServer(GROUP, GROUP_PORT, dispatcher, interface="127.0.0.1")
+    server.socket.settimeout(0.5)
+    ready.set()
+    deadline = time.monotonic() + duration
+    while time.monotonic() < deadline:
+        # Lecture directe du socket : pas de thread créé par datagramme
+        try:
+            data, client = server.socket.recvfrom(2048)
+        except socket.timeout:
+            continue
+        dispatcher.call_handlers_for_packet(data, client)
+    server.server_close()
+    results.put(tracker.stats())
+
+
+def build_config(subscribers, multicast):
+    names = [f"node{i}" for i in range(subscribers)]
+    config = {
+        'osc': {name: {'ip': "127.0.0.1", 'port': BASE_PORT + i} for i, name in enumerate(names)},
+        'multicast': {
+            'bench': {
+                'enabled': multicast,
+                'group': GROUP,
+                'port': GROUP_PORT,
+                'ttl': 0,
+                'interface': "127.0.0.1",
+                'members': names,
+            }
+        },
+    }
+    config['osc']['router'] = {'ip': "127.0.0.1", 'port': 0}
+    return config, names
+
+
+def run(subscribers, multicast, messages, rate):
+    config, names = build_config(subscribers, multicast)
+    duration = messages / rate + 2.0
+    ready = [multiprocessing.Event() for _ in names]
+    results = multiprocessing.Queue()
+    target = multicast_subscriber if multicast else unicast_subscriber
+    procs = [
+        multiprocessing.Process(target=target, args=(BASE_PORT + i, ready[i], results, duration))
+        for i in range(subscribers)
+    ]
+    for proc in procs:
+        proc.start()
+    for event in ready:
+        event.wait(5)
+
+    router = OSCRouter(config=config)
+    router.routes = RouteTable({"/vision/": names})
+
+    cpu = 0.0
+    interval = 1.0 / rate
+    next_send = time.monotonic()
+    for i in range(messages):
+        start = time.process_time()
+        router.handle_message(ADDRESSES[i % len(ADDRESSES)], i % 256)
+        cpu += time.process_time() - start
+        next_send += interval
+        delay = next_send - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+
+    stats = [results.get() for _ in procs]
+    for proc in procs:
+        proc.join()
+    router.server.server_close()
+    return cpu / messages * 1e6, stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark unicast vs multicast du routeur OSC")
+    parser.add_argument("--subscribers", type=int, nargs="+", default=[2, 4, 8], help="Nombres d'abonnés distants")
+    parser.add_argument("--messages", type=int, default=3000, help="Messages envoyés par mesure")
+    parser.add_argument("--rate", type=float, default=1000.0, help="Débit d'envoi (messages/s)")
+    args = parser.parse_args()
+
+    print(f"{'abonnés':>8} {'mode':>10} {'CPU µs/msg':>11} {'reçus':>8} {'perdus':>7}")
+    for subscribers in args.subscribers:
+        for multicast in (False, True):
+            cpu, stats = run(subscribers, multicast, args.messages, args.rate)
+            received = sum(s['received'] for s in stats)
+            lost = sum(s['lost'] for s in stats)
+            mode = "multicast" if multicast else "unicast"
+            print(f"{subscribers:>8} {mode:>10} {cpu:>11.1f} {received:>8} {lost:>7}")
+
+
+if __name__ == "__main__":
+    main()
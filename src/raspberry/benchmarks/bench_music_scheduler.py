@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+
+"""
+Test headless du planificateur anticipé de music_engine.py
+- Le moteur génère 200+ événements/s vers un récepteur local (sans Pure Data)
+- Le récepteur (processus séparé) joue chaque bundle à son timetag, comme Pure Data
+- Affiche la gigue de rendu, la marge d'arrivée et les statistiques de planification
+- Option --gc-stress : charge le GC et les threads de l'émetteur pour montrer le découplage
+"""
+
+import argparse
+import gc
+import multiprocessing
+import socket
+import sys
+import threading
+import time
+from pathlib import Path
+
+# Ajout des dossiers parents au path pour permettre l'importation de lib et scripts
+parent_dir = Path(__file__).resolve().parent.parent
+sys.path.append(str(parent_dir))
+sys.path.append(str(parent_dir / "scripts"))
+from pythonosc import udp_client
+from pythonosc.osc_bundle import OscBundle
+from music_engine import (TIMING_MODES, GenerativeEngine, LookaheadScheduler, format_stats, make_bundle_sender,
+                          percentile)
+
+RECEIVER_PORT = 9390
+SPIN_MARGIN = 0.002  # Attente active pendant les 2 dernières ms avant l'échéance
+
+
+def receiver(port, ready, results, duration):
+    """Récepteur : joue chaque bundle à son timetag et mesure l'erreur"""
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 1 << 20)
+    sock.bind(("127.0.0.1", port))
+    sock.settimeout(0.5)
+    ready.set()
+
+    errors = []
+    slack = []
+    timestamps = []
+    events = 0
+    deadline = time.monotonic() + duration
+    while time.monotonic() < deadline:
+        try:
+            data = sock.recv(4096)
+        except socket.timeout:
+            continue
+        bundle = OscBundle(data)
+        target = bundle.timestamp
+        slack.append(target - time.time())
+        delay = target - time.time() - SPIN_MARGIN
+        if delay > 0:
+            time.sleep(delay)
+        while time.time() < target:
+            pass
+        errors.append(time.time() - target)
+        timestamps.append(target)
+        events += bundle.num_contents
+    results.put({'errors': errors, 'slack': slack, 'timestamps': timestamps, 'events': events})
+
+
+def gc_stress(stop):
+    """Charge allocation + collections explicites dans le processus émetteur"""
+    junk = []
+    while not stop.is_set():
+        junk.append([{'x': i} for i in range(2000)])
+        if len(junk) > 50:
+            junk.clear()
+            gc.collect()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Test headless du planificateur de music_engine")
+    parser.add_argument("--bpm", type=float, default=750.0, help="Tempo")
+    parser.add_argument("--steps-per-beat", type=int, default=16, help="Pas par temps")
+    parser.add_argument("--duration", type=float, default=5.0, help="Durée de la mesure (s)")
+    parser.add_argument("--gc-stress", action="store_true", help="Charge le GC de l'émetteur")
+    parser.add_argument("--timing", choices=TIMING_MODES, default="timetag",
+                        help="Envoi en avance avec timetag, ou à l'échéance (deadline : comme pour Pure Data, "
+                             "le récepteur joue alors chaque bundle à son arrivée)")
+    args = parser.parse_args()
+
+    ready = multiprocessing.Event()
+    results = multiprocessing.Queue()
+    proc = multiprocessing.Process(target=receiver, args=(RECEIVER_PORT, ready, results, args.duration + 1.0))
+    proc.start()
+    ready.wait(5)
+
+    engine = GenerativeEngine(bpm=args.bpm, steps_per_beat=args.steps_per_beat, seed=0)
+    # Saturation maximale : une note à chaque pas
+    engine.color.update({'h': 90, 's': 255, 'v': 200, 'r': 200, 'g': 120, 'b': 60})
+    client = udp_client.SimpleUDPClient("127.0.0.1", RECEIVER_PORT)
+    scheduler = LookaheadScheduler(engine, make_bundle_sender(client), send_at_deadline=args.timing == "deadline")
+
+    stop = threading.Event()
+    if args.gc_stress:
+        threading.Thread(target=gc_stress, args=(stop,), daemon=True).start()
+
+    scheduler.start()
+    time.sleep(args.duration)
+    scheduler.stop()
+    stop.set()
+
+    res = results.get()
+    proc.join()
+
+    errors = sorted(abs(e) for e in res['errors'])
+    stamps = res['timestamps']
+    grid = [abs((b - a) - engine.step_duration) for a, b in zip(stamps, stamps[1:])]
+    early = sum(1 for s in res['slack'] if s >= 0)
+    print(f"Événements reçus: {res['events']} ({res['events'] / args.duration:.0f}/s), bundles: {len(stamps)}")
+    print(f"Arrivés avant l'échéance: {early}/{len(res['slack'])}, marge min {min(res['slack']) * 1000:.2f} ms")
+    print(f"Écart à la grille des timetags: max {max(grid) * 1e6:.1f} µs")
+    print(f"Gigue de rendu: p50 {percentile(errors, 0.5) * 1e6:.0f} µs, "
+          f"p99 {percentile(errors, 0.99) * 1e6:.0f} µs, max {errors[-1] * 1e6:.0f} µs")
+    print(f"Planification: {format_stats(scheduler.stats())}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+
+"""
+Benchmark de l'analyse hors ligne d'un disque (scripts/analyse_disc.py)
+- Vidéo synthétique (disque à secteurs colorés tournant à 33 tours/min, bruit, passage
+  statique) encodée en MJPEG dans un dossier temporaire
+- Débit (frames de la vidéo décodées par seconde, captures analysées par seconde) selon
+  le nombre de processus, pour les deux modes de décodage, et accélération par rapport
+  à un seul processus
+- Vérifie que la chronologie OSC produite est identique quel que soit le mode
+- Vérifie qu'une erreur d'analyse dans un processus est propagée (et ne bloque pas)
+  dans les deux modes de décodage
+"""
+
+import argparse
+import multiprocessing
+import os
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+# Ajout des dossiers parents au path pour permettre l'importation de lib et scripts
+parent_dir = Path(__file__).resolve().parent.parent
+sys.path.append(str(parent_dir))
+sys.path.append(str(parent_dir / "scripts"))
+import analyse_disc
+from analyse_disc import build_timeline, open_source, run_analysis, sample_plan
+
+SECTORS = 12
+RPM = 33
+ERROR_TIMEOUT = 60.0  # Au-delà, l'analyse est considérée comme bloquée (s)
+
+
+def synthetic_video(path, seconds, fps, size, seed=0):
+    """Disque à secteurs colorés vu par la caméra, avec 6 s de scène statique au milieu"""
+    width, height = size
+    rng = np.random.default_rng(seed)
+    colors = rng.integers(0, 256, (SECTORS, 3))
+    writer = cv2.VideoWriter(str(path), cv2.VideoWriter_fourcc(*"MJPG"), fps, (width, height))
+    pause = (seconds / 2 - 3, seconds / 2 + 3)
+    for i in range(int(seconds * fps)):
+        t = i / fps
+        frame = np.empty((height, width, 3), np.uint8)
+        if pause[0] <= t < pause[1]:
+            frame[:] = 40
+        else:
+            frame[:] = colors[int(t * RPM / 60 * SECTORS) % SECTORS]
+        noise = rng.integers(-6, 7, frame.shape)
+        writer.write(np.clip(frame + noise, 0, 255).astype(np.uint8))
+    writer.release()
+
+
+class InjectedError(RuntimeError):
+    pass
+
+
+def check_worker_error(kind, source, indices, workers, decode, fail_sample):
+    """Analyse dont un échantillon lève une erreur dans le processus : renvoie le résultat observé
+
+    La fonction d'analyse est remplacée avant la création du pool : les processus
+    créés par fork en héritent.
+    """
+    analyse = analyse_disc._analyse
+
+    def failing(sample, frame):
+        if sample == fail_sample:
+            raise InjectedError(f"erreur injectée sur l'échantillon {sample}")
+        analyse(sample, frame)
+
+    outcome = []
+
+    def run():
+        try:
+            run_analysis(kind, source, indices, workers, decode)
+            outcome.append("aucune erreur")
+        except InjectedError:
+            outcome.append("propagée")
+        except Exception as e:
+            outcome.append(f"autre erreur ({e!r})")
+
+    analyse_disc._analyse = failing
+    try:
+        thread = threading.Thread(target=run, daemon=True)
+        thread.start()
+        thread.join(ERROR_TIMEOUT)
+    finally:
+        analyse_disc._analyse = analyse
+    return outcome[0] if outcome else "BLOQUÉE"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de l'analyse hors ligne d'un disque")
+    parser.add_argument("--seconds", type=float, default=120, help="Durée de la vidéo synthétique (s)")
+    parser.add_argument("--fps", type=float, default=30, help="Cadence de la vidéo synthétique")
+    parser.add_argument("--size", default="640x480", help="Taille des frames (LxH)")
+    parser.add_argument("--workers", default=None,
+                        help="Nombres de processus testés, séparés par des virgules (défaut : 1, 2, 4… jusqu'au nombre de cœurs)")
+    parser.add_argument("--dir", default=None, help="Dossier de travail (défaut : dossier temporaire)")
+    parser.add_argument("--fail-sample", type=int, default=None,
+                        help="Échantillon en erreur pour la vérification de propagation (défaut : milieu de la vidéo)")
+    args = parser.parse_args()
+
+    size = tuple(int(v) for v in args.size.split("x"))
+    cores = os.cpu_count()
+    if args.workers:
+        counts = [int(v) for v in args.workers.split(",")]
+    else:
+        counts = [1]
+        while counts[-1] * 2 <= cores:
+            counts.append(counts[-1] * 2)
+        if counts[-1] != cores:
+            counts.append(cores)
+
+    with tempfile.TemporaryDirectory(dir=args.dir) as tmp:
+        video = Path(tmp) / "disque.avi"
+        synthetic_video(video, args.seconds, args.fps, size)
+        kind, source, fps, count = open_source(str(video))
+        indices, times = sample_plan(count, fps)
+        decoded = int(indices[-1]) + 1
+        print(f"Vidéo {size[0]}×{size[1]} MJPEG, {count} frames à {fps:.0f} images/s, "
+              f"{len(indices)} captures, {cores} cœur(s)")
+        print(f"{'décodage':>9} {'processus':>9} {'frames/s':>9} {'captures/s':>10} {'accélération':>12} "
+              f"{'chronologie':>11}")
+
+        reference = None
+        for decode in ("worker", "parent"):
+            baseline = None
+            for workers in counts:
+                start = time.perf_counter()
+                results = run_analysis(kind, source, indices, workers, decode)
+                elapsed = time.perf_counter() - start
+                timeline, _ = build_timeline(results, times)
+                if reference is None:
+                    reference = timeline
+                baseline = baseline or elapsed
+                same = "identique" if timeline == reference else "DIFFÉRENTE"
+                print(f"{decode:>9} {workers:>9} {decoded / elapsed:>9.0f} {len(indices) / elapsed:>10.0f} "
+                      f"{baseline / elapsed:>11.2f}× {same:>11}")
+        print(f"Chronologie: {len(reference)} messages OSC ({len(reference) // 6} couleurs)")
+
+        if multiprocessing.get_start_method() != "fork":
+            print("Propagation des erreurs : non vérifiée (les processus ne sont pas créés par fork)")
+            return
+        fail_sample = len(indices) // 2 if args.fail_sample is None else args.fail_sample
+        hung = False
+        for decode in ("worker", "parent"):
+            outcome = check_worker_error(kind, source, indices, counts[-1], decode, fail_sample)
+            hung = hung or outcome == "BLOQUÉE"
+            print(f"Erreur sur l'échantillon {fail_sample} (décodage {decode}, {counts[-1]} processus): {outcome}")
+    if hung:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+
+"""
+Benchmark de la résolution d'adresses OSC
+- Tables de routage de plusieurs centaines de motifs
+- Flux d'adresses réaliste (composantes couleur, arduino, événements)
+- Compare le parcours linéaire historique, les motifs compilés et le cache LRU
+"""
+
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+
+# Ajout du dossier parent au path pour permettre l'importation de lib.osc_patterns
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+from lib.osc_patterns import PatternDispatcher, RouteTable, compile_pattern
+
+# Adresses réellement émises par les services
+LIVE_ADDRESSES = [
+    *(f"/vision/color/raw/rgb/{c}" for c in "rgb"),
+    *(f"/vision/color/raw/hsv/{c}" for c in "hsv"),
+    *(f"/logic/color/ema/{c}" for c in "rgbhsv"),
+    "/arduino/motor/speed",
+    "/arduino/servo/angle",
+    "/arduino/servo/mode",
+    "/music_engine/event",
+]
+
+
+def build_routes(size):
+    """Construit une table de routage de `size` règles (motifs, exactes, préfixes)"""
+    routes = {}
+    i = 0
+    while len(routes) < size:
+        kind = i % 4
+        if kind == 0:
+            routes[f"/vision/disc{i}/color/raw/{{rgb,hsv}}/*"] = ["logic", "dev"]
+        elif kind == 1:
+            routes[f"/logic/zone{i}/[a-f]?/ema"] = ["led", "puredata"]
+        elif kind == 2:
+            routes[f"/sensor{i}/value"] = ["dev"]
+        else:
+            routes[f"/module{i}/"] = ["dev"]
+        i += 1
+    # Les règles réelles sont déclarées en dernier (pire cas pour le parcours)
+    routes.update({
+        "/vision/": ["logic", "led", "dev", "puredata"],
+        "/logic/": ["led", "puredata", "music_engine", "dev"],
+        "/music_engine/": ["logic", "puredata", "dev"],
+        "/arduino/": ["logic", "puredata", "dev"],
+    })
+    return routes
+
+
+def address_stream(count, seed=0):
+    """Flux d'adresses : 95 % d'adresses live, 5 % d'adresses générées"""
+    rng = random.Random(seed)
+    stream = []
+    for _ in range(count):
+        if rng.random() < 0.95:
+            stream.append(rng.choice(LIVE_ADDRESSES))
+        else:
+            stream.append(f"/vision/disc{rng.randrange(0, 400, 4)}/color/raw/rgb/{rng.choice('rgb')}")
+    return stream
+
+
+def linear_lookup(routes, address):
+    """Résolution historique : exacte puis parcours des préfixes (sans motifs)"""
+    if address in routes:
+        return routes[address]
+    for prefix, destinations in routes.items():
+        if prefix.endswith('/') and address.startswith(prefix):
+            return destinations
+    return None
+
+
+def uncached_lookup(matchers, address):
+    """Résolution par motifs recompilés à chaque message (comme python-osc)"""
+    for rule, destinations in matchers:
+        if compile_pattern(rule, prefix=rule.endswith('/'))(address):
+            return destinations
+    return None
+
+
+def timeit(func, stream):
+    start = time.perf_counter()
+    for address in stream:
+        func(address)
+    return (time.perf_counter() - start) / len(stream) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark des motifs d'adresses OSC")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 300, 1000],
+                        help="Tailles de table de routage à tester")
+    parser.add_argument("--messages", type=int, default=20000, help="Nombre d'adresses par mesure")
+    args = parser.parse_args()
+
+    stream = address_stream(args.messages)
+    print(f"{'règles':>7} {'linéaire':>10} {'motifs':>10} {'compilés':>10} {'cache LRU':>10} {'dispatcher':>11}  (µs/message)")
+    for size in args.sizes:
+        routes = build_routes(size)
+        table = RouteTable(routes)
+        uncached = RouteTable(routes, cache_size=0)
+        matchers = list(routes.items())
+
+        dispatcher = PatternDispatcher()
+        for rule in routes:
+            dispatcher.map(rule.rstrip('/') + ('/*' if rule.endswith('/') else ''), lambda *a: None)
+
+        t_linear = timeit(lambda a: linear_lookup(routes, a), stream)
+        t_patterns = timeit(lambda a: uncached_lookup(matchers, a), stream[:max(1, len(stream) // 20)])
+        t_compiled = timeit(uncached.lookup, stream)
+        t_cached = timeit(table.lookup, stream)
+        t_dispatch = timeit(dispatcher.handlers_for_address, stream)
+        print(f"{size:>7} {t_linear:>10.2f} {t_patterns:>10.2f} {t_compiled:>10.2f} {t_cached:>10.2f} {t_dispatch:>11.2f}")
+        print(f"        cache: {table.cache_info()}")
+
+
+if __name__ == "__main__":
+    main()
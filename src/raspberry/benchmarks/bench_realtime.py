@@ -0,0 +1,215 @@
+#!/usr/bin/env python3
+
+"""
+Effet du mode temps réel (lib/realtime.py) sur la gigue
+- LED : moteur d'animation de l'anneau (backend simulé) dans ce processus, avec un tas
+  vivant volumineux et un thread qui produit des déchets cycliques par rafales (comme les
+  handlers OSC) ; retard de chaque frame sur son échéance et pauses du ramasse-miettes
+- Routeur : osc_router.py lancé comme en production avec une configuration temporaire,
+  avec et sans --realtime, pendant que des processus de charge occupent les cœurs ;
+  latence émetteur → routeur → dev mesurée par un récepteur à la place du module dev
+- Chaque essai est lancé sans réglage puis avec le mode temps réel
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+# Ajout du dossier parent au path pour permettre l'importation de lib
+parent_dir = Path(__file__).resolve().parent.parent
+sys.path.append(str(parent_dir))
+from pythonosc import osc_server, udp_client
+from lib.ledring import AnimationEngine, LEDRing, SectorAnimation, open_led_backend
+from lib.osc_patterns import PatternDispatcher
+from lib.realtime import DEFAULT_PRIORITY, JitterHistogram, RealtimeMode
+
+SCRIPTS = parent_dir / "scripts"
+BASE_PORT = 15100
+PIXELS = 24
+
+
+class Node:
+    """Objet du tas vivant (références croisées : suivi par le ramasse-miettes)"""
+
+    def __init__(self, parent=None):
+        self.parent = parent
+        self.children = []
+
+
+def live_heap(size):
+    """Arbre d'objets vivants, comme l'état accumulé d'un service en cours d'exécution"""
+    root = Node()
+    nodes = [root]
+    for i in range(size):
+        node = Node(nodes[i // 8])
+        nodes[i // 8].children.append(node)
+        nodes.append(node)
+    return nodes
+
+
+def garbage_maker(stop, burst, pause):
+    """Déchets cycliques par rafales de `burst` s suivies de `pause` s"""
+    while not stop.is_set():
+        end = time.perf_counter() + burst
+        while time.perf_counter() < end:
+            a, b = {}, {}
+            a['b'], b['a'] = b, a
+        time.sleep(pause)
+
+
+def hog(stop):
+    """Processus de charge : occupe un cœur en temps partagé"""
+    while not stop.is_set():
+        sum(range(10000))
+
+
+def raise_priority():
+    """Thread de mesure (émetteur, récepteur) devant les processus de charge, si permis"""
+    try:
+        os.sched_setscheduler(0, os.SCHED_FIFO, os.sched_param(DEFAULT_PRIORITY + 1))
+        return True
+    except OSError:
+        return False
+
+
+def fmt_us(histogram, q):
+    return histogram.percentile(q) * 1e6
+
+
+def led_trial(realtime, duration, fps, heap_size):
+    heap = live_heap(heap_size)
+    ring = LEDRing(PIXELS, open_led_backend('mock', PIXELS))
+    engine = AnimationEngine(ring, SectorAnimation(PIXELS), fps, realtime=realtime)
+    realtime.startup_done()
+    stop = threading.Event()
+    maker = threading.Thread(target=garbage_maker, args=(stop, 0.002, 0.004), daemon=True)
+    maker.start()
+    realtime.reset_stats()
+    engine.start()
+    time.sleep(duration)
+    engine.stop()
+    stop.set()
+    maker.join()
+    realtime.close()
+    del heap
+    return realtime.histogram("retard frame LED"), realtime.gc_pauses
+
+
+class Sink:
+    """Récepteur à la place du module dev : latence de chaque message horodaté"""
+
+    def __init__(self, port):
+        self.histogram = JitterHistogram("latence routeur")
+        dispatcher = PatternDispatcher()
+        dispatcher.map("/vision/color/raw/hsv/v", self.handle)
+        self.server = osc_server.BlockingOSCUDPServer(("127.0.0.1", port), dispatcher)
+        self.thread = threading.Thread(target=self.serve, daemon=True)
+        self.thread.start()
+
+    def serve(self):
+        raise_priority()
+        self.server.serve_forever()
+
+    def handle(self, address, sent_ns):
+        # Horloge monotone commune à tous les processus de la machine
+        self.histogram.record((time.monotonic_ns() - int(sent_ns)) / 1e9)
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def router_trial(realtime, duration, rate, hogs):
+    modules = ("puredata", "logic", "led", "music_engine", "vision", "router", "dev")
+    config = {"osc": {name: {"ip": "127.0.0.1", "port": BASE_PORT + i} for i, name in enumerate(modules)}}
+    with tempfile.NamedTemporaryFile("w", suffix=".json", delete=False) as f:
+        json.dump(config, f)
+        config_path = f.name
+    sink = Sink(BASE_PORT + 6)
+    command = [sys.executable, str(SCRIPTS / "osc_router.py"), "--network-config", config_path]
+    if realtime:
+        command.append("--realtime")
+    router = subprocess.Popen(command, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    stop = multiprocessing.Event()
+    loads = [multiprocessing.Process(target=hog, args=(stop,), daemon=True) for _ in range(hogs)]
+    try:
+        time.sleep(1.0)  # Routeur à l'écoute
+        if router.poll() is not None:
+            raise RuntimeError(f"le routeur s'est arrêté au démarrage (code {router.returncode})")
+        for load in loads:
+            load.start()
+        client = udp_client.SimpleUDPClient("127.0.0.1", BASE_PORT + 5)
+        # Émetteur et récepteur passent devant les processus de charge : seule la latence du routeur est mesurée
+        raised = raise_priority()
+        period = 1.0 / rate
+        deadline = time.monotonic()
+        end = deadline + duration
+        while deadline < end:
+            client.send_message("/vision/color/raw/hsv/v", str(time.monotonic_ns()))
+            deadline += period
+            time.sleep(max(0.0, deadline - time.monotonic()))
+        if raised:
+            os.sched_setscheduler(0, os.SCHED_OTHER, os.sched_param(0))
+        time.sleep(0.2)  # Derniers messages en vol
+    finally:
+        stop.set()
+        for load in loads:
+            load.join()
+        router.terminate()
+        router.wait()
+        sink.close()
+        os.unlink(config_path)
+    return sink.histogram
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Gigue avec et sans mode temps réel (LED et routeur OSC)")
+    parser.add_argument("--duration", type=float, default=10.0, help="Durée de chaque essai (s)")
+    parser.add_argument("--fps", type=int, default=120, help="Cadence du moteur d'animation LED")
+    parser.add_argument("--heap", type=int, default=300000, help="Objets du tas vivant pendant l'essai LED")
+    parser.add_argument("--rate", type=float, default=500, help="Messages/s envoyés au routeur")
+    parser.add_argument("--hogs", type=int, default=None, help="Processus de charge (défaut : un par cœur)")
+    parser.add_argument("--skip-led", action="store_true", help="N'exécute pas l'essai LED")
+    parser.add_argument("--skip-router", action="store_true", help="N'exécute pas l'essai routeur")
+    args = parser.parse_args()
+
+    hogs = os.cpu_count() if args.hogs is None else args.hogs
+    print(f"{os.cpu_count()} cœur(s), essais de {args.duration:.0f} s")
+    header = f"{'mode':>14} {'p50':>9} {'p99':>9} {'max':>9} {'> 1 ms':>7}"
+
+    if not args.skip_led:
+        print(f"\nLED : retard des frames à {args.fps} FPS, tas vivant de {args.heap} objets")
+        print(f"{header} {'pauses GC':>9} {'p99':>9} {'max':>9}")
+        trials = (
+            ("normal", RealtimeMode("bench")),
+            ("gc freeze", RealtimeMode("bench", gc_mode="freeze")),
+            ("temps réel", RealtimeMode("bench", priority=DEFAULT_PRIORITY, gc_mode="deferred")),
+        )
+        for name, realtime in trials:
+            lateness, pauses = led_trial(realtime, args.duration, args.fps, args.heap)
+            late = sum(lateness.counts[lateness.bounds.index(0.001) + 1:]) / max(1, lateness.count)
+            print(f"{name:>14} {fmt_us(lateness, 0.5):>6.0f} µs {fmt_us(lateness, 0.99):>6.0f} µs "
+                  f"{lateness.max * 1e6:>6.0f} µs {late:>7.1%} {pauses.count:>9} "
+                  f"{fmt_us(pauses, 0.99):>6.0f} µs {pauses.max * 1e6:>6.0f} µs")
+
+    if not args.skip_router:
+        print(f"\nRouteur : latence émetteur → routeur → dev, {args.rate:.0f} messages/s, "
+              f"{hogs} processus de charge")
+        print(header)
+        for name, realtime in (("normal", False), ("--realtime", True)):
+            latency = router_trial(realtime, args.duration, args.rate, hogs)
+            late = sum(latency.counts[latency.bounds.index(0.001) + 1:]) / max(1, latency.count)
+            print(f"{name:>14} {fmt_us(latency, 0.5):>6.0f} µs {fmt_us(latency, 0.99):>6.0f} µs "
+                  f"{latency.max * 1e6:>6.0f} µs {late:>7.1%}")
+    print("p50/p99 : borne supérieure de la classe de l'histogramme ; > 1 ms : part des mesures au-delà de 1 ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+
+"""
+Benchmark de l'enregistreur de session (lib/score_file.py)
+- Latence d'ajout d'un enregistrement (p50, p99, max), rotations comprises, comparée à
+  l'écriture d'une ligne CSV suivie d'un flush, et d'une ligne CSV avec fsync
+- Chargement d'une longue session : ouverture des fichiers mappés et calcul de la couleur
+  moyenne par tour, comparés à la relecture du CSV équivalent
+- Taille sur le disque par heure d'enregistrement (couleurs de vision à 6.7 Hz)
+"""
+
+import argparse
+import csv
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+# Ajout du dossier parent au path pour permettre l'importation de lib
+parent_dir = Path(__file__).resolve().parent.parent
+sys.path.append(str(parent_dir))
+from lib.score_file import RotatingScoreRecorder, open_scores, record_size, score_columns
+
+VISION_RATE = 1 / 0.15  # Couleurs analysées par seconde en cadence active
+RPM = 33
+
+
+def synthetic_rows(count, sectors, seed=0):
+    """Flux couleur synthétique : une couleur par enregistrement, disque à 33 tours/min"""
+    rng = np.random.default_rng(seed)
+    rgb = rng.integers(0, 256, (count, 3), dtype=np.uint8)
+    sector_image = np.zeros((sectors, 3), dtype=np.uint8)
+    for i in range(count):
+        t = i / VISION_RATE
+        turns = t * RPM / 60
+        row = {
+            't': t,
+            'rgb': rgb[i],
+            'hsv': rgb[i].astype(np.uint16),
+            'ema_rgb': rgb[i].astype(np.float32),
+            'ema_hsv': rgb[i].astype(np.float32),
+            'motor_speed': 100,
+            'servo_angle': 90,
+            'angle': turns % 1.0,
+            'revolution': int(turns),
+        }
+        if sectors:
+            sector_image[int(-turns % 1.0 * sectors) % sectors] = rgb[i]
+            row['sectors'] = sector_image
+        yield row
+
+
+def percentiles(samples):
+    samples = np.sort(np.asarray(samples)) * 1e6
+    return samples[len(samples) // 2], samples[int(0.99 * len(samples))], samples[-1]
+
+
+def bench_mapped(directory, rows, columns, capacity):
+    recorder = RotatingScoreRecorder(directory, columns, capacity)
+    times = []
+    for row in rows:
+        start = time.perf_counter()
+        recorder.append(row)
+        times.append(time.perf_counter() - start)
+    recorder.close()
+    return times, recorder
+
+
+def csv_line(row):
+    values = [row['t'], *row['rgb'].tolist(), *row['hsv'].tolist(), *row['ema_rgb'].tolist(),
+              *row['ema_hsv'].tolist(), row['motor_speed'], row['servo_angle'], row['angle'], row['revolution']]
+    if 'sectors' in row:
+        values.extend(row['sectors'].ravel().tolist())
+    return values
+
+
+def bench_csv(path, rows, fsync):
+    times = []
+    with open(path, 'w', newline='') as f:
+        writer = csv.writer(f)
+        for row in rows:
+            start = time.perf_counter()
+            writer.writerow(csv_line(row))
+            f.flush()
+            if fsync:
+                os.fsync(f.fileno())
+            times.append(time.perf_counter() - start)
+    return times
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de l'enregistreur de session")
+    parser.add_argument("--records", type=int, default=50000, help="Enregistrements écrits pour la mesure de latence")
+    parser.add_argument("--sectors", type=int, default=36, help="Secteurs enregistrés (0 : sans image des secteurs)")
+    parser.add_argument("--file-mb", type=float, default=1.0, help="Taille d'un fichier avant rotation (Mio)")
+    parser.add_argument("--fsync-records", type=int, default=500, help="Enregistrements pour la variante CSV + fsync")
+    parser.add_argument("--dir", default=None, help="Dossier de travail (défaut : dossier temporaire)")
+    args = parser.parse_args()
+
+    columns = score_columns(args.sectors)
+    size = record_size(columns)
+    capacity = max(1, int(args.file_mb * 2**20 / size))
+    per_hour = VISION_RATE * 3600
+    print(f"Enregistrement de {size} octets ({args.sectors} secteurs), {capacity} par fichier, "
+          f"{per_hour * size / 2**20:.1f} Mio par heure à {VISION_RATE:.1f} Hz")
+
+    with tempfile.TemporaryDirectory(dir=args.dir) as tmp:
+        tmp = Path(tmp)
+        rows = list(synthetic_rows(args.records, args.sectors))
+
+        mapped, recorder = bench_mapped(tmp / "scores", rows, columns, capacity)
+        csv_flush = bench_csv(tmp / "session.csv", rows, fsync=False)
+        csv_fsync = bench_csv(tmp / "session_fsync.csv", rows[:args.fsync_records], fsync=True)
+        print(f"{'écriture':>22} {'p50':>9} {'p99':>9} {'max':>10}")
+        for label, times in (("fichier mappé", mapped), ("CSV + flush", csv_flush), ("CSV + fsync", csv_fsync)):
+            p50, p99, worst = percentiles(times)
+            print(f"{label:>22} {p50:>6.1f} µs {p99:>6.1f} µs {worst:>7.0f} µs")
+        print(f"Rotations: {recorder.rotations} ({len(recorder.files)} fichiers), "
+              f"fichiers préparés dans le chemin d'écriture: {recorder.sync_prepared}")
+
+        # Chargement : couleur moyenne de chaque tour du disque
+        start = time.perf_counter()
+        scores = open_scores(recorder.files)
+        opened = time.perf_counter() - start
+        rgb = np.concatenate([s['rgb'] for s in scores])
+        revolution = np.concatenate([s['revolution'] for s in scores])
+        counts = np.bincount(revolution)
+        means = np.stack([np.bincount(revolution, rgb[:, c]) for c in range(3)], axis=1) / counts[:, None]
+        mapped_load = time.perf_counter() - start
+
+        start = time.perf_counter()
+        with open(tmp / "session.csv", newline='') as f:
+            table = np.array([[float(v) for v in line[:17]] for line in csv.reader(f)])
+        csv_rgb = table[:, 1:4]
+        csv_rev = table[:, 16].astype(np.int64)
+        csv_means = np.stack([np.bincount(csv_rev, csv_rgb[:, c]) for c in range(3)], axis=1) / counts[:, None]
+        csv_load = time.perf_counter() - start
+        assert np.allclose(means, csv_means)
+
+        hours = args.records / per_hour
+        print(f"Chargement de {args.records} enregistrements ({hours:.1f} h), couleur moyenne de {len(counts)} tours:")
+        print(f"  fichiers mappés: {mapped_load * 1000:.1f} ms (dont ouverture sans copie {opened * 1000:.2f} ms)")
+        print(f"  CSV: {csv_load * 1000:.0f} ms")
+
+
+if __name__ == "__main__":
+    main()
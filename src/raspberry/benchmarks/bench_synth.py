@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+
+"""
+Benchmark du synthétiseur NumPy intégré à music_engine.py (lib/synth.py)
+- Temps de rendu par bloc selon le nombre de voix actives, comparé au budget temps réel
+- Nombre maximal de voix avant sous-alimentation (rendu p99 > budget)
+- Rendu headless de bout en bout (moteur + planificateur + synthé) vers un WAV ou une sortie nulle
+"""
+
+import argparse
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# Ajout des dossiers parents au path pour permettre l'importation de lib et scripts
+parent_dir = Path(__file__).resolve().parent.parent
+sys.path.append(str(parent_dir))
+sys.path.append(str(parent_dir / "scripts"))
+from lib.constants import BLOCK_SIZE, SAMPLE_RATE
+from lib.synth import BlockSynth, NullSink, SynthBackend, WavSink, format_synth_stats
+from music_engine import GenerativeEngine, LookaheadScheduler, percentile
+
+
+def render_times(voices, block_size, blocks):
+    """Temps de rendu (s) de `blocks` blocs avec `voices` voix tenues"""
+    synth = BlockSynth(block_size=block_size, max_voices=voices)
+    for i in range(voices):
+        synth.note_on(48 + i % 36, 100, duration=3600.0)
+    times = []
+    for _ in range(blocks):
+        start = time.perf_counter()
+        synth.render()
+        times.append(time.perf_counter() - start)
+    return sorted(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark du synthétiseur intégré")
+    parser.add_argument("--block-size", type=int, default=BLOCK_SIZE, help="Taille des blocs (échantillons)")
+    parser.add_argument("--blocks", type=int, default=500, help="Blocs rendus par mesure")
+    parser.add_argument("--max-voices", type=int, default=256, help="Nombre de voix maximal testé")
+    parser.add_argument("--duration", type=float, default=5.0, help="Durée du rendu de bout en bout (s)")
+    parser.add_argument("--wav", action="store_true", help="Écrit le rendu de bout en bout dans un WAV")
+    args = parser.parse_args()
+
+    budget = args.block_size / SAMPLE_RATE
+    print(f"Budget temps réel: {budget * 1000:.2f} ms par bloc de {args.block_size} échantillons")
+    print(f"{'voix':>5} {'moyen':>9} {'p99':>9} {'max':>9} {'charge p99':>11}")
+    max_ok = 0
+    voices = 1
+    while voices <= args.max_voices:
+        times = render_times(voices, args.block_size, args.blocks)
+        mean = sum(times) / len(times)
+        p99 = percentile(times, 0.99)
+        print(f"{voices:>5} {mean * 1000:>6.3f} ms {p99 * 1000:>6.3f} ms {times[-1] * 1000:>6.3f} ms "
+              f"{p99 / budget * 100:>9.0f} %")
+        if p99 < budget:
+            max_ok = voices
+        voices *= 2
+    print(f"Voix maximales avant sous-alimentation (p99 < budget): {max_ok}")
+
+    # Rendu de bout en bout en temps réel simulé
+    engine = GenerativeEngine(bpm=120, seed=0)
+    engine.color.update({'h': 60, 's': 220, 'v': 200, 'r': 200, 'g': 180, 'b': 60})
+    synth = BlockSynth(block_size=args.block_size)
+    with tempfile.TemporaryDirectory() as tmp:
+        wav_path = Path(tmp) / "bench_synth.wav"
+        sink = WavSink(wav_path) if args.wav else NullSink()
+        backend = SynthBackend(synth, sink)
+        scheduler = LookaheadScheduler(engine, backend.send)
+        backend.start()
+        scheduler.start()
+        time.sleep(args.duration)
+        scheduler.stop()
+        backend.stop()
+        if args.wav:
+            print(f"WAV écrit: {wav_path.stat().st_size} octets")
+    print(f"Bout en bout: {format_synth_stats(backend.stats())}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+
+"""
+Benchmark de l'analyse couleur de vision.py : flux RGB 320×240 vs flux lores YUV420
+- Frames synthétiques (sans caméra) : temps CPU par frame et octets lus par frame
+- Compare l'ancien chemin (redimensionnement 10×10 + kmeans), le chemin RGB actuel
+  (moyenne directe) et le chemin lores (moyennes YUV, une seule conversion)
+- Option --camera : mesure sur la vraie caméra (Raspberry Pi) pour chaque mode
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+# Ajout des dossiers parents au path pour permettre l'importation de lib et scripts
+parent_dir = Path(__file__).resolve().parent.parent
+sys.path.append(str(parent_dir))
+sys.path.append(str(parent_dir / "scripts"))
+from vision import LORES_SIZE, MAIN_SIZE, ColorDetector, rgb_to_yuv420, yuv420_planes, yuv_mean_to_rgb
+
+
+def legacy_dominant_color(frame):
+    """Ancien chemin : redimensionnement 10×10 puis kmeans à un cluster"""
+    frame = cv2.resize(frame, (10, 10), interpolation=cv2.INTER_AREA)
+    pixels = np.float32(frame.reshape(-1, 3))
+    criteria = (cv2.TERM_CRITERIA_EPS + cv2.TERM_CRITERIA_MAX_ITER, 5, 1.0)
+    _, _, palette = cv2.kmeans(pixels, 1, None, criteria, 1, cv2.KMEANS_RANDOM_CENTERS)
+    return palette[0]
+
+
+def rgb_dominant_color(frame):
+    """Chemin RGB actuel : moyenne directe"""
+    return np.asarray(cv2.mean(frame)[:3], dtype=np.float32)
+
+
+def lores_dominant_color(frame):
+    """Chemin lores : moyennes dans l'espace YUV, conversion de la seule couleur finale"""
+    y, u, v = yuv420_planes(frame, *LORES_SIZE)
+    return yuv_mean_to_rgb(cv2.mean(y)[0], cv2.mean(u)[0], cv2.mean(v)[0])
+
+
+def synthetic_frames(count, seed=0):
+    """Frames RGB 320×240 (dégradés + bruit) et leur équivalent lores YUV420 64×48"""
+    rng = np.random.default_rng(seed)
+    width, height = MAIN_SIZE
+    xs = np.linspace(0, 1, width, dtype=np.float32)[None, :]
+    ys = np.linspace(0, 1, height, dtype=np.float32)[:, None]
+    frames = []
+    for _ in range(count):
+        base = rng.uniform(0, 255, 3)
+        rgb = np.empty((height, width, 3), dtype=np.float32)
+        rgb[..., 0] = base[0] * xs
+        rgb[..., 1] = base[1] * ys
+        rgb[..., 2] = base[2] * (1 - xs * ys)
+        rgb += rng.normal(0, 8, rgb.shape)
+        rgb = np.clip(rgb, 0, 255).astype(np.uint8)
+        # Le FAI (ISP) met à l'échelle et convertit en YUV420 pleine échelle (Sycc)
+        small = cv2.resize(rgb, LORES_SIZE, interpolation=cv2.INTER_AREA)
+        yuv = rgb_to_yuv420(small)
+        frames.append((rgb, yuv))
+    return frames
+
+
+def measure(func, frames, repeat):
+    """Temps CPU moyen par frame (µs), copie du tampon caméra comprise"""
+    start = time.process_time()
+    for _ in range(repeat):
+        for frame in frames:
+            func(frame.copy())
+    return (time.process_time() - start) / (repeat * len(frames)) * 1e6
+
+
+def bench_camera(frames):
+    """Mesure sur la caméra réelle pour chaque mode d'analyse"""
+    for analysis in ("rgb", "lores"):
+        detector = ColorDetector(analysis=analysis)
+        try:
+            detector.get_frame_colors()
+            start_cpu = time.process_time()
+            start = time.perf_counter()
+            for _ in range(frames):
+                detector.get_frame_colors()
+            cpu = (time.process_time() - start_cpu) / frames * 1e6
+            fps = frames / (time.perf_counter() - start)
+            print(f"Caméra {analysis:>5}: {cpu:.0f} µs CPU/frame, {fps:.1f} frames/s")
+        finally:
+            detector.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de l'analyse couleur de vision.py")
+    parser.add_argument("--frames", type=int, default=50, help="Frames synthétiques distinctes")
+    parser.add_argument("--repeat", type=int, default=20, help="Répétitions de la série")
+    parser.add_argument("--camera", type=int, default=0, help="Frames mesurées sur la caméra réelle (0 : désactivé)")
+    args = parser.parse_args()
+
+    frames = synthetic_frames(args.frames)
+    rgb_frames = [rgb for rgb, _ in frames]
+    yuv_frames = [yuv for _, yuv in frames]
+
+    results = [
+        ("rgb 320×240 + kmeans (ancien)", legacy_dominant_color, rgb_frames),
+        ("rgb 320×240 + moyenne", rgb_dominant_color, rgb_frames),
+        ("lores YUV420 64×48", lores_dominant_color, yuv_frames),
+    ]
+    print(f"{'chemin':>30} {'CPU/frame':>11} {'octets/frame':>13}")
+    for name, func, data in results:
+        cpu = measure(func, data, args.repeat)
+        print(f"{name:>30} {cpu:>8.1f} µs {data[0].nbytes:>13}")
+
+    error = max(np.abs(legacy_dominant_color(rgb) - lores_dominant_color(yuv)).max() for rgb, yuv in frames)
+    print(f"Écart max de couleur lores vs ancien chemin: {error:.1f} (sur 255)")
+
+    if args.camera:
+        bench_camera(args.camera)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,213 @@
+#!/usr/bin/env python3
+
+"""
+Test de la cadence de capture adaptative de vision.py sur des séquences synthétiques
+- Scénario : disque en rotation, arrêt, redémarrage, disque uniforme, changement de disque
+- Horloge virtuelle : le scénario complet est rejoué sans attendre
+- Compare l'ancienne boucle (analyse à chaque frame) à MotionGate, avec et sans télémétrie moteur
+- Affiche frames capturées/analysées, temps CPU (détection, analyse et envoi OSC),
+  économie d'énergie estimée et latence de reprise (sur plusieurs phases de capture)
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import cv2
+import numpy as np
+from pythonosc import udp_client
+
+# Ajout des dossiers parents au path pour permettre l'importation de lib et scripts
+parent_dir = Path(__file__).resolve().parent.parent
+sys.path.append(str(parent_dir))
+sys.path.append(str(parent_dir / "scripts"))
+from vision import ACTIVE_PERIOD, IDLE_PERIOD, LORES_SIZE, MotionGate, rgb_to_yuv420, yuv420_planes, yuv_mean_to_rgb
+
+DISC_RPS = 33 / 60  # 33 tours/min
+
+# Scénario : (durée en s, scène, vitesse moteur)
+SCENARIO = [
+    (10, "spin", 100),       # Disque en rotation
+    (30, "static", 0),       # Disque arrêté
+    (10, "spin", 100),       # Redémarrage
+    (10, "uniform", 100),    # Disque uniforme en rotation : scène statique, moteur en marche
+    (15, "static", 0),       # Arrêt
+    (2, "swap", 0),          # Changement de disque à la main, moteur arrêté
+    (13, "static", 0),
+]
+
+
+class SyntheticDisc:
+    """Frames YUV420 64×48 d'un disque coloré vu de dessus"""
+
+    def __init__(self, seed=0, noise=1.5):
+        self.rng = np.random.default_rng(seed)
+        self.noise = noise
+        width, height = LORES_SIZE
+        ys, xs = np.mgrid[0:height, 0:width].astype(np.float32)
+        self.angle = np.arctan2(ys - height / 2, xs - width / 2) / (2 * np.pi)
+        self.radius = np.hypot(ys - height / 2, xs - width / 2) / (height / 2)
+        self.texture = 0
+
+    def frame(self, scene, t, spun):
+        """Frame à l'instant t, le disque ayant tourné pendant spun secondes au total"""
+        width, height = LORES_SIZE
+        rotation = DISC_RPS * spun
+        if scene == "swap":
+            # Nouveau disque posé : la texture change à chaque instant
+            self.texture = int(t * 7)
+        hsv = np.empty((height, width, 3), dtype=np.uint8)
+        if scene == "uniform":
+            hsv[..., 0] = 30
+        else:
+            hsv[..., 0] = ((self.angle + rotation) * 4 % 1 * 180 + self.texture * 37) % 180
+        hsv[..., 1] = 200
+        hsv[..., 2] = np.where(self.radius < 1, 200, 40)
+        yuv = rgb_to_yuv420(cv2.cvtColor(hsv, cv2.COLOR_HSV2RGB))
+        # Bruit du capteur sur le plan Y
+        noisy = yuv.astype(np.float32)
+        noisy[:height] += self.rng.normal(0, self.noise, (height, width))
+        return np.clip(noisy, 0, 255).astype(np.uint8)
+
+
+def analyse(frame):
+    """Analyse couleur du flux lores (même calcul que ColorDetector)"""
+    y, u, v = yuv420_planes(frame, *LORES_SIZE)
+    return yuv_mean_to_rgb(cv2.mean(y)[0], cv2.mean(u)[0], cv2.mean(v)[0])
+
+
+def segments():
+    """Liste des segments (début, fin, scène, vitesse moteur)"""
+    start = 0.0
+    result = []
+    for duration, scene, speed in SCENARIO:
+        result.append((start, start + duration, scene, speed))
+        start += duration
+    return result
+
+
+def spin_time(segs, t):
+    """Durée totale de rotation du moteur jusqu'à l'instant t"""
+    return sum(max(0.0, min(t, end) - start) for start, end, _, speed in segs if speed)
+
+
+def send_colors(client, rgb):
+    """Envoi des six composantes, comme la boucle principale de vision.py"""
+    r, g, b = map(int, rgb)
+    for address, value in (("r", r), ("g", g), ("b", b), ("h", r), ("s", g), ("v", b)):
+        client.send_message(f"/vision/color/raw/{'rgb' if address in 'rgb' else 'hsv'}/{address}", value)
+
+
+def run(mode, noise, client, phase=0.0):
+    """Rejoue le scénario ; mode : "baseline", "diff" ou "telemetry"
+
+    La première capture a lieu à phase secondes : les instants de capture sont
+    ainsi décalés par rapport aux changements de scène.
+    """
+    disc = SyntheticDisc(noise=noise)
+    segs = segments()
+    total = segs[-1][1]
+    now = [0.0]
+    gate = MotionGate(clock=lambda: now[0])
+    # Changements de vitesse moteur (télémétrie relayée par le routeur)
+    events = [(start, speed) for start, _, _, speed in segs] if mode == "telemetry" else []
+
+    cpu = 0.0
+    frames = 0
+    analysed = 0
+    static_analyses = 0
+    # Reprises du mouvement (hors premier segment) → (latence de la première analyse,
+    # frames montrant déjà le mouvement mais non analysées)
+    wake = {}
+    t = phase
+    while t < total:
+        seg = next(s for s in segs if s[0] <= t < s[1])
+        frame = disc.frame(seg[2], t, spin_time(segs, t))
+        now[0] = t
+
+        start = time.process_time()
+        if mode == "baseline":
+            do_analyse = True
+        else:
+            do_analyse = gate.update(frame[:LORES_SIZE[1], :LORES_SIZE[0]])
+        if do_analyse:
+            send_colors(client, analyse(frame))
+        cpu += time.process_time() - start
+
+        frames += 1
+        analysed += do_analyse
+        if seg[2] == "static" and do_analyse:
+            static_analyses += 1
+        if seg[2] in ("spin", "swap") and seg[0] > 0:
+            latency, missed = wake.get(seg[0], (None, 0))
+            if latency is None:
+                # À l'instant exact de la reprise, le disque n'a pas encore bougé
+                moved = t - seg[0] > 1e-6
+                wake[seg[0]] = (t - seg[0], missed) if do_analyse else (None, missed + moved)
+
+        next_t = t + (ACTIVE_PERIOD if mode == "baseline" else gate.period)
+        for event_t, speed in events:
+            if t < event_t <= next_t:
+                now[0] = event_t
+                gate.handle_motor_speed(None, speed)
+                if gate.wakeup.is_set():
+                    # Réveil : l'attente en cours est interrompue
+                    gate.wakeup.clear()
+                    next_t = event_t
+                    break
+        t = next_t
+
+    latencies = [latency for latency, _ in wake.values() if latency is not None]
+    return {
+        'frames': frames,
+        'analysed': analysed,
+        'cpu': cpu,
+        'static_analyses': static_analyses,
+        'max_latency': max(latencies) if latencies else float('nan'),
+        'max_missed': max(missed for _, missed in wake.values()),
+        'duration': total,
+    }
+
+
+def run_phases(mode, noise, client, phases):
+    """Rejoue le scénario pour plusieurs phases de capture ; compteurs moyens, latences max"""
+    runs = [run(mode, noise, client, phase) for phase in phases]
+    result = {key: sum(r[key] for r in runs) / len(runs)
+              for key in ('frames', 'analysed', 'cpu', 'static_analyses', 'duration')}
+    result['max_latency'] = max(r['max_latency'] for r in runs)
+    result['max_missed'] = max(r['max_missed'] for r in runs)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Test de la cadence adaptative de vision.py")
+    parser.add_argument("--noise", type=float, default=1.5, help="Écart-type du bruit capteur (sur 255)")
+    parser.add_argument("--phases", type=int, default=10, help="Nombre de décalages de phase de capture")
+    parser.add_argument("--core-watts", type=float, default=1.5,
+                        help="Puissance d'un cœur occupé, pour l'estimation d'énergie (W)")
+    args = parser.parse_args()
+
+    # Les messages partent vers un port local sans écoute (coût d'envoi réel, sans récepteur)
+    client = udp_client.SimpleUDPClient("127.0.0.1", 9399)
+    phases = [i * IDLE_PERIOD / args.phases for i in range(args.phases)]
+    baseline = run_phases("baseline", args.noise, client, phases)
+    print(f"Scénario de {baseline['duration']:.0f} s, bruit capteur σ={args.noise}, {len(phases)} phases")
+    print(f"{'mode':>10} {'frames':>7} {'analysées':>9} {'CPU':>9} {'CPU/base':>8} "
+          f"{'économie':>9} {'latence max':>11} {'frames ratées':>13} {'à l arrêt':>9}")
+    for mode in ("baseline", "diff", "telemetry"):
+        res = baseline if mode == "baseline" else run_phases(mode, args.noise, client, phases)
+        saved_mw = (baseline['cpu'] - res['cpu']) / res['duration'] * args.core_watts * 1000
+        print(f"{mode:>10} {res['frames']:>7.0f} {res['analysed']:>9.0f} {res['cpu'] * 1000:>6.1f} ms "
+              f"{res['cpu'] / baseline['cpu']:>8.0%} {saved_mw:>6.2f} mW "
+              f"{res['max_latency'] * 1000:>8.0f} ms {res['max_missed']:>13} {res['static_analyses']:>9.0f}")
+    print("latence max : délai entre la reprise du mouvement et la première analyse (au plus une")
+    print("période de capture en veille ; immédiat au redémarrage du moteur avec la télémétrie) ;")
+    print("frames ratées : frames montrant déjà le mouvement mais non analysées (objectif 0) ;")
+    print("à l'arrêt : analyses (et envois OSC) pendant que le disque est arrêté")
+    print("Le CPU mesuré comprend la détection, l'analyse et l'envoi OSC : la réduction de cadence du")
+    print("capteur en veille (15 → 5 images/s) économise en plus le travail du FAI et de libcamera")
+
+
+if __name__ == "__main__":
+    main()
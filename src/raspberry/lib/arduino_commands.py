@@ -0,0 +1,211 @@
+#!/usr/bin/python
+
+"""
+Canal de commandes vers l'Arduino (port série)
+- File bornée, alimentée depuis les threads OSC sans bloquer : l'écriture série
+  est faite par un thread dédié
+- Les commandes d'état (vitesse `v<n>`, balancier `b`) en attente sont fusionnées :
+  seule la dernière de chaque type est envoyée, à la place de la précédente
+- Une seule commande en vol : la suivante part à la réception de l'écho de
+  l'Arduino (accusé) ou après ACK_TIMEOUT ; le tampon série de l'Arduino
+  (64 octets, une commande lue par tour de boucle) ne déborde pas pendant une rafale
+- Latence aller-retour (écriture → écho) et compteurs de la file
+"""
+
+import collections
+import itertools
+import threading
+import time
+
+DEFAULT_QUEUE_SIZE = 16
+ACK_TIMEOUT = 0.5      # Délai maximal d'attente de l'écho d'une commande (s)
+RETRY_DELAY = 0.5      # Attente avant de renvoyer une commande après un échec d'écriture (s)
+STATS_WINDOW = 1000    # Nombre de latences conservées pour les percentiles
+
+# Échos de l'Arduino (début de ligne) accusant réception d'une commande, par type de commande
+ACK_PREFIXES = {
+    'v': ("Vitesse réglée à", "Arrêt progressif demandé", "Changement de direction demandé"),
+    'b': ("Mode balancier du servo activé",),
+}
+
+
+def ack_kind(line):
+    """Type de commande ('v', 'b') accusé par une ligne de l'Arduino, None sinon"""
+    for kind, prefixes in ACK_PREFIXES.items():
+        if line.startswith(prefixes):
+            return kind
+    return None
+
+
+class CommandChannel:
+    """File de commandes série avec fusion, envoi asynchrone et suivi des accusés
+
+    write(command) est appelé depuis le thread d'envoi et renvoie False en cas
+    d'échec (Arduino déconnecté) : la commande est alors conservée et renvoyée.
+    acknowledge est appelé par le lecteur série à chaque écho reconnu.
+    """
+
+    def __init__(self, write, maxsize=DEFAULT_QUEUE_SIZE, ack_timeout=ACK_TIMEOUT, clock=time.monotonic):
+        self.write = write
+        self.maxsize = maxsize
+        self.ack_timeout = ack_timeout
+        self.clock = clock
+        self.__pending = collections.OrderedDict()  # clé → commande, dans l'ordre d'envoi
+        self.__keys = itertools.count()
+        self.__in_flight = None                     # (type, commande, instant d'écriture)
+        self.__cond = threading.Condition()
+        self.__rtts = collections.deque(maxlen=STATS_WINDOW)
+        self.__running = False
+        self.__thread = None
+        self.reset_stats()
+
+    def reset_stats(self):
+        with self.__cond:
+            self.__rtts.clear()
+            self.submitted = 0
+            self.sent = 0
+            self.acked = 0
+            self.coalesced = 0
+            self.rejected = 0
+            self.timeouts = 0
+            self.failed = 0
+
+    def submit(self, command, coalesce=True):
+        """Ajoute une commande sans bloquer ; False si la file est pleine
+
+        Avec coalesce, une commande du même type encore en attente est retirée
+        et la nouvelle placée en fin de file : pour des commandes d'état
+        (vitesse, mode), l'état final de l'Arduino est le même.
+        """
+        kind = command[:1]
+        with self.__cond:
+            self.submitted += 1
+            if coalesce and self.__pending.pop(kind, None) is not None:
+                self.coalesced += 1
+            elif len(self.__pending) >= self.maxsize:
+                self.rejected += 1
+                return False
+            self.__pending[kind if coalesce else (kind, next(self.__keys))] = command
+            self.__cond.notify()
+        return True
+
+    def acknowledge(self, kind, value=None):
+        """Écho reçu pour une commande de type kind ; retourne la latence (s) ou None
+
+        value (vitesse de l'écho) doit correspondre à la commande en vol quand il
+        est fourni : un écho tardif d'une commande expirée n'accuse pas la suivante.
+        """
+        with self.__cond:
+            in_flight = self.__in_flight
+            if in_flight is None or in_flight[0] != kind:
+                return None
+            if value is not None and in_flight[1][1:] != str(value):
+                return None
+            rtt = self.clock() - in_flight[2]
+            self.__in_flight = None
+            self.__rtts.append(rtt)
+            self.acked += 1
+            self.__cond.notify()
+            return rtt
+
+    def pending(self):
+        """Nombre de commandes en attente (hors commande en vol)"""
+        with self.__cond:
+            return len(self.__pending)
+
+    def wait_idle(self, timeout=None):
+        """Attend que la file soit vide et la dernière commande accusée (ou expirée)"""
+        deadline = None if timeout is None else self.clock() + timeout
+        with self.__cond:
+            while self.__pending or self.__in_flight is not None:
+                remaining = None if deadline is None else deadline - self.clock()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self.__cond.wait(remaining if remaining is not None else self.ack_timeout)
+        return True
+
+    def start(self):
+        self.__running = True
+        self.__thread = threading.Thread(target=self.__run, name="arduino-commands", daemon=True)
+        self.__thread.start()
+
+    def stop(self):
+        with self.__cond:
+            self.__running = False
+            self.__cond.notify_all()
+        if self.__thread is not None:
+            self.__thread.join()
+
+    def __next_command(self):
+        """Attend qu'une commande puisse partir ; None à l'arrêt"""
+        with self.__cond:
+            while self.__running:
+                if self.__in_flight is not None:
+                    waited = self.clock() - self.__in_flight[2]
+                    if waited >= self.ack_timeout:
+                        self.timeouts += 1
+                        self.__in_flight = None
+                        self.__cond.notify_all()
+                        continue
+                    self.__cond.wait(self.ack_timeout - waited)
+                elif self.__pending:
+                    key, command = self.__pending.popitem(last=False)
+                    # Instant d'écriture fixé avant l'envoi : l'écho ne peut pas le précéder
+                    self.__in_flight = (command[:1], command, self.clock())
+                    self.sent += 1
+                    return key, command
+                else:
+                    self.__cond.wait()
+            return None
+
+    def __run(self):
+        while True:
+            item = self.__next_command()
+            if item is None:
+                return
+            key, command = item
+            if self.write(command):
+                continue
+            with self.__cond:
+                self.failed += 1
+                self.__in_flight = None
+                # Remise en tête de file, sauf si une commande plus récente l'a remplacée
+                if key not in self.__pending:
+                    self.__pending[key] = command
+                    self.__pending.move_to_end(key, last=False)
+                self.__cond.notify_all()
+                self.__cond.wait(RETRY_DELAY)
+
+    def stats(self):
+        """Compteurs de la file et latence aller-retour (ms) sur la fenêtre glissante"""
+        with self.__cond:
+            rtts = sorted(self.__rtts)
+            counters = {
+                'submitted': self.submitted,
+                'sent': self.sent,
+                'acked': self.acked,
+                'coalesced': self.coalesced,
+                'rejected': self.rejected,
+                'timeouts': self.timeouts,
+                'failed': self.failed,
+                'pending': len(self.__pending),
+            }
+
+        def pct(values, q):
+            return values[min(len(values) - 1, int(q * len(values)))] * 1e3 if values else 0.0
+
+        counters.update({
+            'rtt_p50_ms': pct(rtts, 0.5),
+            'rtt_p99_ms': pct(rtts, 0.99),
+            'rtt_max_ms': rtts[-1] * 1e3 if rtts else 0.0,
+        })
+        return counters
+
+
+def format_command_stats(stats):
+    """Résumé lisible des statistiques du canal de commandes"""
+    return (f"{stats['submitted']} reçues, {stats['sent']} envoyées, {stats['acked']} accusées, "
+            f"fusionnées {stats['coalesced']}, rejetées {stats['rejected']}, "
+            f"sans accusé {stats['timeouts']}, échecs {stats['failed']}, "
+            f"aller-retour p50 {stats['rtt_p50_ms']:.1f} ms / p99 {stats['rtt_p99_ms']:.1f} ms / "
+            f"max {stats['rtt_max_ms']:.1f} ms")
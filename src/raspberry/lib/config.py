@@ -0,0 +1,232 @@
+#!/usr/bin/python
+
+"""
+Configuration réseau partagée par les services (network.json)
+- Lecture et validation une seule fois par processus, résultat mis en cache
+- Surcharges par variables d'environnement, puis par la ligne de commande (prioritaire)
+- Fichier : TOURNE_DISQUE_CONFIG ou --network-config
+- Adresse d'un module : TOURNE_DISQUE_OSC_<MODULE>=ip:port ou --osc module=ip:port
+- Dossier des journaux : TOURNE_DISQUE_LOG_DIR (défaut : logs/ à côté de network.json)
+- Un module déclarant "mirror": "<module>" reçoit aussi tout ce que le routeur envoie à ce module
+- Section "discs" optionnelle : un détecteur par disque, adresses /vision/<disque>/...
+"""
+
+import argparse
+import functools
+import json
+import os
+import re
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+DEFAULT_CONFIG_PATH = BASE_DIR / 'network.json'
+DEFAULT_LOG_DIR = BASE_DIR / 'logs'
+
+CONFIG_ENV = 'TOURNE_DISQUE_CONFIG'
+OSC_ENV_PREFIX = 'TOURNE_DISQUE_OSC_'
+LOG_DIR_ENV = 'TOURNE_DISQUE_LOG_DIR'
+
+# Modules obligatoires de la section "osc"
+REQUIRED_MODULES = ('router',)
+
+# Nom de disque : segment d'adresse OSC (/vision/<disque>/..., /logic/<disque>/...),
+# distinct des segments déjà utilisés après /vision/ et /logic/
+DISC_NAME = re.compile(r"[a-z][a-z0-9_]*")
+RESERVED_DISC_NAMES = frozenset({'color', 'motor', 'servo'})
+
+
+class ConfigError(ValueError):
+    """Configuration réseau absente ou invalide"""
+
+
+def parse_address(text):
+    """Convertit 'ip:port' en (ip, port)"""
+    ip, sep, port = text.rpartition(':')
+    if not sep or not ip:
+        raise ConfigError(f"Adresse invalide (ip:port attendu): {text}")
+    try:
+        port = int(port)
+    except ValueError:
+        raise ConfigError(f"Port invalide: {text}") from None
+    if not 0 < port < 65536:
+        raise ConfigError(f"Port hors limites: {text}")
+    return ip, port
+
+
+def parse_override(text):
+    """Convertit 'module=ip:port' en (module, ip, port)"""
+    name, sep, address = text.partition('=')
+    if not sep or not name:
+        raise ConfigError(f"Surcharge invalide (module=ip:port attendu): {text}")
+    return (name, *parse_address(address))
+
+
+def env_overrides(environ=os.environ):
+    """Surcharges TOURNE_DISQUE_OSC_<MODULE>=ip:port de l'environnement"""
+    overrides = []
+    for key, value in sorted(environ.items()):
+        if key.startswith(OSC_ENV_PREFIX) and len(key) > len(OSC_ENV_PREFIX):
+            overrides.append((key[len(OSC_ENV_PREFIX):].lower(), *parse_address(value)))
+    return tuple(overrides)
+
+
+def validate(config, source):
+    """Vérifie la structure de la configuration ; lève ConfigError au premier défaut"""
+    if not isinstance(config, dict) or not isinstance(config.get('osc'), dict):
+        raise ConfigError(f"{source}: section 'osc' manquante")
+    for name, cfg in config['osc'].items():
+        if not isinstance(cfg, dict):
+            raise ConfigError(f"{source}: osc.{name} doit être un objet")
+        if not isinstance(cfg.get('ip'), str) or not cfg['ip']:
+            raise ConfigError(f"{source}: osc.{name}.ip manquante")
+        port = cfg.get('port')
+        if isinstance(port, bool) or not isinstance(port, int) or not 0 < port < 65536:
+            raise ConfigError(f"{source}: osc.{name}.port invalide ({port!r})")
+    for name, cfg in config['osc'].items():
+        if 'mirror' in cfg and cfg['mirror'] not in config['osc']:
+            raise ConfigError(f"{source}: osc.{name}.mirror: module inconnu '{cfg['mirror']}'")
+    for name in REQUIRED_MODULES:
+        if name not in config['osc']:
+            raise ConfigError(f"{source}: module '{name}' manquant dans la section 'osc'")
+    multicast = config.get('multicast', {})
+    if not isinstance(multicast, dict):
+        raise ConfigError(f"{source}: la section 'multicast' doit être un objet")
+    for name, cfg in multicast.items():
+        if not isinstance(cfg, dict):
+            raise ConfigError(f"{source}: multicast.{name} doit être un objet")
+        if cfg.get('enabled', False):
+            for key in ('group', 'port'):
+                if key not in cfg:
+                    raise ConfigError(f"{source}: multicast.{name}.{key} manquant")
+            unknown = set(cfg.get('members', ())) - set(config['osc'])
+            if unknown:
+                raise ConfigError(f"{source}: multicast.{name}: membres inconnus {sorted(unknown)}")
+    validate_discs(config, source)
+    return config
+
+
+def validate_discs(config, source):
+    discs = config.get('discs', {})
+    if not isinstance(discs, dict):
+        raise ConfigError(f"{source}: la section 'discs' doit être un objet")
+    cameras = set()
+    for index, (name, cfg) in enumerate(discs.items()):
+        if not DISC_NAME.fullmatch(name) or name in RESERVED_DISC_NAMES:
+            raise ConfigError(f"{source}: nom de disque invalide '{name}' (minuscules, chiffres et _)")
+        if not isinstance(cfg, dict):
+            raise ConfigError(f"{source}: discs.{name} doit être un objet")
+        camera = cfg.get('camera', index)
+        if isinstance(camera, bool) or not isinstance(camera, int) or camera < 0 or camera in cameras:
+            raise ConfigError(f"{source}: discs.{name}.camera invalide ou déjà utilisée ({camera!r})")
+        cameras.add(camera)
+        cpu = cfg.get('cpu')
+        if cpu is not None and (isinstance(cpu, bool) or not isinstance(cpu, int) or cpu < 0):
+            raise ConfigError(f"{source}: discs.{name}.cpu invalide ({cpu!r})")
+        destinations = cfg.get('destinations', [])
+        if not isinstance(destinations, list):
+            raise ConfigError(f"{source}: discs.{name}.destinations doit être une liste")
+        unknown = set(destinations) - set(config['osc'])
+        if unknown:
+            raise ConfigError(f"{source}: discs.{name}.destinations: modules inconnus {sorted(unknown)}")
+
+
+def disc_configs(config):
+    """Disques déclarés, dans l'ordre : {'name', 'camera', 'cpu', 'destinations'}
+
+    Liste vide sans section "discs" : un seul disque, adresses sans segment de disque.
+    """
+    return [
+        {
+            'name': name,
+            'camera': cfg.get('camera', index),
+            'cpu': cfg.get('cpu'),
+            'destinations': list(cfg.get('destinations', [])),
+        }
+        for index, (name, cfg) in enumerate(config.get('discs', {}).items())
+    ]
+
+
+def disc_prefix(module, disc=None):
+    """Préfixe des adresses d'un module pour un disque : /vision/a, ou /vision sans disque"""
+    return f"/{module}/{disc}" if disc else f"/{module}"
+
+
+@functools.lru_cache(maxsize=None)
+def _load(path, overrides):
+    try:
+        with open(path, 'r') as f:
+            config = json.load(f)
+    except OSError as e:
+        raise ConfigError(f"Lecture impossible de {path}: {e.strerror}") from None
+    except json.JSONDecodeError as e:
+        raise ConfigError(f"{path}: JSON invalide ({e})") from None
+    osc = config.get('osc') if isinstance(config, dict) else None
+    if isinstance(osc, dict):
+        for name, ip, port in overrides:
+            cfg = osc.get(name)
+            osc[name] = {**(cfg if isinstance(cfg, dict) else {}), 'ip': ip, 'port': port}
+    return validate(config, path)
+
+
+def load_config(path=None, overrides=()):
+    """Configuration réseau validée, lue une seule fois par processus
+
+    path et overrides ((module, ip, port), ...) viennent de la ligne de commande
+    et l'emportent sur l'environnement. Le dictionnaire renvoyé est partagé
+    entre tous les appelants : il ne doit pas être modifié.
+    """
+    path = path or os.environ.get(CONFIG_ENV) or DEFAULT_CONFIG_PATH
+    return _load(os.path.abspath(path), env_overrides() + tuple(overrides))
+
+
+def osc_address(config, name):
+    """Adresse (ip, port) d'un module de la section 'osc'"""
+    try:
+        cfg = config['osc'][name]
+    except KeyError:
+        raise ConfigError(f"Configuration '{name}' non trouvée dans network.json") from None
+    return cfg['ip'], cfg['port']
+
+
+def _override_argument(text):
+    # argparse n'affiche le message que pour ArgumentTypeError
+    try:
+        return parse_override(text)
+    except ConfigError as e:
+        raise argparse.ArgumentTypeError(str(e)) from None
+
+
+def add_config_arguments(parser):
+    """Ajoute --network-config et --osc à un parseur argparse"""
+    group = parser.add_argument_group("configuration réseau")
+    group.add_argument("--network-config", default=None,
+                       help=f"Fichier de configuration (défaut : ${CONFIG_ENV} ou network.json)")
+    group.add_argument("--osc", action="append", default=[], type=_override_argument, metavar="MODULE=IP:PORT",
+                       help=f"Surcharge l'adresse d'un module (prioritaire sur ${OSC_ENV_PREFIX}<MODULE>)")
+    return parser
+
+
+def config_from_args(parser, args):
+    """Charge la configuration selon les arguments ; erreur argparse si elle est invalide"""
+    try:
+        return load_config(args.network_config, args.osc)
+    except ConfigError as e:
+        parser.error(str(e))
+
+
+def add_disc_argument(parser, help="Disque suivi (section 'discs' de network.json, défaut : adresses sans disque)"):
+    """Ajoute --disc (un seul disque, nommé dans la section "discs" de network.json)"""
+    parser.add_argument("--disc", default=None, help=help)
+    return parser
+
+
+def disc_from_args(parser, args, config):
+    """Disque choisi par --disc ; erreur argparse s'il n'est pas déclaré"""
+    if args.disc is not None and args.disc not in {disc['name'] for disc in disc_configs(config)}:
+        parser.error(f"disque inconnu dans la section 'discs' de network.json: {args.disc}")
+    return args.disc
+
+
+def log_dir():
+    """Dossier des journaux (TOURNE_DISQUE_LOG_DIR ou logs/ du projet)"""
+    return Path(os.environ.get(LOG_DIR_ENV) or DEFAULT_LOG_DIR)
@@ -0,0 +1,28 @@
+#!/usr/bin/python
+
+"""
+Constantes partagées entre services, sans dépendance lourde
+- Importable sans NumPy ni OpenCV : valeurs par défaut des options argparse et
+  paramètres du disque utilisés par des services qui n'ont pas besoin du rendu
+- Les modules de rendu (lib/ledring.py, lib/ledrender.py) reprennent ces valeurs
+"""
+
+# Disque
+DEFAULT_SECTORS = 36  # Secteurs angulaires de 10°
+DISC_RPM = 33
+
+# Rendu LED
+DEFAULT_FPS = 120     # Le tramage temporel de l'étage de sortie demande une cadence élevée
+DEFAULT_CURVE = 'gamma'
+DEFAULT_GAMMA = 2.2
+DEFAULT_TRANSITION_MS = 300
+ANIMATION_NAMES = ('solid', 'sectors')
+
+# Moteur musical : adresses des événements émis (routés vers Pure Data par la règle /music_engine/)
+NOTE_ADDRESS = "/music_engine/note"
+CONTROL_ADDRESS = "/music_engine/control/"
+
+# Synthétiseur intégré
+SAMPLE_RATE = 48000
+BLOCK_SIZE = 256            # Échantillons par bloc (5.3 ms à 48 kHz)
+MAX_VOICES = 32             # Polyphonie maximale (vol de la voix la plus ancienne au-delà)
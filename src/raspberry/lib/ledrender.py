@@ -0,0 +1,130 @@
+#!/usr/bin/python
+
+"""
+Rendu des couleurs LED : transitions interpolées, courbes perceptuelles et tramage temporel
+- Les couleurs cibles sont atteintes par interpolation linéaire en un temps configurable (ms),
+  allongé jusqu'à l'intervalle entre deux couleurs reçues ; l'interpolation est calculée
+  à chaque frame du moteur de rendu et non à l'arrivée des couleurs
+- Les valeurs (espace perceptuel, 0-255 en flottant) passent par une table
+  précalculée (gamma ou clarté CIE) vers le niveau PWM en virgule fixe 8.8
+- Le tramage temporel accumule la partie fractionnaire d'une frame à l'autre :
+  la moyenne des niveaux émis reproduit le niveau exact, même pour les couleurs sombres
+"""
+
+import threading
+import time
+
+import numpy as np
+
+from lib.constants import DEFAULT_CURVE, DEFAULT_GAMMA, DEFAULT_TRANSITION_MS
+
+# Table de correspondance : 4096 entrées (12 bits) pour les valeurs d'entrée 0-255
+LUT_BITS = 12
+LUT_SIZE = 1 << LUT_BITS
+LUT_MAX = 255 << 8  # Niveau PWM maximal en virgule fixe 8.8
+
+# Transition adaptative : la durée s'allonge jusqu'à l'intervalle observé entre deux cibles
+MIN_TARGET_INTERVAL = 0.02  # Cibles plus rapprochées : même salve (composantes r, g, b)
+MAX_TRANSITION = 2.0        # Durée maximale d'une transition adaptative (s)
+INTERVAL_SMOOTHING = 0.3
+
+def luminance_curve(curve='gamma', gamma=DEFAULT_GAMMA, size=LUT_SIZE):
+    """Luminance relative (0-1) pour size valeurs perceptuelles réparties sur 0-1
+
+    'gamma' : loi de puissance ; 'cie' : inverse de la clarté CIE L* ;
+    'linear' : valeurs transmises telles quelles (ancien comportement).
+    """
+    x = np.linspace(0.0, 1.0, size)
+    if curve == 'gamma':
+        return x ** gamma
+    if curve == 'cie':
+        lightness = x * 100.0
+        return np.where(lightness > 8.0, ((lightness + 16.0) / 116.0) ** 3, lightness / 903.3)
+    if curve == 'linear':
+        return x
+    raise ValueError(f"Courbe inconnue: {curve}")
+
+def make_lut(curve='gamma', gamma=DEFAULT_GAMMA):
+    """Table valeur perceptuelle → niveau PWM en virgule fixe 8.8 (uint16)"""
+    return np.round(luminance_curve(curve, gamma) * LUT_MAX).astype(np.uint16)
+
+class ColorTransition:
+    """Interpolation linéaire vers la dernière cible en transition_ms
+
+    set_target peut être appelé depuis le thread OSC ; update est appelé à
+    chaque frame par le moteur de rendu, à cadence fixe. En mode adaptatif, la
+    transition dure au moins l'intervalle moyen entre deux cibles : quand les
+    couleurs arrivent plus lentement (vision en veille), le fondu reste continu
+    au lieu de progresser par paliers.
+    """
+
+    def __init__(self, shape, transition_ms=DEFAULT_TRANSITION_MS, adaptive=True, clock=time.monotonic):
+        self.base_duration = transition_ms / 1000.0
+        self.duration = self.base_duration
+        self.adaptive = adaptive
+        self.interval = None  # Intervalle moyen entre deux cibles (s)
+        self.clock = clock
+        self.current = np.zeros(shape, dtype=np.float32)
+        self.__start = np.zeros(shape, dtype=np.float32)
+        self.__target = np.zeros(shape, dtype=np.float32)
+        self.__t0 = clock()
+        self.__lock = threading.Lock()
+
+    def set_target(self, value, t=None):
+        """Nouvelle cible : la transition repart de la valeur affichée à l'instant t"""
+        if t is None:
+            t = self.clock()
+        with self.__lock:
+            self.__interpolate(t)
+            elapsed = t - self.__t0
+            if self.adaptive and elapsed >= MIN_TARGET_INTERVAL:
+                elapsed = min(elapsed, MAX_TRANSITION)
+                if self.interval is None:
+                    self.interval = elapsed
+                else:
+                    self.interval += INTERVAL_SMOOTHING * (elapsed - self.interval)
+                self.duration = max(self.base_duration, self.interval)
+            np.copyto(self.__start, self.current)
+            self.__target[...] = value
+            self.__t0 = t
+
+    def update(self, t):
+        """Valeur interpolée à l'instant t"""
+        with self.__lock:
+            return self.__interpolate(t)
+
+    def __interpolate(self, t):
+        progress = 1.0 if self.duration <= 0 else min(1.0, max(0.0, (t - self.__t0) / self.duration))
+        np.subtract(self.__target, self.__start, out=self.current)
+        self.current *= progress
+        self.current += self.__start
+        return self.current
+
+class DitheredOutput:
+    """Étage de sortie : table perceptuelle précalculée puis tramage temporel vers 8 bits"""
+
+    def __init__(self, shape, curve=DEFAULT_CURVE, gamma=DEFAULT_GAMMA, dither=True):
+        self.lut = make_lut(curve, gamma)
+        self.dither = dither
+        self.__scaled = np.empty(shape, dtype=np.float32)
+        self.__index = np.empty(shape, dtype=np.intp)
+        self.__level = np.empty(shape, dtype=np.uint16)
+        # Reste fractionnaire (< 256) : reste + niveau ≤ 255 + 65280, tient sur 16 bits
+        self.__residual = np.zeros(shape, dtype=np.uint16)
+        self.output = np.empty(shape, dtype=np.uint8)
+
+    def process(self, frame):
+        """Convertit une frame perceptuelle (0-255, flottante) en niveaux PWM 8 bits"""
+        np.multiply(frame, (LUT_SIZE - 1) / 255.0, out=self.__scaled)
+        self.__scaled += 0.5
+        np.clip(self.__scaled, 0, LUT_SIZE - 1, out=self.__scaled)
+        np.copyto(self.__index, self.__scaled, casting='unsafe')
+        np.take(self.lut, self.__index, out=self.__level)
+        if self.dither:
+            self.__residual += self.__level
+            np.right_shift(self.__residual, 8, out=self.output, casting='unsafe')
+            self.__residual &= 0xFF
+        else:
+            self.__level += 0x80  # Arrondi au plus proche
+            np.right_shift(self.__level, 8, out=self.output, casting='unsafe')
+        return self.output
@@ -0,0 +1,426 @@
+#!/usr/bin/python
+
+"""
+Sortie LED pixel par pixel pour l'anneau Neopixel (WS2812)
+- Tampon de frame NumPy préalloué (N pixels × RGB, valeurs perceptuelles 0-255 en flottant)
+- Étage de sortie (lib/ledrender.py) : courbe perceptuelle et tramage temporel vers 8 bits
+- Correspondance entre les secteurs angulaires du disque et les positions de l'anneau
+- Écriture de la frame entière en un seul envoi via un backend interchangeable :
+  SPI (spidev), PWM/DMA (rpi_ws281x) ou simulé (mock)
+- Moteur d'animation à cadence fixe, avec budget CPU par frame
+"""
+
+import collections
+import threading
+import time
+
+import numpy as np
+
+from lib.constants import DEFAULT_FPS, DEFAULT_SECTORS, DEFAULT_TRANSITION_MS, DISC_RPM
+from lib.ledrender import ColorTransition, DitheredOutput
+
+# Budget CPU par défaut (rendu + écriture d'une frame)
+FRAME_BUDGET = 0.002  # 2 ms, soit 24 % d'une frame à 120 FPS
+# Pause minimale après des frames abandonnées : en SCHED_FIFO, time.sleep(0) ne cède le cœur
+# qu'aux threads de même priorité, pas aux threads OSC en temps partagé
+LATE_SLEEP = 0.001
+
+# Signal WS2812 : 800 kHz, chaque bit est codé sur 3 bits SPI à 2.4 MHz
+WS2812_FREQ = 800000
+SPI_SPEED = 3 * WS2812_FREQ
+SPI_RESET_BYTES = 90  # > 280 µs à l'état bas (reset des WS2812B récentes)
+
+# Ordre des canaux transmis (WS2812 : vert, rouge, bleu)
+CHANNEL_ORDERS = {'RGB': (0, 1, 2), 'GRB': (1, 0, 2), 'BGR': (2, 1, 0)}
+
+STATS_WINDOW = 1024
+
+def sector_map(num_pixels, num_sectors, offset=0.0, reverse=False):
+    """Secteur du disque affiché par chaque pixel de l'anneau
+
+    offset : angle (en tours) du pixel 0 par rapport à l'origine du disque ;
+    reverse : anneau câblé dans le sens inverse de la rotation.
+    """
+    turns = (np.arange(num_pixels) + 0.5) / num_pixels
+    if reverse:
+        turns = -turns
+    return (np.floor((turns - offset) * num_sectors) % num_sectors).astype(np.intp)
+
+def angle_to_pixel(angle, num_pixels, offset=0.0, reverse=False):
+    """Pixel de l'anneau situé à un angle donné (en tours) du disque"""
+    turns = (angle + offset) % 1.0
+    if reverse:
+        turns = -turns % 1.0
+    return int(turns * num_pixels) % num_pixels
+
+class WS2812Encoder:
+    """Encode une frame RGB en flux SPI WS2812 (table de 256 motifs de 3 octets)"""
+
+    def __init__(self, num_pixels, order='GRB'):
+        self.num_pixels = num_pixels
+        self.order = np.array(CHANNEL_ORDERS[order], dtype=np.intp)
+
+        # Motif SPI de chaque valeur d'octet : bit 1 → 110, bit 0 → 100
+        shifts = np.arange(7, -1, -1)
+        bits = (np.arange(256)[:, None] >> shifts) & 1
+        words = (np.where(bits, 0b110, 0b100) << (shifts * 3)).sum(axis=1)
+        self.lut = np.stack([(words >> 16) & 0xFF, (words >> 8) & 0xFF, words & 0xFF], axis=1).astype(np.uint8)
+
+        # Tampons préalloués : canaux réordonnés, puis flux SPI suivi du reset
+        self.__ordered = np.empty((num_pixels, 3), dtype=np.uint8)
+        self.buffer = np.zeros(num_pixels * 9 + SPI_RESET_BYTES, dtype=np.uint8)
+        self.__encoded = self.buffer[:num_pixels * 9].reshape(num_pixels * 3, 3)
+
+    def encode(self, frame):
+        """Retourne le flux SPI (vue sur le tampon interne) de la frame"""
+        np.take(frame, self.order, axis=1, out=self.__ordered)
+        np.take(self.lut, self.__ordered.reshape(-1), axis=0, out=self.__encoded)
+        return self.buffer
+
+class MockBackend:
+    """Backend simulé : conserve une copie de la dernière frame écrite"""
+
+    def __init__(self, num_pixels):
+        self.last = np.zeros((num_pixels, 3), dtype=np.uint8)
+        self.writes = 0
+
+    def write(self, frame):
+        np.copyto(self.last, frame)
+        self.writes += 1
+
+    def close(self):
+        pass
+
+class SPIBackend:
+    """Backend SPI (module optionnel spidev) : MOSI (GPIO10) relié à l'entrée de l'anneau
+
+    Toute la frame part en un seul transfert. Au-delà d'environ 450 pixels, le
+    flux dépasse la taille de tampon par défaut du pilote (spidev.bufsiz=4096).
+    """
+
+    def __init__(self, num_pixels, bus=0, device=0, order='GRB'):
+        import spidev  # Dépendance optionnelle, seulement pour la sortie SPI
+        self.encoder = WS2812Encoder(num_pixels, order)
+        self.__spi = spidev.SpiDev()
+        self.__spi.open(bus, device)
+        self.__spi.max_speed_hz = SPI_SPEED
+        self.__spi.mode = 0
+
+    def write(self, frame):
+        self.__spi.writebytes2(self.encoder.encode(frame))
+
+    def close(self):
+        self.__spi.close()
+
+class PWMBackend:
+    """Backend PWM/DMA (module optionnel rpi_ws281x, Raspberry Pi 4 et antérieurs)"""
+
+    def __init__(self, num_pixels, pin=18, dma=10, channel=0, brightness=255):
+        from rpi_ws281x import PixelStrip  # Dépendance optionnelle, seulement pour la sortie PWM
+        self.__strip = PixelStrip(num_pixels, pin, WS2812_FREQ, dma, False, brightness, channel)
+        self.__strip.begin()
+        self.__packed = np.empty(num_pixels, dtype=np.uint32)
+        self.__channel = np.empty(num_pixels, dtype=np.uint32)
+
+    def write(self, frame):
+        # Couleurs empaquetées 0x00RRGGBB (format de rpi_ws281x), puis une seule mise à jour DMA
+        np.left_shift(frame[:, 0], 16, out=self.__packed, dtype=np.uint32)
+        np.left_shift(frame[:, 1], 8, out=self.__channel, dtype=np.uint32)
+        self.__packed |= self.__channel
+        self.__packed |= frame[:, 2]
+        set_pixel = self.__strip.setPixelColor
+        for i, color in enumerate(self.__packed.tolist()):
+            set_pixel(i, color)
+        self.__strip.show()
+
+    def close(self):
+        for i in range(len(self.__packed)):
+            self.__strip.setPixelColor(i, 0)
+        self.__strip.show()
+
+class StripBackend:
+    """Backend du bandeau à couleur unique (LEDStrip, GPIO) vu comme un anneau d'un pixel
+
+    Chaque envoi bit à bit occupe le CPU plusieurs millisecondes : une frame dont
+    les niveaux 8 bits n'ont pas changé (couleur stable) n'est pas renvoyée.
+    """
+
+    def __init__(self, strip):
+        self.strip = strip
+        self.last = None
+        self.writes = 0
+        self.skipped = 0
+
+    def write(self, frame):
+        colour = tuple(frame[0].tolist())
+        if colour == self.last:
+            self.skipped += 1
+            return
+        self.strip.send_colour(*colour)
+        self.last = colour
+        self.writes += 1
+
+    def close(self):
+        self.strip.cleanup()
+
+def open_led_backend(kind, num_pixels, **options):
+    """Ouvre le backend demandé ('spi', 'pwm' ou 'mock') ; repli sur 'mock' si indisponible"""
+    if kind == 'mock':
+        return MockBackend(num_pixels)
+    try:
+        if kind == 'spi':
+            return SPIBackend(num_pixels, **options)
+        if kind == 'pwm':
+            return PWMBackend(num_pixels, **options)
+    except Exception as e:
+        print(f"Backend LED {kind} indisponible ({e}), sortie simulée")
+        return MockBackend(num_pixels)
+    raise ValueError(f"Backend LED inconnu: {kind}")
+
+class LEDRing:
+    """Anneau de N pixels : tampon de frame préalloué écrit en une fois par le backend
+
+    La frame contient des valeurs perceptuelles flottantes ; l'étage de sortie
+    les convertit en niveaux 8 bits (par défaut : arrondi, sans courbe ni tramage).
+    """
+
+    def __init__(self, num_pixels, backend, output=None):
+        self.num_pixels = num_pixels
+        self.backend = backend
+        self.frame = np.zeros((num_pixels, 3), dtype=np.float32)
+        if output is None:
+            output = DitheredOutput(self.frame.shape, curve='linear', dither=False)
+        self.output = output
+
+    def fill(self, rgb):
+        self.frame[:] = rgb
+
+    def set_pixel(self, index, rgb):
+        self.frame[index % self.num_pixels] = rgb
+
+    def show(self):
+        """Convertit et écrit la frame entière"""
+        self.backend.write(self.output.process(self.frame))
+
+    def clear(self):
+        self.frame[:] = 0
+        self.show()
+
+    def close(self):
+        self.clear()
+        self.backend.close()
+
+class SolidAnimation:
+    """Tout l'anneau prend la dernière couleur reçue, atteinte en transition_ms"""
+
+    def __init__(self, num_pixels, transition_ms=DEFAULT_TRANSITION_MS):
+        self.transition = ColorTransition(3, transition_ms)
+
+    def set_color(self, rgb, t=None):
+        self.transition.set_target(rgb, t)
+
+    def set_running(self, running):
+        pass
+
+    def render(self, frame, t):
+        frame[:] = self.transition.update(t)
+
+class SectorAnimation:
+    """L'anneau reproduit les couleurs du disque secteur par secteur, en rotation synchrone
+
+    La caméra est fixe : chaque couleur reçue est celle du secteur du disque qui
+    passe sous la caméra à cet instant. L'angle du disque est estimé à partir de
+    la vitesse de rotation ; l'anneau affiche les secteurs à leur position
+    courante. Les correspondances pixel → secteur sont précalculées pour chaque
+    pas de rotation d'un pixel. Chaque secteur passe à sa nouvelle couleur par
+    une transition linéaire de transition_ms (0 : changement immédiat).
+    """
+
+    def __init__(self, num_pixels, num_sectors=DEFAULT_SECTORS, rpm=DISC_RPM, offset=0.0, reverse=False,
+                 transition_ms=DEFAULT_TRANSITION_MS, clock=time.monotonic):
+        self.num_pixels = num_pixels
+        self.num_sectors = num_sectors
+        self.rpm = rpm
+        self.reverse = reverse
+        self.running = True
+        self.angle = 0.0  # Rotation du disque (en tours)
+        self.duration = transition_ms / 1000.0
+        self.clock = clock
+        self.__last_t = None
+        self.__lock = threading.Lock()
+        self.sectors = np.zeros((num_sectors, 3), dtype=np.float32)  # Couleurs affichées
+        # Transitions par secteur : départ, cible et instant de la dernière couleur reçue
+        self.__start = np.zeros((num_sectors, 3), dtype=np.float32)
+        self.__target = np.zeros((num_sectors, 3), dtype=np.float32)
+        self.__t0 = np.zeros(num_sectors)
+        self.__progress = np.empty((num_sectors, 1), dtype=np.float32)
+        self.__fading = False
+        self.maps = np.stack([
+            sector_map(num_pixels, num_sectors, offset + step / num_pixels, reverse)
+            for step in range(num_pixels)
+        ])
+
+    def set_running(self, running):
+        """Rotation suspendue quand le moteur est arrêté"""
+        self.running = running
+
+    def set_color(self, rgb, t=None):
+        """Enregistre la couleur du secteur actuellement sous la caméra"""
+        if t is None:
+            t = self.clock()
+        sector = int(-self.angle % 1.0 * self.num_sectors) % self.num_sectors
+        with self.__lock:
+            if self.duration <= 0:
+                self.sectors[sector] = rgb
+                return
+            # La transition repart de la couleur affichée (dernière frame rendue)
+            self.__start[sector] = self.sectors[sector]
+            self.__target[sector] = rgb
+            self.__t0[sector] = t
+            self.__fading = True
+
+    def __interpolate(self, t):
+        """Couleurs des secteurs à l'instant t (seulement pendant une transition)"""
+        with self.__lock:
+            if not self.__fading:
+                return
+            np.clip((t - self.__t0) / self.duration, 0.0, 1.0, out=self.__progress[:, 0], casting='unsafe')
+            np.subtract(self.__target, self.__start, out=self.sectors)
+            self.sectors *= self.__progress
+            self.sectors += self.__start
+            self.__fading = bool(self.__progress.min() < 1.0)
+
+    def render(self, frame, t):
+        if self.__last_t is not None and self.running:
+            self.angle = (self.angle + (t - self.__last_t) * self.rpm / 60.0) % 1.0
+        self.__last_t = t
+        self.__interpolate(t)
+        step = int(self.angle * self.num_pixels) % self.num_pixels
+        np.take(self.sectors, self.maps[step], axis=0, out=frame)
+
+ANIMATIONS = {
+    'solid': SolidAnimation,
+    'sectors': SectorAnimation,
+}
+
+class AnimationEngine:
+    """Rend et écrit les frames de l'anneau à cadence fixe dans un thread dédié"""
+
+    def __init__(self, ring, animation, fps=DEFAULT_FPS, budget=FRAME_BUDGET, clock=time.monotonic,
+                 realtime=None):
+        self.ring = ring
+        self.animation = animation
+        self.fps = fps
+        self.budget = budget
+        self.clock = clock
+        self.frame_duration = 1.0 / fps
+        # Mode temps réel (lib.realtime) : thread critique, retard des frames, GC différé
+        self.realtime = realtime
+        self.__lock = threading.Lock()
+        self.__render_times = collections.deque(maxlen=STATS_WINDOW)
+        self.__write_times = collections.deque(maxlen=STATS_WINDOW)
+        self.__cpu_times = collections.deque(maxlen=STATS_WINDOW)
+        self.__running = False
+        self.__thread = None
+        self.frames = 0
+        self.reset_stats()
+
+    def reset_stats(self):
+        with self.__lock:
+            self.__render_times.clear()
+            self.__write_times.clear()
+            self.__cpu_times.clear()
+            self.over_budget = 0
+            self.dropped = 0
+
+    def render_frame(self, t=None):
+        """Rend et écrit une frame ; retourne le temps CPU (s) rendu + écriture
+
+        Le budget porte sur le temps CPU du thread : l'attente de la fin du
+        transfert SPI (durée sur le fil) n'en fait pas partie.
+        """
+        if t is None:
+            t = self.clock()
+        cpu_start = time.thread_time()
+        start = time.perf_counter()
+        self.animation.render(self.ring.frame, t)
+        rendered = time.perf_counter()
+        self.ring.show()
+        written = time.perf_counter()
+        cpu = time.thread_time() - cpu_start
+        self.frames += 1
+        with self.__lock:
+            self.__render_times.append(rendered - start)
+            self.__write_times.append(written - rendered)
+            self.__cpu_times.append(cpu)
+            if cpu > self.budget:
+                self.over_budget += 1
+        return cpu
+
+    def start(self):
+        self.__running = True
+        self.__thread = threading.Thread(target=self.__run, name="led", daemon=True)
+        self.__thread.start()
+
+    def stop(self):
+        self.__running = False
+        if self.__thread is not None:
+            self.__thread.join()
+
+    def __run(self):
+        lateness = None
+        if self.realtime is not None:
+            self.realtime.enter_hot_thread()
+            lateness = self.realtime.histogram("retard frame LED")
+        deadline = self.clock()
+        while self.__running:
+            if lateness is not None:
+                lateness.record(max(0.0, self.clock() - deadline))
+            self.render_frame(deadline)
+            deadline += self.frame_duration
+            delay = deadline - self.clock()
+            if delay > 0:
+                if self.realtime is not None:
+                    # Collecte différée dans le temps libre avant la frame suivante
+                    self.realtime.maybe_collect(delay)
+                    delay = deadline - self.clock()
+                time.sleep(max(0.0, delay))
+            else:
+                # En retard : les frames manquées sont abandonnées, pas rattrapées
+                missed = int(-delay / self.frame_duration)
+                if missed:
+                    with self.__lock:
+                        self.dropped += missed
+                    deadline += missed * self.frame_duration
+                    # Boucle durablement en retard : pause courte pour ne pas affamer les autres threads
+                    time.sleep(LATE_SLEEP)
+
+    def stats(self):
+        """Statistiques de rendu (µs) sur la fenêtre glissante"""
+        with self.__lock:
+            render = sorted(self.__render_times)
+            write = sorted(self.__write_times)
+            cpu = sorted(self.__cpu_times)
+            over_budget, dropped = self.over_budget, self.dropped
+
+        def pct(values, q):
+            return values[min(len(values) - 1, int(q * len(values)))] * 1e6 if values else 0.0
+
+        return {
+            'frames': self.frames,
+            'render_p50_us': pct(render, 0.5),
+            'render_p99_us': pct(render, 0.99),
+            'write_p50_us': pct(write, 0.5),
+            'write_p99_us': pct(write, 0.99),
+            'cpu_p99_us': pct(cpu, 0.99),
+            'over_budget': over_budget,
+            'dropped': dropped,
+        }
+
+def format_ring_stats(stats):
+    """Résumé lisible des statistiques du moteur d'animation"""
+    return (f"{stats['frames']} frames, rendu p50 {stats['render_p50_us']:.0f} µs / "
+            f"p99 {stats['render_p99_us']:.0f} µs, écriture p50 {stats['write_p50_us']:.0f} µs / "
+            f"p99 {stats['write_p99_us']:.0f} µs, CPU p99 {stats['cpu_p99_us']:.0f} µs, "
+            f"hors budget {stats['over_budget']}, "
+            f"frames abandonnées {stats['dropped']}")
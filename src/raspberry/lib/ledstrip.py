@@ -103,10 +103,14 @@ class LEDStrip:
         self.__last_blue = smooth_blue
         
         # Conversion en entiers pour envoi
-        final_red = int(smooth_red)
-        final_green = int(smooth_green)
-        final_blue = int(smooth_blue)
-        
+        self.send_colour(int(smooth_red), int(smooth_green), int(smooth_blue))
+
+    def send_colour(self, final_red, final_green, final_blue):
+        """Envoie une couleur 8 bits telle quelle, sans lissage (protocole exact)
+
+        Utilisé par le moteur de rendu de led_controller.py, qui se charge
+        lui-même des transitions, de la courbe perceptuelle et du tramage.
+        """
         # Commencer exactement comme dans le code Arduino
         self.__send32zero()  # Correspond à begin() dans RGBdriver
         
@@ -0,0 +1,203 @@
+#!/usr/bin/python
+
+"""
+Diffusion OSC en multicast UDP pour les installations multi-machines
+- Groupes multicast optionnels déclarés dans la section "multicast" de network.json
+- Le routeur envoie un seul datagramme par groupe au lieu d'un envoi par destination
+- Chaque message est envoyé dans un bundle OSC contenant un numéro de séquence
+  (/router/seq) qui permet aux récepteurs de compter les pertes ; les bundles déjà
+  horodatés sont transmis tels quels, sans numéro de séquence
+"""
+
+import itertools
+import socket
+import struct
+import threading
+
+from pythonosc import osc_server
+from pythonosc.osc_message_builder import OscMessageBuilder
+
+# Adresse du message de séquence ajouté en tête de chaque bundle multicast
+SEQ_ADDRESS = "/router/seq"
+
+# Modules qui ne savent ni rejoindre un groupe ni décoder le bundle séquencé :
+# toujours servis en unicast, même s'ils figurent parmi les membres d'un groupe
+UNICAST_ONLY = ("puredata",)
+
+# Valeurs par défaut d'un groupe multicast
+DEFAULT_TTL = 1
+DEFAULT_INTERFACE = "0.0.0.0"
+
+# En-tête d'un bundle OSC avec timetag "immédiat" (1)
+_BUNDLE_TAG = b"#bundle\x00"
+_BUNDLE_HEADER = _BUNDLE_TAG + struct.pack(">Q", 1)
+
+
+def load_groups(config):
+    """Retourne les groupes multicast activés de network.json {nom: cfg}"""
+    groups = {}
+    for name, cfg in config.get('multicast', {}).items():
+        if not cfg.get('enabled', False):
+            continue
+        members = tuple(cfg.get('members', ()))
+        excluded = [member for member in members if member in UNICAST_ONLY]
+        if excluded:
+            print(f"Groupe multicast {name}: {', '.join(excluded)} reste(nt) en unicast (pas de réception multicast)")
+        groups[name] = {
+            'group': cfg['group'],
+            'port': cfg['port'],
+            'ttl': cfg.get('ttl', DEFAULT_TTL),
+            'interface': cfg.get('interface', DEFAULT_INTERFACE),
+            'members': tuple(member for member in members if member not in UNICAST_ONLY),
+        }
+    return groups
+
+
+def groups_for_member(config, member):
+    """Retourne les groupes multicast activés auxquels un module est abonné"""
+    return {name: cfg for name, cfg in load_groups(config).items() if member in cfg['members']}
+
+
+def build_message(address, value):
+    """Construit un message OSC (même conversion que SimpleUDPClient.send_message)
+
+    Le message construit une seule fois peut être envoyé à plusieurs clients
+    via leur méthode send().
+    """
+    builder = OscMessageBuilder(address=address)
+    if value is None:
+        values = []
+    elif not isinstance(value, (list, tuple)):
+        values = [value]
+    else:
+        values = value
+    for val in values:
+        builder.add_arg(val)
+    return builder.build()
+
+
+class MulticastSender:
+    """Client OSC qui envoie vers un groupe multicast avec numéro de séquence"""
+
+    def __init__(self, name, group, port, ttl=DEFAULT_TTL, interface=DEFAULT_INTERFACE, loop=True):
+        self.name = name
+        self.group = group
+        self.port = port
+        self.__counter = itertools.count(1)
+        # Message /router/seq pré-construit : seul l'entier final (int32) change
+        self.__seq_prefix = build_message(SEQ_ADDRESS, [name, 0]).dgram[:-4]
+        self.__seq_size = struct.pack(">i", len(self.__seq_prefix) + 4)
+        self.__sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM, socket.IPPROTO_UDP)
+        self.__sock.setsockopt(socket.IPPROTO_IP, socket.IP_MULTICAST_TTL, ttl)
+        # Boucle locale active : les abonnés de la machine du routeur reçoivent aussi le groupe
+        self.__sock.setsockopt(socket.IPPROTO_IP, socket.IP_MULTICAST_LOOP, 1 if loop else 0)
+        if interface != DEFAULT_INTERFACE:
+            self.__sock.setsockopt(socket.IPPROTO_IP, socket.IP_MULTICAST_IF, socket.inet_aton(interface))
+
+    def send(self, message):
+        """Envoie un message OSC déjà construit, encapsulé dans un bundle séquencé
+
+        Un bundle (timetag de music_engine) est transmis tel quel, sans numéro de
+        séquence : l'encapsuler produirait des bundles imbriqués que Pure Data ne
+        sait pas décoder. Retourne le numéro de séquence, None pour un bundle.
+        """
+        msg_dgram = message.dgram
+        if msg_dgram.startswith(_BUNDLE_TAG):
+            self.__sock.sendto(msg_dgram, (self.group, self.port))
+            return None
+        # next() sur itertools.count est atomique : sûr avec le serveur multi-thread du routeur
+        seq = next(self.__counter) & 0x7FFFFFFF
+        packet = b"".join((
+            _BUNDLE_HEADER,
+            self.__seq_size, self.__seq_prefix, struct.pack(">i", seq),
+            struct.pack(">i", len(msg_dgram)), msg_dgram,
+        ))
+        self.__sock.sendto(packet, (self.group, self.port))
+        return seq
+
+    def send_message(self, address, value):
+        """Envoie un message OSC au groupe (même interface que SimpleUDPClient)"""
+        return self.send(build_message(address, value))
+
+    def close(self):
+        self.__sock.close()
+
+
+class SequenceTracker:
+    """Compteur de pertes (trous de séquence) par groupe multicast"""
+
+    def __init__(self, verbose=True):
+        self.verbose = verbose
+        self.__lock = threading.Lock()
+        self.__last = {}
+        self.received = 0
+        self.lost = 0
+        self.reordered = 0
+
+    def handle_seq(self, address, group, seq):
+        """Handler OSC pour /router/seq"""
+        with self.__lock:
+            self.received += 1
+            last = self.__last.get(group)
+            if last is not None:
+                if seq > last + 1:
+                    gap = seq - last - 1
+                    self.lost += gap
+                    if self.verbose:
+                        print(f"Perte multicast détectée sur {group}: {gap} message(s) (total {self.lost})")
+                elif seq <= last:
+                    # Redémarrage du routeur ou datagramme dupliqué / désordonné
+                    self.reordered += 1
+                    if seq == 1:
+                        self.__last[group] = seq
+                    return
+            self.__last[group] = seq
+
+    def stats(self):
+        """Retourne les compteurs de réception"""
+        with self.__lock:
+            return {
+                'received': self.received,
+                'lost': self.lost,
+                'reordered': self.reordered,
+            }
+
+
+class MulticastOSCUDPServer(osc_server.ThreadingOSCUDPServer):
+    """Serveur OSC qui rejoint un groupe multicast (plusieurs abonnés par machine possibles)"""
+
+    allow_reuse_address = True
+
+    def __init__(self, group, port, dispatcher, interface=DEFAULT_INTERFACE):
+        self.group = group
+        self.interface = interface
+        super().__init__((group, port), dispatcher)
+
+    def server_bind(self):
+        if hasattr(socket, "SO_REUSEPORT"):
+            self.socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+        super().server_bind()
+        mreq = struct.pack("4s4s", socket.inet_aton(self.group), socket.inet_aton(self.interface))
+        self.socket.setsockopt(socket.IPPROTO_IP, socket.IP_ADD_MEMBERSHIP, mreq)
+
+
+def start_multicast_listeners(config, member, dispatcher, tracker=None):
+    """Démarre un serveur multicast (thread) par groupe auquel le module est abonné
+
+    Retourne (serveurs, tracker). Le tracker reçoit les messages /router/seq.
+    """
+    groups = groups_for_member(config, member)
+    if not groups:
+        return [], tracker
+    if tracker is None:
+        tracker = SequenceTracker()
+    dispatcher.map(SEQ_ADDRESS, tracker.handle_seq)
+
+    servers = []
+    for name, cfg in groups.items():
+        server = MulticastOSCUDPServer(cfg['group'], cfg['port'], dispatcher, cfg['interface'])
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        servers.append(server)
+        print(f"Abonné au groupe multicast {name} ({cfg['group']}:{cfg['port']})")
+    return servers, tracker
@@ -0,0 +1,214 @@
+#!/usr/bin/python
+
+"""
+Correspondance d'adresses OSC 1.0 (address patterns)
+- Compile une seule fois chaque motif (`*`, `?`, `[a-z]`, `[!a-z]`, `{foo,bar}`)
+- Met en cache le résultat par adresse concrète (LRU borné)
+- Utilisé par la table de routage du routeur et par le dispatcher des services
+"""
+
+import functools
+import re
+
+from pythonosc.dispatcher import Dispatcher
+
+# Taille par défaut du cache LRU (adresses concrètes distinctes)
+DEFAULT_CACHE_SIZE = 1024
+
+# Caractères ayant une signification dans un motif OSC
+PATTERN_CHARS = frozenset("*?[]{}")
+
+
+def is_pattern(address):
+    """Indique si l'adresse contient des caractères de motif OSC"""
+    return not PATTERN_CHARS.isdisjoint(address)
+
+
+def _char_class(body, pattern):
+    """Contenu d'une classe [...] : intervalles a-z conservés, tous les caractères échappés
+
+    ValueError pour une classe vide ou un intervalle inversé (z-a), que re.compile
+    refuserait avec re.error.
+    """
+    if not body:
+        raise ValueError(f"Motif OSC invalide (classe [] vide): {pattern}")
+    parts = []
+    j = 0
+    while j < len(body):
+        if j + 2 < len(body) and body[j + 1] == "-":
+            low, high = body[j], body[j + 2]
+            if low > high:
+                raise ValueError(f"Motif OSC invalide (intervalle {low}-{high} inversé): {pattern}")
+            parts.append(f"{re.escape(low)}-{re.escape(high)}")
+            j += 3
+        else:
+            # '-' en début ou en fin de classe : caractère ordinaire (échappé)
+            parts.append(re.escape(body[j]))
+            j += 1
+    return "".join(parts)
+
+
+def pattern_to_regex(pattern, prefix=False):
+    """Traduit un motif d'adresse OSC en expression régulière Python
+
+    Si prefix est vrai, le motif est comparé au début de l'adresse uniquement
+    (équivalent des règles de routage se terminant par '/').
+    """
+    regex = []
+    i = 0
+    n = len(pattern)
+    while i < n:
+        c = pattern[i]
+        if c == "*":
+            regex.append("[^/]*")
+        elif c == "?":
+            regex.append("[^/]")
+        elif c == "[":
+            end = pattern.find("]", i + 1)
+            if end == -1:
+                raise ValueError(f"Motif OSC invalide (']' manquant): {pattern}")
+            body = pattern[i + 1:end]
+            negate = body.startswith("!")
+            if negate:
+                body = body[1:]
+            regex.append(f"[{'^' if negate else ''}{_char_class(body, pattern)}]")
+            i = end
+        elif c == "{":
+            end = pattern.find("}", i + 1)
+            if end == -1:
+                raise ValueError(f"Motif OSC invalide ('}}' manquant): {pattern}")
+            choices = pattern[i + 1:end].split(",")
+            regex.append("(?:" + "|".join(re.escape(ch) for ch in choices) + ")")
+            i = end
+        else:
+            regex.append(re.escape(c))
+        i += 1
+    if prefix:
+        regex.append(".*")
+    return "".join(regex)
+
+
+def compile_pattern(pattern, prefix=False):
+    """Compile un motif OSC et retourne la fonction de correspondance (fullmatch)"""
+    return re.compile(pattern_to_regex(pattern, prefix), re.DOTALL).fullmatch
+
+
+class RouteTable:
+    """Table de routage OSC avec motifs compilés et cache LRU par adresse
+
+    Ordre de priorité lors de la résolution :
+    1. adresse exacte
+    2. motifs OSC (`*`, `?`, `[...]`, `{...}`), dans l'ordre de déclaration
+    3. préfixes (règles se terminant par '/'), dans l'ordre de déclaration
+    """
+
+    def __init__(self, routes=None, cache_size=DEFAULT_CACHE_SIZE):
+        self.__exact = {}
+        self.__patterns = []
+        self.__prefixes = []
+        self.__routes = {}
+        self.lookup = functools.lru_cache(maxsize=cache_size)(self.__resolve)
+        if routes:
+            for rule, destinations in routes.items():
+                self.add(rule, destinations)
+
+    def add(self, rule, destinations):
+        """Ajoute (ou remplace) une règle de routage et invalide le cache"""
+        destinations = tuple(destinations)
+        if rule in self.__routes:
+            self.remove(rule)
+        self.__routes[rule] = destinations
+
+        if rule.endswith("/"):
+            self.__prefixes.append((rule, compile_pattern(rule, prefix=True), destinations))
+        elif is_pattern(rule):
+            self.__patterns.append((rule, compile_pattern(rule), destinations))
+        else:
+            self.__exact[rule] = destinations
+        self.lookup.cache_clear()
+
+    def remove(self, rule):
+        """Supprime une règle de routage et invalide le cache"""
+        del self.__routes[rule]
+        self.__exact.pop(rule, None)
+        self.__patterns = [p for p in self.__patterns if p[0] != rule]
+        self.__prefixes = [p for p in self.__prefixes if p[0] != rule]
+        self.lookup.cache_clear()
+
+    def __resolve(self, address):
+        """Résout une adresse concrète en (règle, destinations) ou (None, None)"""
+        destinations = self.__exact.get(address)
+        if destinations is not None:
+            return address, destinations
+        for rule, match, destinations in self.__patterns:
+            if match(address):
+                return rule, destinations
+        for rule, match, destinations in self.__prefixes:
+            if match(address):
+                return rule, destinations
+        return None, None
+
+    def items(self):
+        """Retourne les règles dans l'ordre de déclaration"""
+        return self.__routes.items()
+
+    def cache_info(self):
+        """Statistiques du cache LRU (hits, misses, maxsize, currsize)"""
+        return self.lookup.cache_info()
+
+    def __len__(self):
+        return len(self.__routes)
+
+    def __contains__(self, rule):
+        return rule in self.__routes
+
+
+class PatternDispatcher(Dispatcher):
+    """Dispatcher python-osc acceptant des motifs OSC dans map()
+
+    Les motifs sont compilés une seule fois à l'enregistrement et la liste des
+    handlers est mise en cache par adresse concrète, contrairement au
+    Dispatcher standard qui recompile une expression par message reçu.
+    """
+
+    def __init__(self, cache_size=DEFAULT_CACHE_SIZE, **kwargs):
+        super().__init__(**kwargs)
+        self.__matchers = {}
+        self.__cached_handlers = functools.lru_cache(maxsize=cache_size)(self.__resolve)
+
+    def map(self, address, handler, *args, needs_reply_address=False):
+        handlerobj = super().map(address, handler, *args, needs_reply_address=needs_reply_address)
+        if address not in self.__matchers:
+            self.__matchers[address] = compile_pattern(address)
+        self.__cached_handlers.cache_clear()
+        return handlerobj
+
+    def unmap(self, address, handler, *args, needs_reply_address=False):
+        super().unmap(address, handler, *args, needs_reply_address=needs_reply_address)
+        self.__cached_handlers.cache_clear()
+
+    def set_default_handler(self, handler, needs_reply_address=False):
+        super().set_default_handler(handler, needs_reply_address=needs_reply_address)
+        self.__cached_handlers.cache_clear()
+
+    def __resolve(self, address):
+        handlers = []
+        for pattern, match in self.__matchers.items():
+            # Un motif dans l'adresse reçue est aussi accepté (OSC 1.0)
+            if match(address) or (is_pattern(address) and compile_pattern(address)(pattern)):
+                handlers.extend(self._map.get(pattern, ()))
+        if not handlers and self._default_handler:
+            handlers.append(self._default_handler)
+        return tuple(handlers)
+
+    def handlers_for_address(self, address_pattern):
+        """Retourne les handlers correspondant à une adresse (résultat mis en cache)"""
+        try:
+            return self.__cached_handlers(address_pattern)
+        except ValueError:
+            # Motif reçu invalide : aucun handler
+            return ()
+
+    def cache_info(self):
+        """Statistiques du cache LRU (hits, misses, maxsize, currsize)"""
+        return self.__cached_handlers.cache_info()
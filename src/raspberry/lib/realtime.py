@@ -0,0 +1,326 @@
+#!/usr/bin/python
+
+"""
+Mode temps réel des services (faible gigue), commun à tous les scripts
+- Placement sur des cœurs choisis (--cpus) : le processus entier au démarrage, puis
+  chaque thread critique (os.sched_setaffinity agit sur le thread appelant sous Linux)
+- Priorité SCHED_FIFO pour les threads critiques seulement (--rt-priority), quand le
+  système le permet (root, CAP_SYS_NICE ou RLIMIT_RTPRIO) ; sinon priorité normale
+- Ramasse-miettes (--gc) :
+  - freeze : gc.freeze() une fois le service prêt (objets des imports et de la
+    configuration exclus des collectes) et seuil de la génération 0 relevé
+  - deferred : idem, collecte automatique désactivée ; les boucles critiques
+    collectent dans leur temps libre (maybe_collect)
+- Avec une priorité temps réel, intervalle de bascule du GIL réduit : un thread
+  critique réveillé n'attend plus jusqu'à 5 ms qu'un autre thread rende le GIL
+- Histogrammes de gigue (classes logarithmiques) et des pauses du ramasse-miettes,
+  affichés périodiquement par chaque service
+"""
+
+import bisect
+import gc
+import os
+import sys
+import threading
+import time
+
+DEFAULT_PRIORITY = 10       # Priorité SCHED_FIFO avec --realtime (1-99)
+GEN0_THRESHOLD = 2000       # Seuil de la génération 0 après gel (défaut CPython : 700), ~0.2 ms par collecte
+GEN1_EVERY = 10             # Collecte différée de la génération 1 toutes les 10 collectes de la génération 0
+MIN_SLACK = 0.002           # Temps libre minimal pour une collecte différée (s)
+FULL_COLLECT_INTERVAL = 60  # Collecte complète différée toutes les 60 s, dès que le temps libre le permet
+FULL_COLLECT_MARGIN = 2.0   # Temps libre exigé pour une collecte complète : 2 × sa dernière durée mesurée
+SWITCH_INTERVAL = 0.0005    # Bascule du GIL avec une priorité temps réel (défaut CPython : 5 ms)
+STATS_INTERVAL = 60         # Période d'affichage des histogrammes des serveurs OSC (s)
+GC_MODES = ("default", "freeze", "deferred")
+
+# Bornes supérieures des classes d'histogramme (µs) ; dernière classe : au-delà
+JITTER_BINS_US = (10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000, 20000, 50000)
+
+
+def parse_cpus(text):
+    """Convertit '2,3' ou '0-1,3' en ensemble de cœurs"""
+    cpus = set()
+    for part in text.split(','):
+        first, sep, last = part.partition('-')
+        try:
+            cpus.update(range(int(first), int(last) + 1) if sep else (int(first),))
+        except ValueError:
+            raise ValueError(f"Liste de cœurs invalide: {text}") from None
+    if not cpus or min(cpus) < 0:
+        raise ValueError(f"Liste de cœurs invalide: {text}")
+    return frozenset(cpus)
+
+
+class JitterHistogram:
+    """Histogramme de durées (gigue, latence, pauses) en classes logarithmiques"""
+
+    def __init__(self, name, bins=JITTER_BINS_US):
+        self.name = name
+        self.bounds = tuple(b / 1e6 for b in bins)
+        self.__lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self.__lock:
+            self.counts = [0] * (len(self.bounds) + 1)
+            self.count = 0
+            self.max = 0.0
+
+    def record(self, seconds):
+        index = bisect.bisect_left(self.bounds, seconds)
+        with self.__lock:
+            self.counts[index] += 1
+            self.count += 1
+            if seconds > self.max:
+                self.max = seconds
+
+    def percentile(self, q):
+        """Borne supérieure de la classe contenant le quantile q (s), limitée au max mesuré"""
+        with self.__lock:
+            target = q * self.count
+            seen = 0
+            for index, n in enumerate(self.counts):
+                seen += n
+                if n and seen >= target:
+                    return min(self.bounds[index], self.max) if index < len(self.bounds) else self.max
+        return 0.0
+
+    def format(self):
+        """Ligne lisible : nombre, p50/p99/max et répartition des classes non vides"""
+        if not self.count:
+            return f"{self.name}: aucune mesure"
+        with self.__lock:
+            counts, count, worst = list(self.counts), self.count, self.max
+        classes = []
+        for index, n in enumerate(counts):
+            if n:
+                label = (f"<{self.bounds[index] * 1e6:.0f}" if index < len(self.bounds)
+                         else f"≥{self.bounds[-1] * 1e6:.0f}")
+                classes.append(f"{label} µs {n / count:.1%}")
+        return (f"{self.name}: {count} mesures, p50 ≤{self.percentile(0.5) * 1e6:.0f} µs, "
+                f"p99 ≤{self.percentile(0.99) * 1e6:.0f} µs, max {worst * 1e6:.0f} µs | {' | '.join(classes)}")
+
+
+class RealtimeMode:
+    """Réglages temps réel d'un service et histogrammes de gigue
+
+    Sans option, rien n'est modifié (placement, priorité et ramasse-miettes
+    par défaut) mais les histogrammes sont tenus : la comparaison avant/après
+    se fait avec les mêmes mesures.
+    """
+
+    def __init__(self, service, cpus=None, priority=0, gc_mode="default"):
+        self.service = service
+        self.cpus = cpus
+        self.priority = priority
+        self.gc_mode = gc_mode
+        self.histograms = {}
+        self.gc_pauses = self.histogram("pauses GC")
+        self.frozen = 0
+        self.deferred_collections = 0
+        self.__default_threshold = gc.get_threshold()
+        self.__default_switch = sys.getswitchinterval()
+        self.__gc_start = None
+        self.__last_full = time.monotonic()
+        self.__full_duration = 0.0
+        # Collectes différées appelées depuis plusieurs threads critiques : une seule à la fois
+        self.__collect_lock = threading.Lock()
+        gc.callbacks.append(self.__on_gc)
+
+    @property
+    def active(self):
+        return bool(self.cpus or self.priority or self.gc_mode != "default")
+
+    def histogram(self, name):
+        """Histogramme nommé du service (créé au premier appel)"""
+        histogram = self.histograms.get(name)
+        if histogram is None:
+            histogram = self.histograms[name] = JitterHistogram(name)
+        return histogram
+
+    def __on_gc(self, phase, info):
+        if phase == "start":
+            self.__gc_start = time.perf_counter()
+        elif self.__gc_start is not None:
+            self.gc_pauses.record(time.perf_counter() - self.__gc_start)
+            self.__gc_start = None
+
+    def setup_process(self):
+        """Place le processus (et les threads créés ensuite) sur les cœurs choisis"""
+        if self.cpus:
+            self.__set_affinity(self.cpus)
+
+    def __set_affinity(self, cpus):
+        try:
+            os.sched_setaffinity(0, cpus)
+            return True
+        except (AttributeError, OSError) as e:
+            print(f"{self.service}: placement sur les cœurs {sorted(cpus)} impossible ({e})")
+            return False
+
+    def enter_hot_thread(self, cpus=None):
+        """À appeler au début d'un thread critique : cœurs et priorité SCHED_FIFO
+
+        cpus remplace les cœurs du service pour ce thread (ex. un cœur par disque).
+        La priorité ne concerne que le thread appelant : les autres threads du
+        service restent en temps partagé et ne peuvent pas bloquer le système.
+        """
+        name = threading.current_thread().name
+        cpus = cpus or self.cpus
+        if cpus:
+            self.__set_affinity(cpus)
+        if self.priority:
+            try:
+                os.sched_setscheduler(0, os.SCHED_FIFO, os.sched_param(self.priority))
+                print(f"{self.service}: thread {name} en SCHED_FIFO {self.priority}")
+            except (AttributeError, OSError) as e:
+                print(f"{self.service}: priorité temps réel refusée pour {name} ({e}), priorité normale conservée")
+
+    def startup_done(self):
+        """À appeler une fois le service prêt : gel des objets de démarrage et réglage du GC"""
+        if self.priority:
+            sys.setswitchinterval(SWITCH_INTERVAL)
+        if self.gc_mode != "default":
+            gc.collect()
+            gc.freeze()
+            self.frozen = gc.get_freeze_count()
+            # Durée d'une collecte complète hors objets gelés : première estimation pour maybe_collect
+            start = time.perf_counter()
+            gc.collect()
+            self.__full_duration = time.perf_counter() - start
+            gc.set_threshold(GEN0_THRESHOLD, *self.__default_threshold[1:])
+            if self.gc_mode == "deferred":
+                gc.disable()
+            # La collecte complète du démarrage ne compte pas dans les pauses
+            self.gc_pauses.reset()
+        if self.active:
+            print(f"{self.service}: {self.summary()}")
+
+    def close(self):
+        """Rétablit le GC et le GIL par défaut (essais successifs dans un même processus)"""
+        if self.__on_gc in gc.callbacks:
+            gc.callbacks.remove(self.__on_gc)
+        sys.setswitchinterval(self.__default_switch)
+        if self.gc_mode != "default":
+            gc.unfreeze()
+            gc.set_threshold(*self.__default_threshold)
+            gc.enable()
+
+    def maybe_collect(self, slack):
+        """Collecte différée dans le temps libre d'une boucle critique (mode deferred)
+
+        slack : temps disponible avant la prochaine échéance (s). Collecte la
+        génération 0 quand son seuil est atteint, la génération 1 de temps en
+        temps et tout le tas (hors objets gelés) périodiquement, seulement dans
+        un temps libre d'au moins FULL_COLLECT_MARGIN fois la durée mesurée de
+        la précédente. Appelée depuis plusieurs threads : un thread qui trouve
+        une collecte en cours repart sans attendre.
+        """
+        if self.gc_mode != "deferred" or slack < MIN_SLACK:
+            return
+        if not self.__collect_lock.acquire(blocking=False):
+            return
+        try:
+            if (time.monotonic() - self.__last_full >= FULL_COLLECT_INTERVAL
+                    and slack >= self.__full_duration * FULL_COLLECT_MARGIN):
+                start = time.perf_counter()
+                gc.collect()
+                self.__full_duration = time.perf_counter() - start
+                self.__last_full = time.monotonic()
+            elif gc.get_count()[0] >= GEN0_THRESHOLD:
+                gc.collect(1 if self.deferred_collections % GEN1_EVERY == GEN1_EVERY - 1 else 0)
+            else:
+                return
+            self.deferred_collections += 1
+        finally:
+            self.__collect_lock.release()
+
+    def watch_server(self, server, name="traitement OSC", report_interval=STATS_INTERVAL):
+        """Mesure la durée de traitement de chaque datagramme d'un serveur OSC
+
+        Le serveur affiche aussi les histogrammes toutes les report_interval
+        secondes quand il tourne avec serve_forever (service_actions).
+        """
+        histogram = self.histogram(name)
+        finish_request = server.finish_request
+        service_actions = server.service_actions
+        last_report = [time.monotonic()]
+
+        def timed_finish_request(request, client_address):
+            start = time.perf_counter()
+            try:
+                return finish_request(request, client_address)
+            finally:
+                histogram.record(time.perf_counter() - start)
+
+        def report():
+            service_actions()
+            if report_interval and time.monotonic() - last_report[0] >= report_interval:
+                last_report[0] = time.monotonic()
+                self.print_stats()
+
+        server.finish_request = timed_finish_request
+        server.service_actions = report
+        return histogram
+
+    def summary(self):
+        """Réglages appliqués, sur une ligne"""
+        parts = [f"cœurs {','.join(map(str, sorted(self.cpus)))}" if self.cpus else "cœurs non fixés",
+                 f"SCHED_FIFO {self.priority} (threads critiques), bascule GIL {SWITCH_INTERVAL * 1e3:g} ms"
+                 if self.priority else "priorité normale",
+                 f"GC {self.gc_mode}"]
+        if self.frozen:
+            parts.append(f"{self.frozen} objets gelés")
+        return ", ".join(parts)
+
+    def format_stats(self):
+        """Lignes des histogrammes non vides"""
+        return [histogram.format() for histogram in self.histograms.values() if histogram.count]
+
+    def reset_stats(self):
+        for histogram in self.histograms.values():
+            histogram.reset()
+
+    def print_stats(self, reset=True):
+        for line in self.format_stats():
+            print(f"{self.service} gigue - {line}")
+        if reset:
+            self.reset_stats()
+
+
+def _cpus_argument(text):
+    import argparse
+    try:
+        return parse_cpus(text)
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(str(e)) from None
+
+
+def add_realtime_arguments(parser):
+    """Ajoute --realtime, --cpus, --rt-priority et --gc à un parseur argparse"""
+    group = parser.add_argument_group("temps réel")
+    group.add_argument("--realtime", action="store_true",
+                       help=f"Mode faible gigue : SCHED_FIFO {DEFAULT_PRIORITY} si permis et GC gelé/différé")
+    group.add_argument("--cpus", type=_cpus_argument, default=None, metavar="LISTE",
+                       help="Cœurs du service (ex. 2,3 ou 2-3)")
+    group.add_argument("--rt-priority", type=int, default=None, choices=range(0, 100), metavar="0-99",
+                       help="Priorité SCHED_FIFO des threads critiques (0 : temps partagé)")
+    group.add_argument("--gc", choices=GC_MODES, default=None, help="Réglage du ramasse-miettes")
+    return parser
+
+
+def realtime_from_args(service, args, hot_loop=False):
+    """RealtimeMode selon les arguments
+
+    Avec --realtime, le GC est différé dans les services ayant une boucle
+    critique (hot_loop : ils appellent maybe_collect), simplement gelé sinon.
+    """
+    priority = args.rt_priority if args.rt_priority is not None else (DEFAULT_PRIORITY if args.realtime else 0)
+    gc_mode = args.gc or (("deferred" if hot_loop else "freeze") if args.realtime else "default")
+    if gc_mode == "deferred" and not hot_loop:
+        print(f"{service}: pas de boucle critique pour les collectes différées, GC gelé (freeze)")
+        gc_mode = "freeze"
+    mode = RealtimeMode(service, args.cpus, priority, gc_mode)
+    mode.setup_process()
+    return mode
@@ -0,0 +1,302 @@
+#!/usr/bin/python
+
+"""
+Partitions de session : flux couleur horodaté enregistré en colonnes dans un fichier mappé en mémoire
+- Fichier à taille fixe (capacité en enregistrements) : un en-tête de 4 Kio puis une
+  zone contiguë par colonne, alignée sur une page ; l'espace disque est réservé à la
+  création (posix_fallocate) : une page mappée ne peut pas manquer de place à l'écriture
+- Ajout d'un enregistrement : écritures en mémoire uniquement, le noyau écrit les pages
+  sur le disque en arrière-plan ; le compteur d'enregistrements est mis à jour en dernier
+- Lecture : chaque colonne est un tableau NumPy en lecture seule sur le fichier mappé (sans copie)
+- Rotation par taille (capacité) ou par durée ; le fichier suivant est préparé à l'avance
+  par un thread de maintenance, qui vide et ferme aussi les fichiers terminés
+- Disque plein : la rotation par durée est reportée ; un fichier plein sans successeur
+  arrête l'enregistrement (les fichiers déjà écrits restent valides)
+"""
+
+import json
+import mmap
+import os
+import queue
+import struct
+import threading
+import time
+from pathlib import Path
+
+import numpy as np
+
+MAGIC = b"TDSCORE1"
+HEADER_SIZE = 4096
+# En-tête : magique, nombre d'enregistrements, capacité, longueur du JSON de description
+HEADER_FORMAT = "<8sQQI"
+COUNT_OFFSET = 8
+SUFFIX = ".tds"
+
+FLUSH_INTERVAL = 5.0  # Période d'écriture des pages modifiées sur le disque (s)
+
+# Colonnes d'une partition : (nom, type NumPy, forme d'un enregistrement)
+SCORE_COLUMNS = [
+    ('t', 'f8', ()),              # Horodatage (s depuis l'epoch)
+    ('rgb', 'u1', (3,)),          # Couleur brute de vision
+    ('hsv', 'u2', (3,)),          # Couleur brute HSV
+    ('ema_rgb', 'f4', (3,)),      # Valeurs lissées de logic
+    ('ema_hsv', 'f4', (3,)),
+    ('motor_speed', 'i4', ()),    # Vitesse du moteur (pas/s, signe = sens)
+    ('servo_angle', 'i2', ()),    # Angle du servo (degrés)
+    ('angle', 'f4', ()),          # Rotation estimée du disque (tours, 0-1)
+    ('revolution', 'u4', ()),     # Numéro du tour depuis le début de la session
+]
+
+
+def score_columns(sectors=0):
+    """Colonnes d'une partition, avec l'image des secteurs du disque si sectors > 0"""
+    if sectors:
+        return SCORE_COLUMNS + [('sectors', 'u1', (sectors, 3))]
+    return list(SCORE_COLUMNS)
+
+
+def record_size(columns):
+    """Taille d'un enregistrement (octets)"""
+    return sum(np.dtype(dtype).itemsize * int(np.prod(shape)) for _, dtype, shape in columns)
+
+
+def _layout(columns, capacity):
+    """Décalage de chaque colonne et taille totale du fichier"""
+    offsets = []
+    offset = HEADER_SIZE
+    for _, dtype, shape in columns:
+        offsets.append(offset)
+        size = np.dtype(dtype).itemsize * int(np.prod(shape)) * capacity
+        offset += -(-size // mmap.PAGESIZE) * mmap.PAGESIZE
+    return offsets, offset
+
+
+def _views(buf, columns, offsets, capacity):
+    return {
+        name: np.frombuffer(buf, dtype, capacity * int(np.prod(shape)), offset).reshape((capacity, *shape))
+        for (name, dtype, shape), offset in zip(columns, offsets)
+    }
+
+
+class ScoreWriter:
+    """Fichier de partition ouvert en écriture (un seul écrivain)"""
+
+    def __init__(self, path, columns, capacity, meta=None):
+        self.path = Path(path)
+        self.columns = columns
+        self.capacity = capacity
+        offsets, size = _layout(columns, capacity)
+        description = json.dumps({
+            'columns': [[name, dtype, list(shape), offset] for (name, dtype, shape), offset in zip(columns, offsets)],
+            'meta': meta or {},
+        }).encode()
+        if struct.calcsize(HEADER_FORMAT) + len(description) > HEADER_SIZE:
+            raise ValueError("Description de la partition trop longue pour l'en-tête")
+        with open(self.path, 'w+b') as f:
+            # Fichier creux : une page écrite sans place sur le disque provoquerait un SIGBUS
+            # dans le processus ; la réservation échoue ici, avec une OSError
+            try:
+                os.posix_fallocate(f.fileno(), 0, size)
+            except OSError:
+                self.path.unlink()
+                raise
+            self.__mm = mmap.mmap(f.fileno(), size)
+        self.__mm[:struct.calcsize(HEADER_FORMAT)] = struct.pack(HEADER_FORMAT, MAGIC, 0, capacity, len(description))
+        start = struct.calcsize(HEADER_FORMAT)
+        self.__mm[start:start + len(description)] = description
+        self.__count = np.frombuffer(self.__mm, np.uint64, 1, COUNT_OFFSET)
+        self.__views = _views(self.__mm, columns, offsets, capacity)
+        self.count = 0
+        self.created = time.time()
+
+    @property
+    def full(self):
+        return self.count >= self.capacity
+
+    def append(self, row):
+        """Ajoute un enregistrement {colonne: valeur} ; les colonnes absentes restent à zéro"""
+        i = self.count
+        for name, view in self.__views.items():
+            if name in row:
+                view[i] = row[name]
+        # Compteur publié après les données : un lecteur ne voit que des enregistrements complets
+        self.count = i + 1
+        self.__count[0] = self.count
+
+    def flush(self):
+        self.__mm.flush()
+
+    def close(self):
+        if self.__mm.closed:
+            return
+        self.__views = {}
+        self.__count = None
+        self.__mm.flush()
+        self.__mm.close()
+
+
+class ScoreFile:
+    """Partition ouverte en lecture : colonnes NumPy sans copie sur le fichier mappé
+
+    Les enregistrements ajoutés après l'ouverture (fichier en cours d'écriture)
+    ne sont pas visibles : rouvrir le fichier pour les lire.
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        with open(self.path, 'rb') as f:
+            self.__mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, count, capacity, length = struct.unpack_from(HEADER_FORMAT, self.__mm)
+        if magic != MAGIC:
+            raise ValueError(f"{path}: fichier de partition invalide")
+        start = struct.calcsize(HEADER_FORMAT)
+        description = json.loads(self.__mm[start:start + length])
+        self.meta = description['meta']
+        self.capacity = capacity
+        self.count = count
+        self.columns = {}
+        for name, dtype, shape, offset in description['columns']:
+            size = count * int(np.prod(shape))
+            self.columns[name] = np.frombuffer(self.__mm, dtype, size, offset).reshape((count, *shape))
+
+    def __len__(self):
+        return self.count
+
+    def __getitem__(self, name):
+        return self.columns[name]
+
+    def revolution_ends(self):
+        """Indice du dernier enregistrement de chaque tour complet du disque"""
+        revolution = self.columns['revolution']
+        return np.flatnonzero(revolution[1:] != revolution[:-1])
+
+    def per_revolution(self, name):
+        """Valeurs de la colonne à la fin de chaque tour (ex. 'sectors' : partition du tour)"""
+        return self.columns[name][self.revolution_ends()]
+
+
+def open_scores(paths):
+    """Ouvre plusieurs partitions (session découpée par la rotation), dans l'ordre des noms"""
+    return [ScoreFile(path) for path in sorted(paths)]
+
+
+class RotatingScoreRecorder:
+    """Enregistreur avec rotation : nouveau fichier quand le courant est plein ou trop ancien
+
+    append ne fait que des écritures en mémoire : la préparation du fichier
+    suivant, l'écriture des pages sur le disque et la fermeture des fichiers
+    terminés sont faites par un thread de maintenance.
+    """
+
+    def __init__(self, directory, columns, capacity, max_age=None, prefix="score", meta=None,
+                 flush_interval=FLUSH_INTERVAL):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.columns = columns
+        self.capacity = capacity
+        self.max_age = max_age
+        self.prefix = prefix
+        self.meta = meta
+        self.flush_interval = flush_interval
+        self.files = []              # Fichiers de la session, dans l'ordre
+        self.rotations = 0
+        self.sync_prepared = 0       # Fichiers préparés dans le chemin d'écriture (fichier suivant pas prêt)
+        self.failed_rotations = 0    # Fichier suivant impossible à créer (disque plein)
+        self.stopped = False         # Fichier plein sans successeur : les enregistrements sont perdus
+        self.dropped = 0
+        # Fichiers préparés d'un enregistreur interrompu : jamais activés, donc vides
+        for stale in self.directory.glob(f".{prefix}-next-*{SUFFIX}"):
+            stale.unlink()
+        self.__spare = None
+        self.__spare_ready = threading.Event()
+        self.__tasks = queue.Queue()
+        self.__running = True
+        self.__thread = threading.Thread(target=self.__maintenance, name="score-maintenance", daemon=True)
+        self.__thread.start()
+        self.writer = None
+        self.__activate(self.__prepare())
+        self.__tasks.put('prepare')
+
+    def __prepare(self):
+        path = self.directory / f".{self.prefix}-next-{os.getpid()}-{time.monotonic_ns()}{SUFFIX}"
+        return ScoreWriter(path, self.columns, self.capacity, self.meta)
+
+    def __activate(self, writer):
+        """Renomme le fichier préparé d'après l'heure de début et en fait le fichier courant"""
+        stamp = time.strftime("%Y%m%d-%H%M%S")
+        path = self.directory / f"{self.prefix}-{stamp}-{len(self.files):04d}{SUFFIX}"
+        os.rename(writer.path, path)
+        writer.path = path
+        writer.created = time.time()
+        self.files.append(path)
+        self.writer = writer
+
+    def append(self, row):
+        if self.stopped:
+            self.dropped += 1
+            return
+        writer = self.writer
+        if writer.full or (self.max_age is not None and time.time() - writer.created >= self.max_age):
+            if not self.rotate():
+                if writer.full:
+                    print(f"Enregistreur: fichier {writer.path.name} plein sans successeur, enregistrement arrêté")
+                    self.stopped = True
+                    self.dropped += 1
+                    return
+                # Rotation par durée reportée : le fichier courant a encore de la place
+                writer.created = time.time()
+        self.writer.append(row)
+
+    def rotate(self):
+        """Passe au fichier suivant (préparé à l'avance si possible) ; False si impossible à créer"""
+        retired = self.writer
+        if self.__spare_ready.is_set():
+            spare, self.__spare = self.__spare, None
+            self.__spare_ready.clear()
+        else:
+            try:
+                spare = self.__prepare()
+            except OSError as e:
+                print(f"Enregistreur: fichier suivant impossible à créer ({e}), rotation abandonnée")
+                self.failed_rotations += 1
+                self.__tasks.put('prepare')
+                return False
+            self.sync_prepared += 1
+        self.__activate(spare)
+        self.rotations += 1
+        self.__tasks.put(('close', retired))
+        self.__tasks.put('prepare')
+        return True
+
+    def __maintenance(self):
+        while self.__running:
+            try:
+                task = self.__tasks.get(timeout=self.flush_interval)
+            except queue.Empty:
+                task = 'flush'
+            try:
+                if task == 'flush':
+                    self.writer.flush()
+                elif task == 'prepare':
+                    if self.__spare is None and not self.__spare_ready.is_set():
+                        self.__spare = self.__prepare()
+                        self.__spare_ready.set()
+                elif task == 'stop':
+                    return
+                else:
+                    task[1].close()
+            except (OSError, ValueError) as e:
+                # Fichier fermé entre-temps, ou disque plein : sans fichier préparé,
+                # la prochaine rotation le crée elle-même ou est abandonnée (voir append)
+                print(f"Enregistreur: maintenance '{task if isinstance(task, str) else task[0]}' échouée: {e}")
+
+    def close(self):
+        """Ferme le fichier courant et supprime le fichier préparé inutilisé"""
+        self.__tasks.put('stop')
+        self.__thread.join()
+        self.__running = False
+        self.writer.close()
+        if self.__spare is not None:
+            self.__spare.close()
+            os.unlink(self.__spare.path)
+            self.__spare = None
@@ -0,0 +1,98 @@
+#!/usr/bin/python
+
+"""
+Profil de démarrage des services
+- Temps écoulés depuis le lancement du processus (/proc/self/stat) : interpréteur,
+  imports, configuration, puis chaque étape marquée par le service jusqu'à « prêt »
+- Délai jusqu'au premier message OSC reçu (dispatcher) ou envoyé (client)
+- Une ligne par service au démarrage ; `python -X importtime` détaille les imports
+"""
+
+import os
+import threading
+import time
+
+
+def _boot_clock():
+    """Horloge depuis le démarrage du système, même origine que /proc/self/stat"""
+    return time.clock_gettime(time.CLOCK_BOOTTIME)
+
+
+def process_start_time():
+    """Instant de lancement du processus sur l'horloge _boot_clock, None hors Linux"""
+    try:
+        with open('/proc/self/stat') as f:
+            # Le nom du processus (2e champ) peut contenir des espaces : on repart de ')'
+            fields = f.read().rsplit(')', 1)[1].split()
+        return int(fields[19]) / os.sysconf('SC_CLK_TCK')  # starttime, 22e champ
+    except (OSError, ValueError, IndexError, AttributeError):
+        return None
+
+
+class StartupProfiler:
+    """Chronologie du démarrage d'un service
+
+    Créé le plus tôt possible dans le script (après les imports de la bibliothèque
+    standard) ; le temps écoulé avant sa création est attribué à l'interpréteur.
+    """
+
+    def __init__(self, service):
+        self.service = service
+        start = process_start_time() if hasattr(time, 'CLOCK_BOOTTIME') else None
+        if start is None:
+            # Sans /proc : origine à la création du profil
+            self.clock = time.monotonic
+            self.start = self.clock()
+        else:
+            self.clock = _boot_clock
+            self.start = start
+        self.phases = [("interpréteur", self.clock())]
+        self.first = None
+        self.__lock = threading.Lock()
+
+    def mark(self, phase):
+        """Termine l'étape phase (durée depuis la marque précédente)"""
+        self.phases.append((phase, self.clock()))
+
+    def ready(self, phase="initialisation"):
+        """Termine la dernière étape et affiche le temps de démarrage"""
+        self.mark(phase)
+        print(f"Démarrage {self.service}: {self.format()}")
+
+    def elapsed(self, t=None):
+        """Temps écoulé depuis le lancement du processus (s)"""
+        return (self.clock() if t is None else t) - self.start
+
+    def format(self):
+        steps = []
+        previous = self.start
+        for phase, t in self.phases:
+            steps.append(f"{phase} {(t - previous) * 1000:.0f} ms")
+            previous = t
+        return f"prêt en {self.elapsed(previous) * 1000:.0f} ms ({', '.join(steps)})"
+
+    def first_message(self, direction="reçu"):
+        """Enregistre le premier message (une seule fois) et l'affiche"""
+        with self.__lock:
+            if self.first is not None:
+                return
+            self.first = self.clock()
+        print(f"Démarrage {self.service}: premier message {direction} après {self.elapsed(self.first) * 1000:.0f} ms")
+
+    def watch(self, obj, method="call_handlers_for_packet", direction="reçu"):
+        """Détecte le premier appel de obj.method (dispatcher OSC ou send_message d'un client)
+
+        La méthode d'origine est rétablie dès le premier appel : aucun coût ensuite.
+        """
+        original = getattr(obj, method)
+
+        def first_call(*args, **kwargs):
+            try:
+                delattr(obj, method)
+            except AttributeError:
+                pass
+            self.first_message(direction)
+            return original(*args, **kwargs)
+
+        setattr(obj, method, first_call)
+        return obj
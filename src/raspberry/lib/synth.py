@@ -0,0 +1,316 @@
+#!/usr/bin/python
+
+"""
+Synthétiseur NumPy intégré de music_engine.py (--audio synth)
+- Voix en tableaux NumPy : oscillateurs, enveloppes et filtre passe-bas calculés par blocs
+- Sorties : carte son (module optionnel sounddevice), fichier WAV ou sortie nulle
+- Importé seulement par le backend synth : le service sans --audio synth ne charge pas ce module
+"""
+
+import collections
+import threading
+import time
+import wave
+
+import numpy as np
+
+from lib.constants import BLOCK_SIZE, CONTROL_ADDRESS, MAX_VOICES, NOTE_ADDRESS, SAMPLE_RATE
+
+ATTACK = 0.005              # Attaque (s)
+RELEASE = 0.15              # Constante de temps du relâchement (s)
+FILTER_TAPS = 31            # Longueur du filtre passe-bas FIR
+FILTER_CUTOFF = (500.0, 8000.0)  # Fréquence de coupure min/max selon le timbre (Hz)
+OUTPUT_LATENCY = 0.05       # Avance du flux audio sur l'horloge des événements (s)
+STATS_WINDOW = 2048         # Nombre de temps de rendu conservés pour les percentiles
+
+
+class BlockSynth:
+    """Synthétiseur polyphonique rendu par blocs de taille fixe
+
+    Les voix sont stockées en tableaux NumPy (une ligne par voix) : oscillateur
+    (mélange sinus / dent de scie selon le timbre), enveloppe attaque /
+    relâchement exponentiel et filtre passe-bas FIR sur le mix sont calculés
+    pour tout le bloc en quelques opérations vectorisées.
+    """
+
+    def __init__(self, sample_rate=SAMPLE_RATE, block_size=BLOCK_SIZE, max_voices=MAX_VOICES):
+        self.sample_rate = sample_rate
+        self.block_size = block_size
+        self.max_voices = max_voices
+        self.__n = np.arange(block_size, dtype=np.float64)
+
+        # État des voix
+        self.active = np.zeros(max_voices, dtype=bool)
+        self.inc = np.zeros(max_voices)          # Incrément de phase par échantillon
+        self.phase = np.zeros(max_voices)
+        self.amp = np.zeros(max_voices)
+        self.age = np.zeros(max_voices)          # Échantillons depuis le début de la note
+        self.length = np.zeros(max_voices)       # Durée de la note (échantillons)
+        self.attack = ATTACK * sample_rate
+        self.release = RELEASE * sample_rate
+
+        # Contrôles
+        self.timbre = 0.5
+        self.gain = 0.3
+        self.__kernels = {}
+        self.__kernel = self.__lowpass(self.timbre)
+        self.__history = np.zeros(FILTER_TAPS - 1)
+        self.peak_voices = 0
+
+    def __lowpass(self, timbre):
+        """Noyau FIR passe-bas (sinc fenêtré) ; mis en cache par timbre quantifié"""
+        key = int(timbre * 32)
+        kernel = self.__kernels.get(key)
+        if kernel is None:
+            low, high = FILTER_CUTOFF
+            cutoff = low * (high / low) ** (key / 32) / self.sample_rate
+            taps = np.arange(FILTER_TAPS) - (FILTER_TAPS - 1) / 2
+            kernel = 2 * cutoff * np.sinc(2 * cutoff * taps) * np.hamming(FILTER_TAPS)
+            kernel /= kernel.sum()
+            self.__kernels[key] = kernel
+        return kernel
+
+    def set_timbre(self, timbre):
+        self.timbre = min(1.0, max(0.0, timbre))
+        self.__kernel = self.__lowpass(self.timbre)
+
+    def note_on(self, pitch, velocity, duration, offset=0):
+        """Démarre une voix ; offset = position de départ dans le prochain bloc (échantillons)"""
+        free = np.flatnonzero(~self.active)
+        voice = free[0] if free.size else int(np.argmax(self.age))
+        self.active[voice] = True
+        self.inc[voice] = 440.0 * 2 ** ((pitch - 69) / 12) / self.sample_rate
+        self.phase[voice] = 0.0
+        self.amp[voice] = velocity / 127.0
+        self.age[voice] = -offset
+        self.length[voice] = duration * self.sample_rate
+
+    def render(self):
+        """Calcule un bloc mono float32 dans [-1, 1]"""
+        mix = np.zeros(self.block_size)
+        voices = np.flatnonzero(self.active)
+        if voices.size:
+            self.peak_voices = max(self.peak_voices, voices.size)
+            age = self.age[voices]
+            inc = self.inc[voices]
+            t = age[:, None] + self.__n
+            # Phase nulle au début de la note (une voix peut démarrer au milieu du bloc)
+            started = np.maximum(age, 0.0)
+            phase = (self.phase[voices, None] + inc[:, None] * (np.maximum(t, 0.0) - started[:, None])) % 1.0
+            sine = np.sin(2 * np.pi * phase)
+            saw = 2.0 * phase - 1.0
+            wave_ = sine + self.timbre * (saw - sine)
+
+            attack = np.clip(t / self.attack, 0.0, 1.0)
+            tail = t - self.length[voices, None]
+            release = np.exp(-np.maximum(tail, 0.0) / self.release)
+            mix = (wave_ * (attack * release * self.amp[voices, None])).sum(axis=0)
+
+            self.phase[voices] = (self.phase[voices] + inc * (np.maximum(age + self.block_size, 0.0) - started)) % 1.0
+            self.age[voices] += self.block_size
+            done = voices[self.age[voices] - self.length[voices] > 6 * self.release]
+            self.active[done] = False
+
+        # Filtre passe-bas FIR avec continuité entre blocs
+        padded = np.concatenate((self.__history, mix))
+        self.__history = padded[-(FILTER_TAPS - 1):]
+        out = np.convolve(padded, self.__kernel, mode='valid')
+        return np.tanh(out * self.gain).astype(np.float32)
+
+
+class NullSink:
+    """Sortie audio nulle (tests headless)"""
+
+    paced_by_device = False
+
+    def write(self, block):
+        return False
+
+    def close(self):
+        pass
+
+
+class WavSink:
+    """Sortie audio vers un fichier WAV mono 16 bits"""
+
+    paced_by_device = False
+
+    def __init__(self, path, sample_rate=SAMPLE_RATE):
+        self.__wav = wave.open(str(path), 'wb')
+        self.__wav.setnchannels(1)
+        self.__wav.setsampwidth(2)
+        self.__wav.setframerate(sample_rate)
+
+    def write(self, block):
+        self.__wav.writeframes((block * 32767).astype('<i2').tobytes())
+        return False
+
+    def close(self):
+        self.__wav.close()
+
+
+class DeviceSink:
+    """Sortie vers la carte son (module optionnel sounddevice)"""
+
+    paced_by_device = True
+
+    def __init__(self, sample_rate=SAMPLE_RATE, block_size=BLOCK_SIZE):
+        import sounddevice  # Dépendance optionnelle, seulement pour la sortie carte son
+        self.__stream = sounddevice.OutputStream(
+            samplerate=sample_rate, blocksize=block_size, channels=1, dtype='float32')
+        self.__stream.start()
+
+    def write(self, block):
+        """Écriture bloquante (cadencée par la carte son) ; retourne True en cas de sous-alimentation"""
+        return bool(self.__stream.write(block.reshape(-1, 1)))
+
+    def close(self):
+        self.__stream.stop()
+        self.__stream.close()
+
+
+def open_audio_sink(kind, wav_path=None, sample_rate=SAMPLE_RATE, block_size=BLOCK_SIZE):
+    """Ouvre la sortie audio demandée ('auto' : carte son si présente, sinon sortie nulle)"""
+    if kind == 'wav':
+        return WavSink(wav_path, sample_rate)
+    if kind == 'null':
+        return NullSink()
+    try:
+        return DeviceSink(sample_rate, block_size)
+    except Exception as e:
+        if kind == 'device':
+            raise
+        print(f"Carte son indisponible ({e}), sortie audio nulle")
+        return NullSink()
+
+
+class SynthBackend:
+    """Backend audio intégré : reçoit les événements horodatés et rend les blocs
+
+    `send` a la même signature que l'envoi de bundles vers Pure Data et peut
+    donc être branché directement sur le LookaheadScheduler. Les événements
+    sont placés à l'échantillon près dans le bloc qui couvre leur échéance.
+    """
+
+    def __init__(self, synth, sink, realtime=True, clock=time.monotonic, realtime_mode=None):
+        self.synth = synth
+        self.sink = sink
+        self.realtime = realtime
+        self.clock = clock
+        # Mode temps réel du service (lib.realtime), distinct de la cadence simulée `realtime`
+        self.realtime_mode = realtime_mode
+        self.block_duration = synth.block_size / synth.sample_rate
+        self.__pending = collections.deque()
+        self.__queue = []
+        self.__running = False
+        self.__thread = None
+        self.__lock = threading.Lock()
+        self.__render_times = collections.deque(maxlen=STATS_WINDOW)
+        self.start_time = clock() + OUTPUT_LATENCY
+        self.blocks = 0
+        self.reset_stats()
+
+    def reset_stats(self):
+        with self.__lock:
+            self.__render_times.clear()
+            self.underruns = 0
+            self.late_events = 0
+            self.synth.peak_voices = 0
+
+    def send(self, events, timestamp):
+        """Reçoit une liste d'événements ; timestamp en temps système (comme un timetag OSC)"""
+        # deque.append est atomique : appelé depuis le thread du planificateur
+        self.__pending.append((timestamp - (time.time() - self.clock()), events))
+
+    def __apply_events(self, block_start):
+        """Déclenche les événements dont l'échéance tombe dans le bloc courant"""
+        while self.__pending:
+            self.__queue.append(self.__pending.popleft())
+        if not self.__queue:
+            return
+        block_end = block_start + self.block_duration
+        remaining = []
+        for when, events in self.__queue:
+            if when >= block_end:
+                remaining.append((when, events))
+                continue
+            if when < block_start:
+                self.late_events += len(events)
+            offset = max(0, int((when - block_start) * self.synth.sample_rate))
+            for address, value in events:
+                if address == NOTE_ADDRESS:
+                    pitch, velocity, duration_ms = value
+                    self.synth.note_on(pitch, velocity, duration_ms / 1000.0, offset)
+                elif address == CONTROL_ADDRESS + "timbre":
+                    self.synth.set_timbre(value)
+        self.__queue = remaining
+
+    def render_block(self):
+        """Rend et écrit un bloc ; retourne le temps de rendu (s)"""
+        block_start = self.start_time + self.blocks * self.block_duration
+        start = time.perf_counter()
+        self.__apply_events(block_start)
+        block = self.synth.render()
+        elapsed = time.perf_counter() - start
+        underflow = self.sink.write(block)
+        self.blocks += 1
+        with self.__lock:
+            self.__render_times.append(elapsed)
+            if underflow or elapsed > self.block_duration:
+                self.underruns += 1
+        return elapsed
+
+    def start(self):
+        self.start_time = self.clock() + OUTPUT_LATENCY
+        self.blocks = 0
+        self.__running = True
+        self.__thread = threading.Thread(target=self.__run, name="synth", daemon=True)
+        self.__thread.start()
+
+    def stop(self):
+        self.__running = False
+        if self.__thread is not None:
+            self.__thread.join()
+        self.sink.close()
+
+    def __run(self):
+        if self.realtime_mode is not None:
+            self.realtime_mode.enter_hot_thread()
+        while self.__running:
+            self.render_block()
+            if self.realtime and not self.sink.paced_by_device:
+                # Sortie sans horloge propre (WAV, nulle) : cadence temps réel simulée
+                deadline = self.start_time + self.blocks * self.block_duration - OUTPUT_LATENCY
+                delay = deadline - self.clock()
+                if delay > 0:
+                    if self.realtime_mode is not None:
+                        self.realtime_mode.maybe_collect(delay)
+                    time.sleep(max(0.0, deadline - self.clock()))
+                elif delay < -self.block_duration:
+                    with self.__lock:
+                        self.underruns += 1
+
+    def stats(self):
+        """Statistiques de rendu (durées en millisecondes)"""
+        with self.__lock:
+            times = sorted(self.__render_times)
+            return {
+                'blocks': self.blocks,
+                'budget_ms': self.block_duration * 1000,
+                'render_mean_ms': sum(times) / len(times) * 1000 if times else 0.0,
+                'render_p99_ms': times[min(len(times) - 1, int(0.99 * len(times)))] * 1000 if times else 0.0,
+                'render_max_ms': times[-1] * 1000 if times else 0.0,
+                'underruns': self.underruns,
+                'late_events': self.late_events,
+                'peak_voices': self.synth.peak_voices,
+            }
+
+
+def format_synth_stats(stats):
+    """Mise en forme d'une ligne de statistiques du synthétiseur"""
+    load = stats['render_p99_ms'] / stats['budget_ms'] * 100 if stats['budget_ms'] else 0.0
+    return (f"blocs={stats['blocks']} rendu moyen={stats['render_mean_ms']:.3f} ms "
+            f"p99={stats['render_p99_ms']:.3f} ms max={stats['render_max_ms']:.3f} ms "
+            f"(budget {stats['budget_ms']:.2f} ms, charge p99 {load:.0f} %) "
+            f"sous-alimentations={stats['underruns']} tardifs={stats['late_events']} "
+            f"voix max={stats['peak_voices']}")
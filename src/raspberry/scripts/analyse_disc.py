@@ -0,0 +1,324 @@
+#!/usr/bin/env python3
+
+"""
+Analyse hors ligne d'un disque à partir d'une vidéo ou d'une séquence d'images
+- Même analyse que vision.py (ColorDetector.analyse, MotionGate) sur les frames
+  enregistrées, échantillonnées à la cadence de capture du service (0.15 s)
+- Travail réparti sur un pool de processus :
+  - décodage "worker" (défaut) : chaque processus décode son propre segment de la
+    vidéo (positionnement puis lecture séquentielle) ou lit ses propres images
+  - décodage "parent" : le processus principal décode la vidéo une seule fois et
+    transmet les frames par un anneau de mémoire partagée (pour les vidéos dont
+    le positionnement n'est pas fiable)
+  - résultats (couleurs, frame réduite) écrits par les processus dans un tableau
+    en mémoire partagée : rien n'est sérialisé hors indices
+- La cadence adaptative (MotionGate) est rejouée ensuite dans l'ordre, avec une
+  horloge virtuelle : la chronologie des messages OSC est celle du service en direct
+- Sortie : partition .tds (lib/score_file.py, relisible par recorder.py --replay,
+  image des secteurs avec --sectors) ou chronologie texte "t adresse valeur"
+"""
+
+import argparse
+import glob
+import os
+import queue
+import sys
+import time
+from multiprocessing import Pool, shared_memory
+from pathlib import Path
+
+# Ajout du dossier parent au path pour permettre l'importation de lib
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+import cv2
+import numpy as np
+from lib.constants import DISC_RPM
+from lib.score_file import ScoreWriter, score_columns
+from lib.osc_patterns import PatternDispatcher
+from recorder import SessionRecorder
+from vision import ACTIVE_PERIOD, DIFF_SIZE, FRAME_RATE, ColorDetector, MotionGate, color_messages
+
+IMAGE_SUFFIXES = {'.png', '.jpg', '.jpeg', '.bmp', '.tif', '.tiff'}
+CHUNKS_PER_WORKER = 2   # Segments par processus (équilibrage de charge)
+RING_SLOTS_PER_WORKER = 2
+
+# Résultat de l'analyse d'un échantillon, écrit par les processus en mémoire partagée
+RESULT_DTYPE = np.dtype([
+    ('rgb', 'f4', (3,)),
+    ('hsv', 'u1', (3,)),
+    ('small', 'u1', (DIFF_SIZE[1], DIFF_SIZE[0])),
+    ('valid', 'u1'),
+])
+
+
+def open_source(source, fps=None):
+    """Décrit une source : (type, vidéo ou liste d'images, cadence, nombre de frames)"""
+    path = Path(source)
+    if path.is_dir():
+        images = sorted(str(p) for p in path.iterdir() if p.suffix.lower() in IMAGE_SUFFIXES)
+    elif glob.has_magic(source):
+        images = sorted(glob.glob(source))
+    else:
+        images = None
+    if images is not None:
+        if not images:
+            raise ValueError(f"{source}: aucune image trouvée")
+        return 'images', images, fps or FRAME_RATE, len(images)
+
+    cap = cv2.VideoCapture(source)
+    if not cap.isOpened():
+        raise ValueError(f"{source}: vidéo illisible")
+    count = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    fps = fps or cap.get(cv2.CAP_PROP_FPS) or FRAME_RATE
+    cap.release()
+    return 'video', source, fps, count
+
+
+def sample_plan(count, fps, period=ACTIVE_PERIOD):
+    """Frame analysée à chaque capture de la cadence active : indices et instants (s)"""
+    samples = int((count - 1) / fps / period) + 1 if count else 0
+    times = np.arange(samples) * period
+    indices = np.minimum(np.rint(times * fps).astype(np.int64), count - 1)
+    return indices, indices / fps
+
+
+def split(samples, chunks):
+    """Segments contigus d'échantillons (bornes)"""
+    bounds = np.linspace(0, samples, chunks + 1).astype(int)
+    return [(int(a), int(b)) for a, b in zip(bounds[:-1], bounds[1:]) if b > a]
+
+
+# État des processus du pool (initialisé une fois par processus)
+_worker = {}
+
+
+def _init_worker(results_name, samples, analysis, ring_name=None, frame_shape=None, slots=0):
+    results_shm = shared_memory.SharedMemory(name=results_name)
+    _worker['results_shm'] = results_shm
+    _worker['results'] = np.ndarray((samples,), RESULT_DTYPE, buffer=results_shm.buf)
+    _worker['detector'] = ColorDetector(analysis=analysis, camera=False)
+    _worker['gate'] = MotionGate()
+    if ring_name is not None:
+        ring_shm = shared_memory.SharedMemory(name=ring_name)
+        _worker['ring_shm'] = ring_shm
+        _worker['ring'] = np.ndarray((slots, *frame_shape), np.uint8, buffer=ring_shm.buf)
+
+
+def _analyse(sample, frame):
+    rgb, hsv = _worker['detector'].analyse(frame)
+    out = _worker['results'][sample]
+    out['rgb'] = rgb
+    out['hsv'] = hsv
+    out['small'] = _worker['gate'].reduce(frame)
+    out['valid'] = 1
+
+
+def analyse_chunk(kind, source, indices, start, end):
+    """Analyse les échantillons [start, end) : le processus lit lui-même ses frames"""
+    if kind == 'images':
+        for sample in range(start, end):
+            frame = cv2.imread(source[indices[sample]])
+            if frame is None:
+                break
+            _analyse(sample, frame)
+        return end - start
+
+    cap = cv2.VideoCapture(source)
+    position = int(indices[start])
+    if position:
+        cap.set(cv2.CAP_PROP_POS_FRAMES, position)
+    frame = None
+    try:
+        for sample in range(start, end):
+            index = indices[sample]
+            # Frames non échantillonnées : décodées sans conversion de couleur
+            while position < index:
+                cap.grab()
+                position += 1
+            if frame is None or position == index:
+                ok, frame = cap.read()
+                position += 1
+                if not ok:
+                    break
+            _analyse(sample, frame)
+    finally:
+        cap.release()
+    return end - start
+
+
+def analyse_slot(slot, sample):
+    """Analyse une frame déposée dans l'anneau de mémoire partagée ; renvoie l'emplacement libéré"""
+    _analyse(sample, _worker['ring'][slot])
+    return slot
+
+
+def read_frames(kind, source, indices):
+    """Frames échantillonnées, lues séquentiellement (décodage dans le processus principal)"""
+    if kind == 'images':
+        for index in indices:
+            yield cv2.imread(source[index])
+        return
+    cap = cv2.VideoCapture(source)
+    position = 0
+    frame = None
+    try:
+        for index in indices:
+            while position < index:
+                cap.grab()
+                position += 1
+            if frame is None or position == index:
+                ok, frame = cap.read()
+                position += 1
+                if not ok:
+                    return
+            yield frame
+    finally:
+        cap.release()
+
+
+def run_analysis(kind, source, indices, workers, decode="worker", analysis="rgb",
+                 chunks_per_worker=CHUNKS_PER_WORKER):
+    """Analyse tous les échantillons ; renvoie une copie du tableau de résultats"""
+    samples = len(indices)
+    results_shm = shared_memory.SharedMemory(create=True, size=max(1, samples * RESULT_DTYPE.itemsize))
+    ring_shm = None
+    try:
+        results = np.ndarray((samples,), RESULT_DTYPE, buffer=results_shm.buf)
+        results['valid'] = 0
+        if decode == "worker":
+            with Pool(workers, _init_worker, (results_shm.name, samples, analysis)) as pool:
+                chunks = split(samples, workers * chunks_per_worker)
+                jobs = [pool.apply_async(analyse_chunk, (kind, source, indices, a, b)) for a, b in chunks]
+                for job in jobs:
+                    job.get()
+        else:
+            frames = read_frames(kind, source, indices)
+            first = next(frames, None)
+            if first is not None:
+                slots = workers * RING_SLOTS_PER_WORKER
+                ring_shm = shared_memory.SharedMemory(create=True, size=slots * first.nbytes)
+                ring = np.ndarray((slots, *first.shape), np.uint8, buffer=ring_shm.buf)
+                free = queue.Queue()
+                for slot in range(slots):
+                    free.put(slot)
+                errors = []
+
+                def release(slot):
+                    # Erreur d'analyse : l'emplacement est rendu, sinon l'attente des emplacements bloque
+                    def failed(error):
+                        errors.append(error)
+                        free.put(slot)
+                    return failed
+
+                initargs = (results_shm.name, samples, analysis, ring_shm.name, first.shape, slots)
+                with Pool(workers, _init_worker, initargs) as pool:
+                    sample = 0
+                    frame = first
+                    while frame is not None and not errors:
+                        if frame.shape != first.shape:
+                            raise ValueError(f"Frame {sample}: taille {frame.shape} différente de {first.shape}")
+                        slot = free.get()
+                        ring[slot] = frame
+                        pool.apply_async(analyse_slot, (slot, sample), callback=free.put,
+                                         error_callback=release(slot))
+                        sample += 1
+                        frame = next(frames, None)
+                    # Tous les emplacements rendus : toutes les frames sont analysées
+                    for _ in range(slots):
+                        free.get()
+                if errors:
+                    raise errors[0]
+        return results.copy()
+    finally:
+        results_shm.close()
+        results_shm.unlink()
+        if ring_shm is not None:
+            ring_shm.close()
+            ring_shm.unlink()
+
+
+def build_timeline(results, times, period=ACTIVE_PERIOD, idle=True):
+    """Rejoue la cadence adaptative de vision.py : [(t, adresse, valeur)]
+
+    Horloge virtuelle : après chaque capture, la suivante a lieu gate.period
+    plus tard (comme gate.wait() en direct), sur l'échantillon le plus proche.
+    """
+    now = [0.0]
+    clock = lambda: now[0]
+    if idle:
+        gate = MotionGate(active_period=period, clock=clock)
+    else:
+        gate = MotionGate(active_period=period, idle_period=period, threshold=-1, clock=clock)
+    timeline = []
+    t = 0.0
+    while True:
+        sample = int(round(t / period))
+        if sample >= len(results) or not results['valid'][sample]:
+            break
+        now[0] = t
+        if gate.update_reduced(results['small'][sample]):
+            for address, value in color_messages(results['rgb'][sample], results['hsv'][sample]):
+                timeline.append((float(times[sample]), address, value))
+        t += gate.period
+    return timeline, gate.stats()
+
+
+def write_score(path, timeline, sectors, rpm, meta):
+    """Écrit la chronologie dans une partition .tds, comme recorder.py en direct"""
+    colors = sum(1 for _, address, _ in timeline if address == "/vision/color/raw/hsv/v")
+    writer = ScoreWriter(path, score_columns(sectors), max(1, colors), meta)
+    now = [0.0]
+    session = SessionRecorder(writer, sectors, rpm, clock=lambda: now[0])
+    dispatcher = PatternDispatcher()
+    session.map(dispatcher)
+    for t, address, value in timeline:
+        now[0] = t
+        for handler in dispatcher.handlers_for_address(address):
+            handler.callback(address, value)
+    writer.close()
+    return session
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Analyse hors ligne d'un disque (vidéo ou séquence d'images)")
+    parser.add_argument("source", help="Fichier vidéo, dossier d'images ou motif (ex. 'frames/*.png')")
+    parser.add_argument("--output", help="Partition .tds, ou chronologie texte pour toute autre extension")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="Processus d'analyse")
+    parser.add_argument("--decode", choices=("worker", "parent"), default="worker",
+                        help="Décodage par segment dans chaque processus, ou une seule fois avec mémoire partagée")
+    parser.add_argument("--fps", type=float, default=None,
+                        help=f"Cadence de la source (défaut : celle de la vidéo, {FRAME_RATE} pour des images)")
+    parser.add_argument("--no-idle", action="store_true", help="Sans cadence adaptative (comme vision.py --no-idle)")
+    parser.add_argument("--sectors", type=int, default=0, help="Image des N secteurs du disque dans la partition")
+    parser.add_argument("--rpm", type=float, default=DISC_RPM, help="Vitesse de rotation du disque (tours/min)")
+    args = parser.parse_args()
+
+    try:
+        kind, source, fps, count = open_source(args.source, args.fps)
+    except ValueError as e:
+        parser.error(str(e))
+    indices, times = sample_plan(count, fps)
+    print(f"{args.source}: {count} frames à {fps:.1f} images/s, {len(indices)} captures à analyser "
+          f"({args.workers} processus, décodage {args.decode})")
+
+    start = time.perf_counter()
+    results = run_analysis(kind, source, indices, args.workers, args.decode)
+    elapsed = time.perf_counter() - start
+    decoded = int(indices[-1]) + 1 if len(indices) else 0
+    timeline, stats = build_timeline(results, times, idle=not args.no_idle)
+    print(f"Analyse: {elapsed:.2f} s ({len(indices) / elapsed:.0f} captures/s, {decoded / elapsed:.0f} frames/s), "
+          f"{stats['analysed']} couleurs envoyées, {stats['skipped']} captures sautées")
+
+    if args.output and args.output.endswith(".tds"):
+        meta = {'source': str(args.source), 'offline': True, 'sectors': args.sectors, 'rpm': args.rpm}
+        session = write_score(args.output, timeline, args.sectors, args.rpm, meta)
+        print(f"Partition écrite: {args.output} ({session.records} enregistrements, {session.revolution} tours)")
+    elif args.output:
+        with open(args.output, 'w') as f:
+            for t, address, value in timeline:
+                f.write(f"{t:.3f} {address} {value}\n")
+        print(f"Chronologie écrite: {args.output} ({len(timeline)} messages)")
+
+
+if __name__ == "__main__":
+    main()
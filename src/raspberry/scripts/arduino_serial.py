@@ -6,38 +6,74 @@ Ce script gère la communication série avec l'Arduino et transmet les données
 au système via OSC. Il fait partie du projet Tourne Disque Synesthésique.
 """
 
-import os
+import argparse
 import sys
 import time
-import serial
-import json
 import logging
 import re
 from pathlib import Path
-from pythonosc import udp_client
-
-# Configuration du logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler("/home/blanchard/tourne_disque/logs/arduino_serial.log"),
-        logging.StreamHandler(sys.stdout)
-    ]
-)
+
+# Ajout du dossier parent au path pour permettre l'importation de lib
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+from lib.startup import StartupProfiler
+STARTUP = StartupProfiler("arduino_serial")
+
+import threading
+import serial
+from pythonosc import osc_server, udp_client
+from lib.arduino_commands import DEFAULT_QUEUE_SIZE, CommandChannel, ack_kind, format_command_stats
+from lib.config import ConfigError, add_config_arguments, load_config, log_dir, osc_address
+from lib.osc_patterns import PatternDispatcher
+from lib.realtime import add_realtime_arguments, realtime_from_args
+STARTUP.mark("imports")
+
+# Délais de connexion
+BOOT_TIMEOUT = 2.0      # Attente maximale du redémarrage de l'Arduino à l'ouverture du port (s)
+RECONNECT_DELAY = 5     # Attente avant une nouvelle tentative après une perte de connexion (s)
+READ_TIMEOUT = 0.1      # Attente maximale d'une ligne : la lecture bloque au lieu de sonder le port (s)
+STATS_INTERVAL = 30     # Période d'affichage des statistiques de commandes (s)
+
+# Commandes reçues via OSC (relayées par le routeur vers le module "arduino")
+MOTOR_SPEED_COMMAND = "/logic/motor/speed"
+BALANCIER_COMMAND = "/logic/servo/balancier"
+SPEED_ECHO = re.compile(r"Vitesse réglée à :\s*(-?\d+)")
+
+def setup_logging():
+    """Journal fichier (TOURNE_DISQUE_LOG_DIR ou logs/ du projet) et sortie standard"""
+    handlers = [logging.StreamHandler(sys.stdout)]
+    try:
+        directory = log_dir()
+        directory.mkdir(parents=True, exist_ok=True)
+        handlers.insert(0, logging.FileHandler(directory / "arduino_serial.log"))
+    except OSError as e:
+        print(f"Journal fichier désactivé: {e}")
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+        handlers=handlers
+    )
+
 logger = logging.getLogger("arduino_serial")
 
 class ArduinoSerialReader:
     """Classe pour gérer la lecture série depuis l'Arduino"""
     
-    def __init__(self, port='/dev/ttyACM0', baudrate=9600, osc_ip='127.0.0.1', osc_port=5005):
+    def __init__(self, port='/dev/ttyACM0', baudrate=9600, osc_ip='127.0.0.1', osc_port=5005, config=None,
+                 queue_size=DEFAULT_QUEUE_SIZE, realtime=None):
         self.port = port
         self.baudrate = baudrate
         self.osc_ip = osc_ip
         self.osc_port = osc_port
+        self.config = config
+        self.realtime = realtime
         self.serial = None
         self.osc_client = None
+        self.server = None
         self.connected = False
+        self.__partial = b""
+
+        # Commandes vers l'Arduino : file fusionnée, écrite par un thread dédié
+        self.commands = CommandChannel(self.send_command, maxsize=queue_size)
         
         # Statut actuel du système
         self.motor_speed = 0
@@ -47,31 +83,61 @@ class ArduinoSerialReader:
     def setup(self):
         """Configure la connexion série et le client OSC"""
         try:
-            # Charger la configuration réseau
-            parent_dir = Path(__file__).resolve().parent.parent
-            network_config_path = os.path.join(parent_dir, 'network.json')
-            
-            with open(network_config_path, 'r') as f:
-                config = json.load(f)
-                # Utilise la configuration du router depuis network.json
-                self.osc_ip = config['osc']['router']['ip']
-                self.osc_port = config['osc']['router']['port']
+            # Configuration réseau partagée : utilise l'adresse du router
+            if self.config is None:
+                self.config = load_config()
+            self.osc_ip, self.osc_port = osc_address(self.config, 'router')
             
             # Configurer le client OSC
             self.osc_client = udp_client.SimpleUDPClient(self.osc_ip, self.osc_port)
             logger.info(f"Client OSC configuré vers {self.osc_ip}:{self.osc_port}")
+
+            # Serveur OSC des commandes (module "arduino" de network.json, optionnel)
+            if 'arduino' in self.config['osc']:
+                self.setup_command_server(*osc_address(self.config, 'arduino'))
             
             return True
             
-        except Exception as e:
+        except (ConfigError, OSError) as e:
             logger.error(f"Erreur lors de la configuration: {e}")
             return False
     
+    def setup_command_server(self, ip, port):
+        """Serveur OSC (thread) recevant les commandes moteur et servo"""
+        self.dispatcher = PatternDispatcher()
+        self.dispatcher.map(MOTOR_SPEED_COMMAND, self.handle_motor_speed)
+        self.dispatcher.map(BALANCIER_COMMAND, self.handle_balancier)
+        # Les handlers ne font qu'ajouter à la file : un seul thread de réception suffit
+        self.server = osc_server.BlockingOSCUDPServer((ip, port), self.dispatcher)
+        if self.realtime is not None:
+            self.realtime.watch_server(self.server, "réception commandes", report_interval=0)
+        threading.Thread(target=self.serve_commands, name="arduino-osc", daemon=True).start()
+        logger.info(f"Écoute des commandes sur {ip}:{port} ({MOTOR_SPEED_COMMAND}, {BALANCIER_COMMAND})")
+
+    def serve_commands(self):
+        """Thread de réception des commandes (thread critique en mode temps réel)"""
+        if self.realtime is not None and self.realtime.active:
+            self.realtime.enter_hot_thread()
+        self.server.serve_forever()
+
+    def handle_motor_speed(self, address, speed):
+        """Commande de vitesse reçue via OSC"""
+        if not self.set_motor_speed(speed):
+            logger.warning(f"File de commandes pleine, vitesse {speed} ignorée")
+
+    def handle_balancier(self, address, *args):
+        """Activation du mode balancier reçue via OSC"""
+        if not self.toggle_balancier():
+            logger.warning("File de commandes pleine, mode balancier ignoré")
+
     def connect(self):
         """Établit la connexion série avec l'Arduino"""
         try:
-            self.serial = serial.Serial(self.port, self.baudrate, timeout=1)
-            time.sleep(2)  # Attente pour l'initialisation de l'Arduino
+            self.serial = serial.Serial(self.port, self.baudrate, timeout=READ_TIMEOUT)
+            self.__partial = b""
+            # Connexion déclarée après le démarrage du croquis : une commande
+            # écrite pendant le redémarrage serait perdue
+            self.wait_boot()
             self.connected = True
             logger.info(f"Connecté à Arduino sur {self.port} à {self.baudrate} bauds")
             return True
@@ -80,6 +146,31 @@ class ArduinoSerialReader:
             self.connected = False
             return False
     
+    def wait_boot(self):
+        """Attend le redémarrage de l'Arduino provoqué par l'ouverture du port
+
+        La première ligne reçue signale que le croquis tourne : inutile
+        d'attendre BOOT_TIMEOUT en entier.
+        """
+        deadline = time.monotonic() + BOOT_TIMEOUT
+        while time.monotonic() < deadline:
+            line = self.read_line()
+            if line:
+                self.process_data(line)
+                return
+
+    def read_line(self):
+        """Ligne complète reçue, ou None après READ_TIMEOUT
+
+        Une ligne coupée par le délai de lecture est conservée et complétée
+        à l'appel suivant.
+        """
+        self.__partial += self.serial.readline()
+        if not self.__partial.endswith(b"\n"):
+            return None
+        line, self.__partial = self.__partial, b""
+        return line.decode('utf-8', errors='replace').strip()
+
     def reconnect(self):
         """Tente de rétablir la connexion en cas de perte"""
         logger.info("Tentative de reconnexion à l'Arduino...")
@@ -90,18 +181,19 @@ class ArduinoSerialReader:
                 pass
         
         # Attendre avant de reconnecter
-        time.sleep(5)
+        time.sleep(RECONNECT_DELAY)
         return self.connect()
     
     def send_command(self, command):
-        """Envoie une commande à l'Arduino"""
+        """Écrit une commande sur le port série (appelé par le thread du canal de commandes)"""
         if not self.connected or not self.serial:
-            logger.error("Impossible d'envoyer la commande: non connecté")
+            # Le canal conserve la commande et la renvoie après la reconnexion
+            logger.debug(f"Commande {command} en attente: non connecté")
             return False
             
         try:
             self.serial.write(f"{command}\n".encode())
-            logger.info(f"Commande envoyée: {command}")
+            logger.debug(f"Commande envoyée: {command}")
             return True
         except Exception as e:
             logger.error(f"Erreur lors de l'envoi de commande: {e}")
@@ -109,12 +201,12 @@ class ArduinoSerialReader:
             return False
     
     def set_motor_speed(self, speed):
-        """Change la vitesse du moteur"""
-        return self.send_command(f"v{int(speed)}")
+        """Change la vitesse du moteur (sans bloquer ; remplace une vitesse encore en attente)"""
+        return self.commands.submit(f"v{int(speed)}")
     
     def toggle_balancier(self):
-        """Active/désactive le mode balancier"""
-        return self.send_command("b")
+        """Active le mode balancier (une commande de vitesse le désactive)"""
+        return self.commands.submit("b")
     
     def read(self):
         """Lit les données de l'Arduino et les envoie via OSC"""
@@ -122,11 +214,11 @@ class ArduinoSerialReader:
             return False
         
         try:
-            if self.serial.in_waiting:
-                line = self.serial.readline().decode('utf-8', errors='replace').strip()
-                if line:
-                    logger.debug(f"Reçu: {line}")
-                    self.process_data(line)
+            # Lecture bloquante (READ_TIMEOUT) : l'écho d'une commande est traité dès son arrivée
+            line = self.read_line()
+            if line:
+                logger.debug(f"Reçu: {line}")
+                self.process_data(line)
             return True
         except serial.SerialException as e:
             logger.error(f"Erreur de lecture: {e}")
@@ -136,8 +228,14 @@ class ArduinoSerialReader:
     def process_data(self, data):
         """Traite les données reçues de l'Arduino"""
         try:
+            # Écho d'une commande envoyée : accusé de réception et latence aller-retour
+            kind = ack_kind(data)
+            if kind is not None:
+                echo = SPEED_ECHO.match(data)
+                self.commands.acknowledge(kind, int(echo.group(1)) if echo else None)
+
             # Vitesse réglée
-            speed_match = re.search(r"Vitesse réglée à :\s*(-?\d+)", data)
+            speed_match = SPEED_ECHO.search(data)
             if speed_match:
                 speed = int(speed_match.group(1))
                 self.motor_speed = speed
@@ -194,7 +292,16 @@ class ArduinoSerialReader:
             return
         
         logger.info("Démarrage du service Arduino Serial")
+        STARTUP.watch(self.osc_client, "send_message", "envoyé")
+        self.commands.start()
+
+        # Première connexion immédiate, le délai ne s'applique qu'après une perte
+        self.connect()
+        STARTUP.ready("connexion série")
+        if self.realtime is not None:
+            self.realtime.startup_done()
         
+        last_stats = time.monotonic()
         while True:
             if not self.connected:
                 if not self.reconnect():
@@ -205,12 +312,24 @@ class ArduinoSerialReader:
                 # Problème de lecture, tenter de reconnecter
                 self.connected = False
                 continue
-            
-            # Petit délai pour ne pas surcharger le CPU
-            time.sleep(0.01)
+
+            now = time.monotonic()
+            if now - last_stats >= STATS_INTERVAL:
+                last_stats = now
+                stats = self.commands.stats()
+                if stats['submitted']:
+                    logger.info(f"Commandes: {format_command_stats(stats)}")
+                    self.commands.reset_stats()
+                if self.realtime is not None:
+                    for line in self.realtime.format_stats():
+                        logger.info(f"Gigue - {line}")
+                    self.realtime.reset_stats()
     
     def close(self):
         """Ferme proprement les connexions"""
+        self.commands.stop()
+        if self.server is not None:
+            self.server.shutdown()
         if self.serial and self.serial.is_open:
             self.serial.close()
             logger.info("Connexion série fermée")
@@ -218,8 +337,26 @@ class ArduinoSerialReader:
 
 # Point d'entrée principal
 def main():
+    parser = argparse.ArgumentParser(description="Communication série avec l'Arduino")
+    parser.add_argument("--port", default='/dev/ttyACM0', help="Port série de l'Arduino")
+    parser.add_argument("--baudrate", type=int, default=9600, help="Vitesse du port série (bauds)")
+    parser.add_argument("--queue-size", type=int, default=DEFAULT_QUEUE_SIZE,
+                        help="Taille maximale de la file de commandes vers l'Arduino")
+    add_config_arguments(parser)
+    add_realtime_arguments(parser)
+    args = parser.parse_args()
+
+    setup_logging()
     logger.info("=== Démarrage du service de communication Arduino ===")
-    arduino = ArduinoSerialReader()
+    try:
+        config = load_config(args.network_config, args.osc)
+    except ConfigError as e:
+        logger.error(f"Erreur lors de la configuration: {e}")
+        sys.exit(1)
+    realtime = realtime_from_args("arduino_serial", args)
+    STARTUP.mark("configuration")
+    arduino = ArduinoSerialReader(args.port, args.baudrate, config=config, queue_size=args.queue_size,
+                                  realtime=realtime)
     
     try:
         arduino.run()
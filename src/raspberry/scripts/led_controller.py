@@ -3,72 +3,157 @@
 """
 Contrôleur pour le bandeau LED
 - Reçoit les couleurs via OSC
-- Applique les couleurs au bandeau LED
+- Applique les couleurs au bandeau LED (couleur unique, GPIO)
+- Ou anime l'anneau Neopixel pixel par pixel (--output ring)
+- Rendu à cadence fixe : transitions interpolées, courbe perceptuelle et tramage temporel
 """
 
 # Configuration des pins GPIO
 CLK_PIN = 16  # Pin d'horloge pour le bandeau LED
 DAT_PIN = 20  # Pin de données pour le bandeau LED
 
-from pythonosc import dispatcher, osc_server
+import argparse
 import threading
+import time
 import sys
-import os
 from pathlib import Path
 
 # Ajout du dossier parent au path pour permettre l'importation de lib.ledstrip
 parent_dir = Path(__file__).resolve().parent.parent
 sys.path.append(str(parent_dir))
-from lib.ledstrip import LEDStrip
-import json
+from lib.startup import StartupProfiler
+STARTUP = StartupProfiler("led_controller")
+
+from pythonosc import osc_server
+from lib.config import (add_config_arguments, add_disc_argument, config_from_args, disc_from_args, disc_prefix,
+                        load_config, osc_address)
+from lib.constants import (ANIMATION_NAMES, DEFAULT_CURVE, DEFAULT_FPS, DEFAULT_GAMMA, DEFAULT_SECTORS,
+                           DEFAULT_TRANSITION_MS, DISC_RPM)
+from lib.osc_multicast import start_multicast_listeners
+from lib.osc_patterns import PatternDispatcher
+from lib.realtime import add_realtime_arguments, realtime_from_args
+STARTUP.mark("imports")
+
+# Anneau Neopixel
+RING_PIXELS = 24
+STATS_INTERVAL = 30  # Période d'affichage des statistiques de rendu (s)
+
+# Dernière composante d'une couleur envoyée par vision (r, g puis b)
+LAST_RGB_COMPONENT = 'b'
+
+# Bandeau : chaque envoi GPIO (protocole bit à bit) prend plusieurs millisecondes
+STRIP_FPS = 40
+# À 40 FPS, le tramage temporel du bandeau (P9813) est visible comme un scintillement :
+# il n'est activé par défaut que pour l'anneau
+DEFAULT_DITHER = {"ring": True, "strip": False}
 
 class LEDController:
-    def __init__(self):
-        self.led_strip = LEDStrip(CLK_PIN, DAT_PIN)
+    def __init__(self, output="strip", pixels=RING_PIXELS, backend="spi", animation="sectors",
+                 fps=None, sectors=DEFAULT_SECTORS, rpm=DISC_RPM, transition_ms=DEFAULT_TRANSITION_MS,
+                 curve=DEFAULT_CURVE, gamma=DEFAULT_GAMMA, dither=None, direct=False, config=None, disc=None,
+                 realtime=None):
+        self.output = output
+        self.realtime = realtime
+        self.engine = None
+        if dither is None:
+            dither = DEFAULT_DITHER[output]
+        if output == "ring":
+            # Import local : NumPy et le moteur de rendu ne sont chargés que s'ils sont utilisés
+            from lib.ledrender import DitheredOutput
+            from lib.ledring import ANIMATIONS, AnimationEngine, LEDRing, open_led_backend
+            # Anneau pixel par pixel : le rendu tourne à cadence fixe, indépendamment des couleurs reçues
+            output_stage = DitheredOutput((pixels, 3), curve, gamma, dither)
+            self.ring = LEDRing(pixels, open_led_backend(backend, pixels), output_stage)
+            if animation == "sectors":
+                self.animation = ANIMATIONS[animation](pixels, sectors, rpm, transition_ms=transition_ms)
+            else:
+                self.animation = ANIMATIONS[animation](pixels, transition_ms)
+            self.engine = AnimationEngine(self.ring, self.animation, fps or DEFAULT_FPS, realtime=realtime)
+        else:
+            # Import local : RPi.GPIO n'est nécessaire que pour le bandeau à couleur unique
+            from lib.ledstrip import LEDStrip
+            self.led_strip = LEDStrip(CLK_PIN, DAT_PIN)
+            if not direct:
+                from lib.ledrender import DitheredOutput
+                from lib.ledring import AnimationEngine, LEDRing, SolidAnimation, StripBackend
+                # Le bandeau est rendu comme un anneau d'un pixel : mêmes transitions et même étage de sortie
+                output_stage = DitheredOutput((1, 3), curve, gamma, dither)
+                self.ring = LEDRing(1, StripBackend(self.led_strip), output_stage)
+                self.animation = SolidAnimation(1, transition_ms)
+                self.engine = AnimationEngine(self.ring, self.animation, fps or STRIP_FPS, realtime=realtime)
         
-        # Chargement de la configuration depuis le nouveau chemin
-        network_config_path = os.path.join(parent_dir, 'network.json')
-        with open(network_config_path, 'r') as f:
-            self.config = json.load(f)
+        # Configuration réseau partagée (lue une seule fois par processus)
+        self.config = config if config is not None else load_config()
         
         # Configuration OSC
-        self.dispatcher = dispatcher.Dispatcher()
+        self.dispatcher = PatternDispatcher()
         
         # Écouter les composantes RGB individuelles provenant du module vision
-        self.dispatcher.map("/vision/color/raw/rgb/r", self.handle_rgb_r)
-        self.dispatcher.map("/vision/color/raw/rgb/g", self.handle_rgb_g)
-        self.dispatcher.map("/vision/color/raw/rgb/b", self.handle_rgb_b)
+        # (du disque suivi quand plusieurs disques sont configurés)
+        prefix = disc_prefix("vision", disc)
+        self.dispatcher.map(f"{prefix}/color/raw/rgb/r", self.handle_rgb_r)
+        self.dispatcher.map(f"{prefix}/color/raw/rgb/g", self.handle_rgb_g)
+        self.dispatcher.map(f"{prefix}/color/raw/rgb/b", self.handle_rgb_b)
+
+        # Télémétrie moteur : la rotation de l'anneau suit celle du disque
+        self.dispatcher.map("/arduino/motor/speed", self.handle_motor_speed)
         
         # Stockage des valeurs RGB actuelles
         self.current_rgb = {'r': 0, 'g': 0, 'b': 0}
         
-        # Serveur OSC
-        osc_config = self.config['osc']['led']
-        self.server = osc_server.ThreadingOSCUDPServer(
-            (osc_config['ip'], osc_config['port']),
+        # Serveur OSC ; en mode direct temps réel, l'écriture GPIO se fait pendant le traitement OSC :
+        # un seul thread critique (celui de run) reçoit et écrit, dans l'ordre d'arrivée
+        self.hot_server = self.engine is None and realtime is not None and realtime.active
+        server_class = osc_server.BlockingOSCUDPServer if self.hot_server else osc_server.ThreadingOSCUDPServer
+        self.server = server_class(
+            osc_address(self.config, 'led'),
             self.dispatcher
         )
+        if realtime is not None:
+            if self.engine is None:
+                # Bandeau en mode direct : écrit pendant le traitement OSC, histogrammes affichés par le serveur
+                realtime.watch_server(self.server, "traitement OSC (écriture LED)", STATS_INTERVAL)
+            else:
+                realtime.watch_server(self.server, "traitement OSC", report_interval=0)
+
+        # Abonnement aux groupes multicast éventuels (section "multicast" de network.json)
+        self.multicast_servers, self.multicast_tracker = start_multicast_listeners(
+            self.config, 'led', self.dispatcher
+        )
         
     def handle_rgb_r(self, address, r):
         """Gestion de la composante R reçue via OSC"""
         self.current_rgb['r'] = int(r)
-        self.update_led_color()
+        self.update_led_color('r')
         print(f"LED couleur R appliquée: R={r}")
         
     def handle_rgb_g(self, address, g):
         """Gestion de la composante G reçue via OSC"""
         self.current_rgb['g'] = int(g)
-        self.update_led_color()
+        self.update_led_color('g')
         print(f"LED couleur G appliquée: G={g}")
         
     def handle_rgb_b(self, address, b):
         """Gestion de la composante B reçue via OSC"""
         self.current_rgb['b'] = int(b)
-        self.update_led_color()
+        self.update_led_color('b')
         print(f"LED couleur B appliquée: B={b}")
         
-    def update_led_color(self):
-        """Met à jour la couleur du bandeau LED"""
+    def handle_motor_speed(self, address, speed):
+        """Gestion de la vitesse du moteur reçue via OSC"""
+        if self.engine is not None:
+            self.animation.set_running(speed != 0)
+
+    def update_led_color(self, component=LAST_RGB_COMPONENT):
+        """Met à jour la couleur du bandeau LED (ou la couleur reçue par l'animation de l'anneau)
+
+        L'animation ne reçoit que des couleurs complètes : vision envoie r, g puis b,
+        et un secteur ne doit pas garder un mélange d'anciennes et de nouvelles composantes.
+        """
+        if self.engine is not None:
+            if component == LAST_RGB_COMPONENT:
+                self.animation.set_color((self.current_rgb['r'], self.current_rgb['g'], self.current_rgb['b']))
+            return
         self.led_strip.setcolourrgb(
             self.current_rgb['r'],
             self.current_rgb['g'],
@@ -77,19 +162,85 @@ class LEDController:
         
     def run(self):
         """Démarre le serveur OSC"""
-        print(f"LED Controller démarré sur CLK={self.led_strip._LEDStrip__clock}, DAT={self.led_strip._LEDStrip__data}")
+        if self.output == "ring":
+            print(f"LED Controller démarré sur l'anneau ({self.ring.num_pixels} pixels, {self.engine.fps} FPS)")
+        else:
+            print(f"LED Controller démarré sur CLK={self.led_strip._LEDStrip__clock}, DAT={self.led_strip._LEDStrip__data}")
+        if self.engine is not None:
+            self.engine.start()
+            threading.Thread(target=self.print_stats, daemon=True).start()
+        elif self.hot_server:
+            self.realtime.enter_hot_thread()
         try:
             self.server.serve_forever()
         except KeyboardInterrupt:
             self.cleanup()
+
+    def print_stats(self):
+        """Affiche périodiquement les statistiques de rendu"""
+        from lib.ledring import format_ring_stats
+        while True:
+            time.sleep(STATS_INTERVAL)
+            print(f"Rendu LED: {format_ring_stats(self.engine.stats())}")
+            self.engine.reset_stats()
+            if self.output == "strip":
+                backend = self.ring.backend
+                print(f"Bandeau: {backend.writes} envois GPIO, {backend.skipped} frames inchangées non renvoyées")
+                backend.writes = backend.skipped = 0
+            if self.realtime is not None:
+                self.realtime.print_stats()
             
     def cleanup(self):
         """Nettoyage des ressources"""
-        if hasattr(self, 'led_strip'):
+        if self.engine is not None:
+            # Éteint la sortie et libère le backend (le GPIO du bandeau compris)
+            self.engine.stop()
+            self.ring.close()
+        elif hasattr(self, 'led_strip'):
             self.led_strip.cleanup()
 
 def main():
-    controller = LEDController()
+    parser = argparse.ArgumentParser(description="Contrôleur LED")
+    parser.add_argument("--output", choices=("strip", "ring"), default="strip",
+                        help="Bandeau à couleur unique (GPIO) ou anneau Neopixel pixel par pixel")
+    parser.add_argument("--pixels", type=int, default=RING_PIXELS, help="Nombre de pixels de l'anneau")
+    parser.add_argument("--led-backend", choices=("spi", "pwm", "mock"), default="spi",
+                        help="Sortie de l'anneau : SPI (GPIO10), PWM/DMA (GPIO18) ou simulée")
+    parser.add_argument("--animation", choices=ANIMATION_NAMES, default="sectors",
+                        help="Animation de l'anneau")
+    parser.add_argument("--fps", type=int, default=None,
+                        help=f"Cadence de rendu (défaut : {DEFAULT_FPS} pour l'anneau, {STRIP_FPS} pour le bandeau)")
+    parser.add_argument("--sectors", type=int, default=DEFAULT_SECTORS, help="Secteurs angulaires du disque")
+    parser.add_argument("--rpm", type=float, default=DISC_RPM, help="Vitesse de rotation du disque (tours/min)")
+    parser.add_argument("--transition-ms", type=float, default=DEFAULT_TRANSITION_MS,
+                        help="Durée de la transition vers une nouvelle couleur (ms)")
+    parser.add_argument("--curve", choices=("gamma", "cie", "linear"), default=DEFAULT_CURVE,
+                        help="Courbe perceptuelle de sortie (linear : valeurs transmises telles quelles)")
+    parser.add_argument("--gamma", type=float, default=DEFAULT_GAMMA, help="Exposant de la courbe gamma")
+    dither = parser.add_mutually_exclusive_group()
+    dither.add_argument("--dither", dest="dither", action="store_const", const=True, default=None,
+                        help="Active le tramage temporel (défaut pour l'anneau)")
+    dither.add_argument("--no-dither", dest="dither", action="store_const", const=False,
+                        help="Désactive le tramage temporel (défaut pour le bandeau)")
+    parser.add_argument("--direct", action="store_true",
+                        help="Bandeau : ancien comportement (lissage et envoi à chaque couleur reçue)")
+    add_disc_argument(parser)
+    add_config_arguments(parser)
+    add_realtime_arguments(parser)
+    args = parser.parse_args()
+    config = config_from_args(parser, args)
+    disc = disc_from_args(parser, args, config)
+    realtime = realtime_from_args("led_controller", args, hot_loop=args.output == "ring" or not args.direct)
+    STARTUP.mark("configuration")
+
+    controller = LEDController(args.output, args.pixels, args.led_backend, args.animation,
+                               fps=args.fps, sectors=args.sectors, rpm=args.rpm,
+                               transition_ms=args.transition_ms, curve=args.curve, gamma=args.gamma,
+                               dither=args.dither, direct=args.direct, config=config, disc=disc,
+                               realtime=realtime)
+    STARTUP.watch(controller.dispatcher)
+    STARTUP.ready("sortie LED et serveur OSC")
+    realtime.startup_done()
     controller.run()
 
 if __name__ == "__main__":
@@ -1,29 +1,35 @@
 #!/usr/bin/env python3
 
-from pythonosc import udp_client, dispatcher, osc_server
+import argparse
 import collections
 import threading
 import time
-import json
-import os
+import sys
 from pathlib import Path
 
-# Chemin parent pour accéder à network.json
+# Chemin parent pour accéder à lib
 parent_dir = Path(__file__).resolve().parent.parent
+sys.path.append(str(parent_dir))
+from lib.startup import StartupProfiler
+STARTUP = StartupProfiler("logic")
+
+from pythonosc import udp_client, osc_server
+from lib.config import add_config_arguments, config_from_args, disc_configs, disc_prefix, osc_address
+from lib.osc_multicast import start_multicast_listeners
+from lib.osc_patterns import PatternDispatcher
+from lib.realtime import add_realtime_arguments, realtime_from_args
+STARTUP.mark("imports")
 
 # Configuration
 COLOR_BUFFER_SIZE = 5
 EMA_ALPHA = 0.0005
 
 class OSCManager:
-    def __init__(self):
-        network_config_path = os.path.join(parent_dir, 'network.json')
-        with open(network_config_path, 'r') as f:
-            self.config = json.load(f)
+    def __init__(self, config):
+        self.config = config
         
         # Client OSC unique pour le routeur central
-        router_ip = self.config['osc']['router']['ip']
-        router_port = self.config['osc']['router']['port']
+        router_ip, router_port = osc_address(config, 'router')
         self.router_client = udp_client.SimpleUDPClient(router_ip, router_port)
         print(f"Connexion établie avec le routeur OSC central sur {router_ip}:{router_port}")
         
@@ -35,52 +41,84 @@ class OSCManager:
         """Envoie un message OSC au routeur pour le contrôleur LED"""
         self.router_client.send_message(address, values)
 
-class ColorProcessor:
-    def __init__(self):
-        # Gestionnaire OSC
-        self.osc = OSCManager()
-        
-        # Buffers circulaires pour RGB
+class DiscState:
+    """État de lissage d'un disque : buffers circulaires RGB et valeurs EMA"""
+
+    def __init__(self, disc=None):
+        self.disc = disc
+        self.prefix = disc_prefix("logic", disc)
+
+        # Buffers circulaires pour RGB, initialisés à zéro
         self.rgb_buffers = {
-            'r': collections.deque(maxlen=COLOR_BUFFER_SIZE),
-            'g': collections.deque(maxlen=COLOR_BUFFER_SIZE),
-            'b': collections.deque(maxlen=COLOR_BUFFER_SIZE)
+            c: collections.deque([0] * COLOR_BUFFER_SIZE, maxlen=COLOR_BUFFER_SIZE) for c in 'rgb'
         }
-        
+
         # Variables EMA
         self.rgb_ema = {'r': None, 'g': None, 'b': None}
         self.hsv_ema = {'h': None, 's': None, 'v': None}
-        
-        # Initialisation des buffers RGB
-        for buffer in self.rgb_buffers.values():
-            for _ in range(COLOR_BUFFER_SIZE):
-                buffer.append(0)
+
+class ColorProcessor:
+    def __init__(self, config, realtime=None):
+        self.config = config
+        self.realtime = realtime
+
+        # Gestionnaire OSC
+        self.osc = OSCManager(config)
+
+        # État par disque : None pour les adresses sans disque (/vision/color/...),
+        # nom du disque pour /vision/<disque>/color/...
+        self.discs = {None: DiscState()}
+        for disc in disc_configs(config):
+            self.discs[disc['name']] = DiscState(disc['name'])
+        # Disques absents de network.json : adresses ignorées, signalées une seule fois
+        self.unknown_discs = set()
+        self.discs_lock = threading.Lock()
         
         # Configuration OSC server
         self.setup_osc_server()
 
     def setup_osc_server(self):
         """Configure le serveur OSC pour recevoir les données de vision.py"""
-        network_config_path = os.path.join(parent_dir, 'network.json')
-        with open(network_config_path, 'r') as f:
-            config = json.load(f)
-            
-        self.dispatcher = dispatcher.Dispatcher()
-        
-        # Uniquement les handlers pour les composantes individuelles RGB
-        self.dispatcher.map("/vision/color/raw/rgb/r", self.handle_rgb_r)
-        self.dispatcher.map("/vision/color/raw/rgb/g", self.handle_rgb_g)
-        self.dispatcher.map("/vision/color/raw/rgb/b", self.handle_rgb_b)
-        
-        # Uniquement les handlers pour les composantes individuelles HSV
-        self.dispatcher.map("/vision/color/raw/hsv/h", self.handle_hsv_h)
-        self.dispatcher.map("/vision/color/raw/hsv/s", self.handle_hsv_s)
-        self.dispatcher.map("/vision/color/raw/hsv/v", self.handle_hsv_v)
-        
-        self.server = osc_server.ThreadingOSCUDPServer(
-            (config['osc']['logic']['ip'], config['osc']['logic']['port']),
+        self.dispatcher = PatternDispatcher()
+        
+        # Uniquement les handlers pour les composantes individuelles RGB et HSV,
+        # sans disque ou pour chaque disque (/vision/<disque>/color/...)
+        self.dispatcher.map("/vision/color/raw/rgb/[rgb]", self.handle_rgb)
+        self.dispatcher.map("/vision/color/raw/hsv/[hsv]", self.handle_hsv)
+        self.dispatcher.map("/vision/*/color/raw/rgb/[rgb]", self.handle_rgb)
+        self.dispatcher.map("/vision/*/color/raw/hsv/[hsv]", self.handle_hsv)
+        
+        # En mode temps réel, un seul thread critique traite les couleurs dans l'ordre d'arrivée
+        server_class = (osc_server.BlockingOSCUDPServer if self.realtime is not None and self.realtime.active
+                        else osc_server.ThreadingOSCUDPServer)
+        self.server = server_class(
+            osc_address(self.config, 'logic'),
             self.dispatcher
         )
+        if self.realtime is not None:
+            self.realtime.watch_server(self.server, "traitement couleur")
+
+        # Abonnement aux groupes multicast éventuels (section "multicast" de network.json)
+        self.multicast_servers, self.multicast_tracker = start_multicast_listeners(
+            self.config, 'logic', self.dispatcher
+        )
+
+    def disc_state(self, address):
+        """État du disque d'une adresse /vision/[<disque>/]color/raw/...
+
+        None pour un disque absent de la section "discs" de network.json : aucun
+        état n'est créé (une adresse mal formée ne doit pas faire grossir le
+        dictionnaire ni produire de sortie /logic/<disque>/...).
+        """
+        parts = address.split('/')
+        disc = parts[2] if len(parts) == 7 else None
+        state = self.discs.get(disc)
+        if state is None and disc not in self.unknown_discs:
+            with self.discs_lock:
+                if disc not in self.unknown_discs:
+                    self.unknown_discs.add(disc)
+                    print(f"Disque inconnu dans la section 'discs' de network.json: {disc} (adresses ignorées)")
+        return state
 
     def update_ema(self, current, new_value):
         """Calcule la nouvelle valeur EMA"""
@@ -88,67 +126,66 @@ class ColorProcessor:
             return 0  # Initialize EMA to zero instead of the first captured value
         return EMA_ALPHA * new_value + (1 - EMA_ALPHA) * current
 
-    # Handlers pour les composantes individuelles de RGB
-    def handle_rgb_r(self, address, value):
-        """Traitement de la composante R reçue individuellement"""
-        self.process_rgb_component('r', value)
-    
-    def handle_rgb_g(self, address, value):
-        """Traitement de la composante G reçue individuellement"""
-        self.process_rgb_component('g', value)
-    
-    def handle_rgb_b(self, address, value):
-        """Traitement de la composante B reçue individuellement"""
-        self.process_rgb_component('b', value)
+    def handle_rgb(self, address, value):
+        """Traitement d'une composante RGB reçue individuellement"""
+        state = self.disc_state(address)
+        if state is not None:
+            self.process_rgb_component(state, address[-1], value)
         
-    def process_rgb_component(self, component, value):
+    def process_rgb_component(self, state, component, value):
         """Traite une composante RGB individuelle et envoie si toutes sont mises à jour"""
         # Mise à jour du buffer pour cette composante
-        self.rgb_buffers[component].append(value)
+        state.rgb_buffers[component].append(value)
         
         # Calcul de la moyenne et EMA pour cette composante
-        avg = sum(self.rgb_buffers[component]) / len(self.rgb_buffers[component])
-        self.rgb_ema[component] = self.update_ema(self.rgb_ema[component], avg)
+        avg = sum(state.rgb_buffers[component]) / len(state.rgb_buffers[component])
+        state.rgb_ema[component] = self.update_ema(state.rgb_ema[component], avg)
         
         # Envoi à Pure Data pour cette composante spécifique
-        smoothed_value = int(self.rgb_ema[component])
-        self.osc.send_to_puredata(f"/logic/color/ema/{component}", smoothed_value)
+        smoothed_value = int(state.rgb_ema[component])
+        self.osc.send_to_puredata(f"{state.prefix}/color/ema/{component}", smoothed_value)
         
         # NOTE: On n'envoie plus les valeurs EMA au contrôleur LED
         # Le contrôleur LED reçoit directement les valeurs brutes du module vision
 
-    # Handlers pour les composantes individuelles de HSV
-    def handle_hsv_h(self, address, value):
-        """Traitement de la composante H reçue individuellement"""
-        self.process_hsv_component('h', value)
-    
-    def handle_hsv_s(self, address, value):
-        """Traitement de la composante S reçue individuellement"""
-        self.process_hsv_component('s', value)
-    
-    def handle_hsv_v(self, address, value):
-        """Traitement de la composante V reçue individuellement"""
-        self.process_hsv_component('v', value)
+    def handle_hsv(self, address, value):
+        """Traitement d'une composante HSV reçue individuellement"""
+        state = self.disc_state(address)
+        if state is not None:
+            self.process_hsv_component(state, address[-1], value)
         
-    def process_hsv_component(self, component, value):
+    def process_hsv_component(self, state, component, value):
         """Traite une composante HSV individuelle"""
         # Mise à jour EMA pour cette composante
-        self.hsv_ema[component] = self.update_ema(self.hsv_ema[component], value)
-        smoothed_value = int(self.hsv_ema[component])
+        state.hsv_ema[component] = self.update_ema(state.hsv_ema[component], value)
+        smoothed_value = int(state.hsv_ema[component])
         
         # Envoi à Pure Data pour cette composante spécifique
-        self.osc.send_to_puredata(f"/logic/color/ema/{component}", smoothed_value)
+        self.osc.send_to_puredata(f"{state.prefix}/color/ema/{component}", smoothed_value)
 
     def run(self):
         """Démarre le serveur OSC"""
-        print("Module de logique démarré - Écoute sur le port 9001")
+        print(f"Module de logique démarré - Écoute sur le port {self.server.server_address[1]}")
+        if self.realtime is not None and self.realtime.active:
+            self.realtime.enter_hot_thread()
         try:
             self.server.serve_forever()
         except KeyboardInterrupt:
             print("\nArrêt du module de logique")
 
 def main():
-    processor = ColorProcessor()
+    parser = argparse.ArgumentParser(description="Module de logique")
+    add_config_arguments(parser)
+    add_realtime_arguments(parser)
+    args = parser.parse_args()
+    config = config_from_args(parser, args)
+    realtime = realtime_from_args("logic", args)
+    STARTUP.mark("configuration")
+
+    processor = ColorProcessor(config, realtime)
+    STARTUP.watch(processor.dispatcher)
+    STARTUP.ready("serveur OSC")
+    realtime.startup_done()
     processor.run()
 
 if __name__ == "__main__":
@@ -1,82 +1,515 @@
 #!/usr/bin/env python3
 # music_engine.py
-# ✨ Rôle : simple squelette — écoute les messages OSC "/event"
-# envoyés par logic.py et les affiche. Aucune logique musicale pour l'instant.
+# ✨ Rôle : moteur génératif — transforme les couleurs lissées "/logic/color/ema/*"
+# envoyées par logic.py en événements de notes et de contrôle pour Pure Data.
 
 """
 music_engine.py
 ---------------
 • Communique avec le routeur OSC central (osc_router.py)
-• Écoute l'adresse '/event' 
-• ⤷ La fonction ne fait qu'imprimer l'événement reçu
-• Possibilité d'envoyer des messages à d'autres modules via le routeur OSC
+• Écoute les couleurs lissées '/logic/color/ema/*' et les événements '/event'
+• ⤷ Les adresses acceptent les motifs OSC 1.0 (*, ?, [a-z], {foo,bar})
+• Génère des notes et des contrôles sur une grille rythmique (GenerativeEngine)
+• ⤷ Correspondance couleur → musique par tables précalculées par composante
+     H, S et V (ColorMapping) : trois lectures indexées par événement,
+     préréglages interchangeables à chaud via '/logic/music/preset <nom>'
+• ⤷ Planification (LookaheadScheduler) sur l'horloge monotone, dans des bundles OSC
+     horodatés : envoyés en avance (--timing timetag) quand le destinataire les
+     exécute à leur timetag, la précision ne dépend plus du GC ni des threads ;
+     envoyés à l'échéance (--timing deadline, défaut pour Pure Data dont le patch
+     joue les bundles à leur arrivée)
+• Statistiques de retard de planification affichées périodiquement
+• Backend audio optionnel intégré (--audio synth, lib/synth.py) : synthétiseur NumPy
+  par blocs (oscillateurs, enveloppes et filtre vectorisés) vers la carte son, un
+  fichier WAV ou une sortie nulle, avec mesure du temps de rendu par bloc
 """
 
-import json
-import os
+import argparse
+import collections
+import random
 import sys
+import threading
+from pathlib import Path
+import time
+
+# Ajout du dossier parent au path pour permettre l'importation de lib.osc_patterns
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+from lib.startup import StartupProfiler
+STARTUP = StartupProfiler("music_engine")
+
 from pythonosc import udp_client
-from pythonosc.dispatcher import Dispatcher
+from pythonosc.osc_bundle_builder import OscBundleBuilder
 from pythonosc.osc_server import ThreadingOSCUDPServer
-import time
+from lib.constants import BLOCK_SIZE, CONTROL_ADDRESS, MAX_VOICES, NOTE_ADDRESS
+from lib.config import add_config_arguments, add_disc_argument, config_from_args, disc_from_args, disc_prefix, osc_address
+from lib.osc_multicast import build_message, start_multicast_listeners
+from lib.osc_patterns import PatternDispatcher
+from lib.realtime import add_realtime_arguments, realtime_from_args
+STARTUP.mark("imports")
 
-def load_network_config():
-    """Charge la configuration réseau depuis network.json."""
-    try:
-        # Chemin relatif pour remonter d'un niveau depuis scripts/ vers le répertoire parent
-        script_dir = os.path.dirname(os.path.abspath(__file__))
-        parent_dir = os.path.dirname(script_dir)
-        config_path = os.path.join(parent_dir, "network.json")
-        
-        with open(config_path, "r") as file:
-            return json.load(file)
-    except Exception as e:
-        print(f"Erreur lors du chargement de la configuration réseau: {e}")
-        sys.exit(1)
+# Adresses (motifs OSC) écoutées par le moteur musical
+EVENT_PATTERNS = (
+    "/event",
+    "/logic/event",
+)
+COLOR_PATTERN = "/logic/color/ema/[rgbhsv]"
+PRESET_ADDRESS = "/logic/music/preset"
+
+# Configuration du moteur
+DEFAULT_BPM = 96
+STEPS_PER_BEAT = 4          # Double-croches
+
+# Espace HSV quantifié produit par ColorDetector.get_hsv (convention OpenCV)
+HUE_LEVELS = 180            # H : 0-179
+SV_LEVELS = 256             # S, V : 0-255
+
+# Préréglages de correspondance couleur → musique
+# - scale : degrés de la gamme (demi-tons), octaves : étendue couverte par la teinte
+# - base_octave : octave MIDI de départ (3 → Do3 = 48), une octave de plus si V >= bright_v
+# - velocity : vélocité min/max selon V (courbe velocity_gamma)
+# - density : probabilité min/max de jouer une note selon S
+MAPPING_PRESETS = {
+    'pentatonique': {
+        'scale': (0, 3, 5, 7, 10), 'octaves': 2, 'base_octave': 3, 'bright_v': 256,
+        'velocity': (30, 127), 'velocity_gamma': 1.0, 'density': (0.15, 1.0),
+    },
+    'majeur': {
+        'scale': (0, 2, 4, 5, 7, 9, 11), 'octaves': 2, 'base_octave': 4, 'bright_v': 200,
+        'velocity': (40, 115), 'velocity_gamma': 0.8, 'density': (0.1, 0.8),
+    },
+    'dorien': {
+        'scale': (0, 2, 3, 5, 7, 9, 10), 'octaves': 3, 'base_octave': 2, 'bright_v': 192,
+        'velocity': (35, 120), 'velocity_gamma': 1.2, 'density': (0.2, 0.9),
+    },
+    'ambient': {
+        'scale': (0, 2, 7, 9), 'octaves': 3, 'base_octave': 2, 'bright_v': 256,
+        'velocity': (20, 80), 'velocity_gamma': 1.5, 'density': (0.05, 0.4),
+    },
+}
+DEFAULT_PRESET = 'pentatonique'
+
+# Configuration du planificateur
+LOOKAHEAD = 0.1             # Horizon de planification (s)
+SCHEDULE_INTERVAL = 0.025   # Période de réveil du planificateur (s)
+STATS_INTERVAL = 10.0       # Période d'affichage des statistiques (s)
+STATS_WINDOW = 2048         # Nombre d'échantillons conservés pour les percentiles
+DEADLINE_TOLERANCE = 0.002  # Envoi à l'échéance : retard d'envoi toléré avant de compter un événement tardif (s)
+TIMING_MODES = ("deadline", "timetag")
 
 def handle_event(address, *args):
-    """Fonction stub qui affiche simplement les événements OSC reçus."""
+    """Affiche les événements OSC reçus (hors flux couleur)."""
     print(f"Événement reçu sur {address}: {args}")
 
+class ColorMapping:
+    """Tables précalculées couleur → paramètres musicaux pour un préréglage
+
+    La correspondance est séparable : degré et octave ne dépendent que de H,
+    vélocité et octave supérieure que de V, densité (probabilité × 255) que
+    de S. Trois petites tables à pleine résolution (180 + 256 + 256 entrées)
+    remplacent un tableau H × S × V ; seul le timbre (S × V) est calculé.
+    """
+
+    def __init__(self, name, preset):
+        self.name = name
+        self.scale = tuple(preset['scale'])
+        steps = len(self.scale) * preset['octaves']
+        self.hue = []
+        for h in range(HUE_LEVELS):
+            # Hauteur : la teinte parcourt `octaves` octaves de la gamme
+            total = min(int(h / HUE_LEVELS * steps), steps - 1)
+            self.hue.append((total % len(self.scale), preset['base_octave'] + total // len(self.scale)))
+        vmin, vmax = preset['velocity']
+        self.value = [
+            (min(127, max(0, int(vmin + (vmax - vmin) * (v / 255.0) ** preset['velocity_gamma']))),
+             int(v >= preset['bright_v']))
+            for v in range(SV_LEVELS)
+        ]
+        dmin, dmax = preset['density']
+        self.saturation = [min(255, max(0, int(255.0 * (dmin + (dmax - dmin) * s / 255.0))))
+                           for s in range(SV_LEVELS)]
+
+    def lookup(self, h, s, v):
+        """Retourne (degré, octave, vélocité, densité, timbre) par trois lectures indexées
+
+        La teinte est circulaire (modulo 180) ; S et V hors de 0-255 sont ramenés
+        à la borne la plus proche (pas de repliement vers l'autre extrémité).
+        """
+        s = min(max(int(s), 0), 255)
+        v = min(max(int(v), 0), 255)
+        degree, octave = self.hue[int(h) % HUE_LEVELS]
+        velocity, brighter = self.value[v]
+        # Timbre : couleurs saturées et lumineuses → son brillant
+        return degree, octave + brighter, velocity, self.saturation[s], s * v // 255
+
+    @property
+    def nbytes(self):
+        tables = (self.hue, self.value, self.saturation)
+        return sum(sys.getsizeof(t) + sum(sys.getsizeof(e) for e in t) for t in tables)
+
+class MappingBank:
+    """Ensemble de préréglages, avec changement à chaud sans bloquer le moteur
+
+    Les tables sont construites hors du chemin temps réel (thread dédié) ;
+    le changement de préréglage actif est une simple affectation de référence.
+    """
+
+    def __init__(self, presets=MAPPING_PRESETS, default=DEFAULT_PRESET):
+        self.presets = presets
+        self.__mappings = {}
+        self.__lock = threading.Lock()
+        self.active = self.build(default)
+
+    def build(self, name):
+        """Construit (ou retourne) les tables d'un préréglage"""
+        mapping = self.__mappings.get(name)
+        if mapping is None:
+            mapping = ColorMapping(name, self.presets[name])
+            with self.__lock:
+                self.__mappings[name] = mapping
+        return mapping
+
+    def preload(self):
+        """Construit toutes les tables en arrière-plan"""
+        thread = threading.Thread(target=lambda: [self.build(name) for name in self.presets], daemon=True)
+        thread.start()
+        return thread
+
+    def select(self, name):
+        """Active un préréglage ; construit ses tables en arrière-plan si besoin"""
+        if name not in self.presets:
+            print(f"Préréglage inconnu: {name} (disponibles: {', '.join(self.presets)})")
+            return False
+        mapping = self.__mappings.get(name)
+        if mapping is not None:
+            self.active = mapping
+            print(f"Préréglage actif: {name}")
+            return True
+
+        def build_and_swap():
+            self.active = self.build(name)
+            print(f"Préréglage actif: {name}")
+        threading.Thread(target=build_and_swap, daemon=True).start()
+        return True
+
+    def handle_preset(self, address, name):
+        """Handler OSC pour /logic/music/preset <nom>"""
+        self.select(str(name))
+
+    @property
+    def nbytes(self):
+        with self.__lock:
+            return sum(m.nbytes for m in self.__mappings.values())
+
+class GenerativeEngine:
+    """Génère les événements musicaux d'un pas de la grille rythmique
+
+    L'état couleur est mis à jour par les handlers OSC (thread serveur) et lu
+    par le planificateur (thread dédié) : chaque composante est une simple
+    affectation, atomique en CPython.
+    """
+
+    def __init__(self, bpm=DEFAULT_BPM, steps_per_beat=STEPS_PER_BEAT, seed=None, mappings=None):
+        self.color = {'r': 0, 'g': 0, 'b': 0, 'h': 0, 's': 0, 'v': 0}
+        self.mappings = mappings if mappings is not None else MappingBank()
+        self.steps_per_beat = steps_per_beat
+        self.set_tempo(bpm)
+        self.__rng = random.Random(seed)
+        self.__offset = 0
+
+    def set_tempo(self, bpm):
+        """Change le tempo (pris en compte au pas suivant)"""
+        self.bpm = bpm
+        self.step_duration = 60.0 / bpm / self.steps_per_beat
+
+    def handle_color(self, address, value):
+        """Handler OSC pour /logic/color/ema/<composante>"""
+        self.color[address[-1]] = value
+
+    def events_for_step(self, step):
+        """Retourne la liste des messages (adresse, arguments) d'un pas"""
+        color = self.color
+        mapping = self.mappings.active
+        degree, octave, velocity, density, timbre = mapping.lookup(color['h'], color['s'], color['v'])
+        events = []
+
+        # Contrôles continus une fois par temps
+        if step % self.steps_per_beat == 0:
+            events.append((CONTROL_ADDRESS + "brightness", color['v'] / 255.0))
+            events.append((CONTROL_ADDRESS + "warmth", (color['r'] - color['b']) / 255.0))
+            events.append((CONTROL_ADDRESS + "timbre", timbre / 255.0))
+
+        # Densité : probabilité de jouer une note (table, × 255)
+        if self.__rng.random() * 255.0 >= density:
+            return events
+
+        # Hauteur : la table donne le degré central, la mélodie marche autour (±2 degrés)
+        self.__offset = max(-2, min(2, self.__offset + self.__rng.choice((-1, 0, 1))))
+        scale = mapping.scale
+        total = octave * len(scale) + degree + self.__offset
+        pitch = 12 * (total // len(scale) + 1) + scale[total % len(scale)]
+
+        # Durée : les couleurs sombres tiennent plus longtemps
+        duration_ms = int(self.step_duration * 1000 * (1 + 3 * (255 - color['v']) / 255))
+        events.append((NOTE_ADDRESS, [pitch, velocity, duration_ms]))
+        return events
+
+class LookaheadScheduler:
+    """Planificateur anticipé sur horloge monotone
+
+    Un thread se réveille toutes les `interval` secondes et envoie tous les pas
+    dont l'échéance tombe avant `maintenant + lookahead`, chacun dans un bundle
+    OSC horodaté. Le retard de réveil du thread (GC, ordonnanceur) est absorbé
+    par l'horizon : seul un retard supérieur à `lookahead - interval` rend un
+    événement tardif.
+
+    send_at_deadline : chaque pas est envoyé à son échéance (le thread se
+    réveille sur la grille) pour un destinataire qui joue les bundles à leur
+    arrivée sans lire le timetag, comme le patch Pure Data. La précision
+    dépend alors du réveil du thread ; un envoi plus de DEADLINE_TOLERANCE
+    après l'échéance compte comme tardif.
+    """
+
+    def __init__(self, engine, send, lookahead=LOOKAHEAD, interval=SCHEDULE_INTERVAL, clock=time.monotonic,
+                 realtime=None, send_at_deadline=False):
+        self.engine = engine
+        self.send = send
+        self.lookahead = lookahead
+        self.interval = interval
+        self.send_at_deadline = send_at_deadline
+        self.clock = clock
+        # Mode temps réel (lib.realtime) : thread critique, histogramme des réveils, GC différé
+        self.realtime = realtime
+        self.__running = False
+        self.__thread = None
+        self.__lock = threading.Lock()
+        self.__wake_jitter = collections.deque(maxlen=STATS_WINDOW)
+        self.__slack = collections.deque(maxlen=STATS_WINDOW)
+        self.reset_stats()
+
+    def reset_stats(self):
+        with self.__lock:
+            self.__wake_jitter.clear()
+            self.__slack.clear()
+            self.steps = 0
+            self.events = 0
+            self.bundles = 0
+            self.late = 0
+            self.max_late = 0.0
+
+    def start(self):
+        self.__running = True
+        self.__thread = threading.Thread(target=self.__run, name="lookahead", daemon=True)
+        self.__thread.start()
+
+    def stop(self):
+        self.__running = False
+        if self.__thread is not None:
+            self.__thread.join()
+
+    def __run(self):
+        wake_histogram = None
+        if self.realtime is not None:
+            self.realtime.enter_hot_thread()
+            wake_histogram = self.realtime.histogram("réveil planificateur")
+        step = 0
+        next_wake = self.clock()
+        step_time = next_wake + self.interval
+        while self.__running:
+            now = self.clock()
+            # Correspondance horloge monotone → temps système pour les timetags OSC
+            offset = time.time() - now
+            horizon = now if self.send_at_deadline else now + self.lookahead
+
+            while step_time < horizon:
+                events = self.engine.events_for_step(step)
+                if events:
+                    self.send(events, step_time + offset)
+                self.__record_step(step_time - self.clock(), len(events))
+                step += 1
+                step_time += self.engine.step_duration
+
+            with self.__lock:
+                self.__wake_jitter.append(now - next_wake)
+            if wake_histogram is not None:
+                wake_histogram.record(max(0.0, now - next_wake))
+            next_wake += self.interval
+            if self.send_at_deadline:
+                # À l'échéance : réveil sur le prochain pas (au plus tard après `interval`)
+                next_wake = min(next_wake, step_time)
+            delay = next_wake - self.clock()
+            if delay > 0:
+                if self.realtime is not None:
+                    self.realtime.maybe_collect(delay)
+                time.sleep(max(0.0, next_wake - self.clock()))
+            else:
+                # Réveil trop tardif : on repart de maintenant sans rattraper les réveils manqués
+                next_wake = self.clock()
+
+    def __record_step(self, slack, count):
+        with self.__lock:
+            self.steps += 1
+            self.__slack.append(slack)
+            if count:
+                self.events += count
+                self.bundles += 1
+            if slack < (-DEADLINE_TOLERANCE if self.send_at_deadline else 0):
+                self.late += count
+                self.max_late = max(self.max_late, -slack)
+
+    def stats(self):
+        """Statistiques de planification (durées en millisecondes)"""
+        with self.__lock:
+            jitter = sorted(self.__wake_jitter)
+            slack = sorted(self.__slack)
+            return {
+                'steps': self.steps,
+                'events': self.events,
+                'bundles': self.bundles,
+                'late': self.late,
+                'max_late_ms': self.max_late * 1000,
+                'min_slack_ms': slack[0] * 1000 if slack else 0.0,
+                'wake_jitter_p50_ms': percentile(jitter, 0.5) * 1000,
+                'wake_jitter_p99_ms': percentile(jitter, 0.99) * 1000,
+                'wake_jitter_max_ms': jitter[-1] * 1000 if jitter else 0.0,
+            }
+
+def percentile(sorted_values, fraction):
+    """Percentile d'une liste triée (0.0 si vide)"""
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(fraction * len(sorted_values)))
+    return sorted_values[index]
+
+def format_stats(stats):
+    """Mise en forme d'une ligne de statistiques du planificateur"""
+    return (f"pas={stats['steps']} événements={stats['events']} bundles={stats['bundles']} "
+            f"tardifs={stats['late']} (max {stats['max_late_ms']:.2f} ms) "
+            f"marge min={stats['min_slack_ms']:.2f} ms "
+            f"réveil p50={stats['wake_jitter_p50_ms']:.2f} p99={stats['wake_jitter_p99_ms']:.2f} "
+            f"max={stats['wake_jitter_max_ms']:.2f} ms")
+
+def make_bundle_sender(client):
+    """Retourne une fonction qui envoie une liste d'événements dans un bundle horodaté"""
+    def send(events, timestamp):
+        builder = OscBundleBuilder(timestamp)
+        for address, value in events:
+            builder.add_content(build_message(address, value))
+        client.send(builder.build())
+    return send
+
 def main():
     """Fonction principale qui initialise la communication avec le routeur OSC."""
-    # Charger la configuration réseau
-    config = load_network_config()
-    
-    # Récupérer la configuration du module music_engine
+    parser = argparse.ArgumentParser(description="Moteur musical génératif")
+    parser.add_argument("--bpm", type=float, default=DEFAULT_BPM, help="Tempo en battements par minute")
+    parser.add_argument("--lookahead-ms", type=float, default=LOOKAHEAD * 1000,
+                        help="Horizon de planification anticipée (ms)")
+    parser.add_argument("--interval-ms", type=float, default=SCHEDULE_INTERVAL * 1000,
+                        help="Période de réveil du planificateur (ms)")
+    parser.add_argument("--preset", default=DEFAULT_PRESET, choices=sorted(MAPPING_PRESETS),
+                        help="Préréglage de correspondance couleur → musique au démarrage")
+    parser.add_argument("--stats-interval", type=float, default=STATS_INTERVAL,
+                        help="Période d'affichage des statistiques (s), 0 pour désactiver")
+    parser.add_argument("--audio", choices=("puredata", "synth"), default="puredata",
+                        help="Backend audio : Pure Data (bundles OSC) ou synthétiseur intégré")
+    parser.add_argument("--audio-output", choices=("auto", "device", "wav", "null"), default="auto",
+                        help="Sortie du synthétiseur intégré (auto : carte son si présente)")
+    parser.add_argument("--wav-path", default="music_engine.wav", help="Fichier de sortie pour --audio-output wav")
+    parser.add_argument("--timing", choices=TIMING_MODES, default=None,
+                        help="Envoi des événements : à l'échéance (deadline, défaut pour Pure Data qui joue "
+                             "les bundles à leur arrivée) ou en avance avec timetag (défaut pour le synthétiseur)")
+    parser.add_argument("--block-size", type=int, default=BLOCK_SIZE, help="Taille des blocs audio (échantillons)")
+    parser.add_argument("--max-voices", type=int, default=MAX_VOICES, help="Polyphonie maximale du synthétiseur")
+    add_disc_argument(parser)
+    add_config_arguments(parser)
+    add_realtime_arguments(parser)
+    args = parser.parse_args()
+
+    # Charger la configuration réseau (validée : le routeur y est toujours présent)
+    config = config_from_args(parser, args)
+    realtime = realtime_from_args("music_engine", args, hot_loop=True)
+    # Couleurs lissées du disque suivi (/logic/<disque>/color/ema/*) si plusieurs disques
+    color_pattern = COLOR_PATTERN.replace("/logic", disc_prefix("logic", disc_from_args(parser, args, config)), 1)
     if 'music_engine' not in config['osc']:
-        print("Erreur: Configuration 'music_engine' non trouvée dans network.json")
-        sys.exit(1)
-        
-    music_engine_config = config['osc']['music_engine']
-    local_ip = music_engine_config['ip']
-    local_port = music_engine_config['port']
-    
-    # Récupérer la configuration du routeur OSC central
-    if 'router' not in config['osc']:
-        print("Erreur: Configuration 'router' non trouvée dans network.json")
-        print("Utilisation des valeurs par défaut pour le routeur OSC (127.0.0.1:5005)")
-        router_ip = "127.0.0.1"
-        router_port = 5005
-    else:
-        router_ip = config['osc']['router']['ip']
-        router_port = config['osc']['router']['port']
+        parser.error("Configuration 'music_engine' non trouvée dans network.json")
+    local_ip, local_port = osc_address(config, 'music_engine')
+    router_ip, router_port = osc_address(config, 'router')
+    STARTUP.mark("configuration")
     
     # Créer un client pour envoyer des messages au routeur OSC
     router_client = udp_client.SimpleUDPClient(router_ip, router_port)
     print(f"Connexion établie avec le routeur OSC sur {router_ip}:{router_port}")
     
+    # Moteur génératif et planificateur anticipé
+    mappings = MappingBank(default=args.preset)
+    mappings.preload()
+    STARTUP.mark("tables de correspondance")
+    engine = GenerativeEngine(bpm=args.bpm, mappings=mappings)
+    synth_backend = None
+    if args.audio == "synth":
+        # Import local : le synthétiseur NumPy n'est chargé que pour --audio synth
+        from lib.synth import BlockSynth, SynthBackend, format_synth_stats, open_audio_sink
+        synth = BlockSynth(block_size=args.block_size, max_voices=args.max_voices)
+        sink = open_audio_sink(args.audio_output, args.wav_path, block_size=args.block_size)
+        synth_backend = SynthBackend(synth, sink, realtime_mode=realtime)
+        send = synth_backend.send
+        print(f"Synthétiseur intégré: {type(sink).__name__}, blocs de {args.block_size} échantillons")
+    else:
+        send = make_bundle_sender(router_client)
+    # Le patch Pure Data ignore les timetags : les bundles lui sont envoyés à leur échéance
+    timing = args.timing or ("timetag" if args.audio == "synth" else "deadline")
+    scheduler = LookaheadScheduler(
+        engine,
+        send,
+        lookahead=args.lookahead_ms / 1000,
+        interval=args.interval_ms / 1000,
+        realtime=realtime,
+        send_at_deadline=timing == "deadline",
+    )
+    
     # Créer un dispatcher pour gérer les messages OSC
-    dispatcher = Dispatcher()
-    dispatcher.map("/event", handle_event)
+    dispatcher = PatternDispatcher()
+    for pattern in EVENT_PATTERNS:
+        dispatcher.map(pattern, handle_event)
+    dispatcher.map(color_pattern, engine.handle_color)
+    dispatcher.map(PRESET_ADDRESS, mappings.handle_preset)
     
     # Configurer et démarrer le serveur OSC local
     server = ThreadingOSCUDPServer((local_ip, local_port), dispatcher)
+    # Abonnement aux groupes multicast éventuels (section "multicast" de network.json)
+    start_multicast_listeners(config, 'music_engine', dispatcher)
     print(f"Moteur musical démarré sur {local_ip}:{local_port}")
-    print("En attente d'événements OSC sur l'adresse '/event'...")
+    print(f"En attente des couleurs sur {color_pattern} (tempo {args.bpm} BPM, envoi {timing})...")
     
-    # Boucle infinie pour recevoir les messages
-    server.serve_forever()
+    STARTUP.watch(dispatcher)
+    STARTUP.ready("serveur OSC")
+    realtime.startup_done()
+
+    # Réception des messages dans un thread, planification dans un autre
+    server_thread = threading.Thread(target=server.serve_forever, daemon=True)
+    server_thread.start()
+    if synth_backend is not None:
+        synth_backend.start()
+    scheduler.start()
+    
+    try:
+        while True:
+            if args.stats_interval > 0:
+                time.sleep(args.stats_interval)
+                print(f"Planification: {format_stats(scheduler.stats())}")
+                scheduler.reset_stats()
+                if synth_backend is not None:
+                    print(f"Synthèse: {format_synth_stats(synth_backend.stats())}")
+                    synth_backend.reset_stats()
+                realtime.print_stats()
+            else:
+                time.sleep(3600)
+    except KeyboardInterrupt:
+        print("\nArrêt du moteur musical")
+    finally:
+        scheduler.stop()
+        if synth_backend is not None:
+            synth_backend.stop()
+        server.shutdown()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
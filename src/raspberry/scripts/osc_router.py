@@ -1,26 +1,50 @@
 #!/usr/bin/env python3
 
-from pythonosc import udp_client, dispatcher, osc_server
-import json
 import argparse
-from threading import Thread
-import asyncio
-import os
+import sys
 from pathlib import Path
 
+# Ajout du dossier parent au path pour permettre l'importation de lib.osc_patterns
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+from lib.startup import StartupProfiler
+STARTUP = StartupProfiler("osc_router")
+
+from pythonosc import udp_client, osc_server, osc_bundle, osc_packet
+from lib.config import add_config_arguments, config_from_args, disc_configs, disc_prefix, load_config, osc_address
+from lib.osc_multicast import MulticastSender, build_message, load_groups
+from lib.osc_patterns import PatternDispatcher, RouteTable
+from lib.realtime import add_realtime_arguments, realtime_from_args
+STARTUP.mark("imports")
+
+class BundleRoutingDispatcher(PatternDispatcher):
+    """Dispatcher du routeur : les bundles OSC sont transmis intacts
+
+    Le timetag d'un bundle (événements planifiés par music_engine) doit arriver
+    tel quel au destinataire ; le dispatcher standard attendrait l'échéance puis
+    relaierait chaque message séparément, en perdant la précision temporelle.
+    """
+
+    def __init__(self, bundle_handler, **kwargs):
+        super().__init__(**kwargs)
+        self.bundle_handler = bundle_handler
+
+    def call_handlers_for_packet(self, data, client_address):
+        if osc_bundle.OscBundle.dgram_is_bundle(data):
+            self.bundle_handler(data)
+            return []
+        return super().call_handlers_for_packet(data, client_address)
+
 class OSCRouter:
-    def __init__(self):
-        # Chemin parent pour accéder à network.json
-        parent_dir = Path(__file__).resolve().parent.parent
-        network_config_path = os.path.join(parent_dir, 'network.json')
-        
-        # Chargement de la configuration
-        with open(network_config_path, 'r') as f:
-            self.config = json.load(f)
+    def __init__(self, verbose=False, config=None, realtime=None):
+        self.verbose = verbose
+        self.realtime = realtime
+
+        if config is None:
+            config = load_config()
+        self.config = config
         
         # Récupération de la configuration du router
-        self.router_ip = self.config['osc']['router']['ip']
-        self.router_port = self.config['osc']['router']['port']
+        self.router_ip, self.router_port = osc_address(self.config, 'router')
         
         # Création des clients OSC pour chaque destination
         self.clients = {}
@@ -33,8 +57,26 @@ class OSCRouter:
                 )
                 print(f"Client OSC configuré: {name} ({cfg['ip']}:{cfg['port']})")
 
+        # Groupes multicast optionnels : un seul envoi atteint tous les abonnés du groupe
+        self.multicast = {}
+        for name, cfg in load_groups(self.config).items():
+            sender = MulticastSender(name, cfg['group'], cfg['port'], cfg['ttl'], cfg['interface'])
+            self.multicast[name] = (sender, frozenset(cfg['members']))
+            print(f"Groupe multicast configuré: {name} ({cfg['group']}:{cfg['port']}) → {', '.join(cfg['members'])}")
+
+        # Modules miroirs : reçoivent aussi tout ce qui est envoyé au module qu'ils reflètent
+        self.mirrors = {name: cfg['mirror'] for name, cfg in self.config['osc'].items()
+                        if 'mirror' in cfg and name != 'router'}
+        for name, source in self.mirrors.items():
+            print(f"Miroir configuré: {name} reçoit les messages de {source}")
+
+        # Plans d'envoi (groupes multicast + clients unicast) mis en cache par liste de destinations
+        self.fanout_plans = {}
+
         # Table de routage hiérarchique des messages - simplifiée par module source
-        self.routes = {
+        # Les motifs OSC 1.0 sont acceptés : *, ?, [a-z], [!a-z], {foo,bar}
+        routes = self.disc_routes()
+        routes.update({
             # Routage par module source (notation avec / à la fin indique préfixe)
             "/vision/": ["logic", "led", "dev", "puredata"],     # Tous les messages vision vers logic, led et dev
             "/logic/": ["led", "puredata", "music_engine", "dev"],  # Messages logic vers LED, PD, music engine et dev
@@ -42,24 +84,47 @@ class OSCRouter:
             "/arduino/": ["logic", "puredata", "dev"],  # Messages arduino vers logic, PD et dev
             
             # Cas spécifiques qui surchargent les règles générales (optionnel)
+            "/arduino/motor/speed": ["logic", "puredata", "dev", "vision", "led"],  # Télémétrie moteur aussi vers vision (mode veille) et led (rotation de l'anneau)
+            "/logic/{motor,servo}/*": ["arduino", "dev"],  # Commandes moteur et servo vers le service série de l'Arduino
             #"/vision/color/raw/hsv": ["logic", "dev"],  # HSV vers logic et dev (surcharge du préfixe /vision/)
-        }
+            #"/vision/color/raw/{rgb,hsv}/*": ["logic", "dev"],  # Motif OSC (surcharge du préfixe /vision/)
+        })
+        self.routes = RouteTable(routes)
 
         # Configuration du serveur OSC local
-        self.dispatcher = dispatcher.Dispatcher()
+        self.dispatcher = BundleRoutingDispatcher(self.handle_bundle)
         self.setup_routes()
         
         # Création du serveur
-        self.server = osc_server.ThreadingOSCUDPServer(
+        # En mode temps réel, un seul thread critique route les datagrammes dans l'ordre
+        # d'arrivée, sans création de thread par message
+        server_class = (osc_server.BlockingOSCUDPServer if realtime is not None and realtime.active
+                        else osc_server.ThreadingOSCUDPServer)
+        self.server = server_class(
             (self.router_ip, self.router_port),  # Utilise les valeurs de la configuration
             self.dispatcher
         )
+        if realtime is not None:
+            realtime.watch_server(self.server, "routage")
         
         print(f"Router OSC configuré sur {self.router_ip}:{self.router_port}")
         print("Table de routage OSC configurée:")
         for address, destinations in self.routes.items():
             print(f"  {address} → {', '.join(destinations)}")
 
+    def disc_routes(self):
+        """Règles propres à chaque disque (section "discs" de network.json)
+
+        Un disque déclarant "destinations" n'envoie ses couleurs (/vision/<disque>/)
+        qu'à ces modules, par exemple son propre contrôleur LED. Ces préfixes sont
+        déclarés avant /vision/ : ils sont essayés en premier.
+        """
+        routes = {}
+        for disc in disc_configs(self.config):
+            if disc['destinations']:
+                routes[f"{disc_prefix('vision', disc['name'])}/"] = disc['destinations']
+        return routes
+
     def setup_routes(self):
         """Configure un handler générique pour toutes les adresses possibles"""
         # Configuration d'un handler par défaut qui traitera tous les messages
@@ -67,50 +132,112 @@ class OSCRouter:
         
     def handle_message(self, address, *args):
         """Handler qui route les messages selon le routage hiérarchique"""
-        # Essayer d'abord de trouver une correspondance exacte
-        if address in self.routes:
-            destinations = self.routes[address]
+        # Résolution mise en cache par adresse concrète (exacte, motif puis préfixe)
+        rule, destinations = self.routes.lookup(address)
+        if destinations is not None:
+            if self.verbose:
+                print(f"Message {address} routé par la règle {rule}")
             self._send_to_destinations(address, args, destinations)
             return
-            
-        # Si pas de correspondance exacte, essayer le matching par préfixe
-        for prefix, destinations in self.routes.items():
-            if prefix.endswith('/') and address.startswith(prefix):
-                # Extraire le module source du pattern d'adresse
-                parts = address.split('/')
-                if len(parts) > 1:
-                    source_module = parts[1]
-                    print(f"Message de {source_module} routé par préfixe {prefix}: {address}")
-                
-                self._send_to_destinations(address, args, destinations)
-                return
         
         # Aucune route trouvée, on utilise le comportement par défaut (broadcast)
         print(f"Aucune route configurée pour l'adresse: {address}")
         self._send_to_all_clients(address, args)
     
-    def _send_to_destinations(self, address, args, destinations):
-        """Méthode utilitaire pour envoyer un message aux destinations spécifiées"""
+    def _fanout_plan(self, destinations):
+        """Calcule les envois nécessaires pour une liste de destinations
+
+        Un groupe multicast est utilisé lorsque tous ses membres font partie des
+        destinations ; les destinations restantes sont servies en unicast. Les
+        miroirs des destinations sont ajoutés à la liste.
+        """
+        destinations = list(destinations) + [name for name, source in self.mirrors.items()
+                                             if source in destinations and name not in destinations]
+        remaining = set(destinations)
+        senders = []
+        for sender, members in self.multicast.values():
+            if members and members <= remaining:
+                senders.append(sender)
+                remaining -= members
+
+        unicast = []
         for dest in destinations:
+            if dest not in remaining:
+                continue
             if dest in self.clients:
-                self.clients[dest].send_message(address, args)
+                unicast.append(self.clients[dest])
             else:
                 print(f"Destination inconnue dans la table de routage: {dest}")
+        return tuple(senders), tuple(unicast)
+
+    def handle_bundle(self, data):
+        """Route un bundle OSC sans le décomposer (timetag préservé)
+
+        Les destinations sont l'union des routes des messages contenus.
+        """
+        try:
+            bundle = osc_bundle.OscBundle(data)
+            messages = osc_packet.OscPacket(data).messages
+        except (osc_bundle.ParseError, osc_packet.ParseError) as e:
+            print(f"Bundle OSC invalide ignoré: {e}")
+            return
+
+        destinations = []
+        for timed_msg in messages:
+            rule, dests = self.routes.lookup(timed_msg.message.address)
+            if dests is None:
+                dests = tuple(self.clients)
+            for dest in dests:
+                if dest not in destinations:
+                    destinations.append(dest)
+        if self.verbose:
+            print(f"Bundle de {len(messages)} message(s) routé vers {', '.join(destinations)}")
+        self._send_packet(bundle, tuple(destinations))
+
+    def _send_packet(self, packet, destinations):
+        """Envoie un message ou bundle OSC déjà construit aux destinations spécifiées"""
+        plan = self.fanout_plans.get(destinations)
+        if plan is None:
+            plan = self.fanout_plans[destinations] = self._fanout_plan(destinations)
+        senders, unicast = plan
+        for sender in senders:
+            sender.send(packet)
+        for client in unicast:
+            client.send(packet)
+
+    def _send_to_destinations(self, address, args, destinations):
+        """Méthode utilitaire pour envoyer un message aux destinations spécifiées"""
+        # Message construit une seule fois pour tous les envois
+        self._send_packet(build_message(address, args), destinations)
                 
     def _send_to_all_clients(self, address, args):
         """Méthode utilitaire pour diffuser un message à tous les clients"""
         print(f"Diffusion du message à tous les clients: {address}")
-        for client in self.clients.values():
-            client.send_message(address, args)
+        self._send_to_destinations(address, args, tuple(self.clients))
 
     def run(self):
         """Démarre le serveur OSC"""
         print("Démarrage du router OSC...")
         print(f"En écoute sur {self.server.server_address}")
+        if self.realtime is not None and self.realtime.active:
+            self.realtime.enter_hot_thread()
         self.server.serve_forever()
 
 def main():
-    router = OSCRouter()
+    parser = argparse.ArgumentParser(description="Routeur OSC central")
+    parser.add_argument("--verbose", action="store_true",
+                        help="Affiche la règle de routage utilisée pour chaque message")
+    add_config_arguments(parser)
+    add_realtime_arguments(parser)
+    args = parser.parse_args()
+    config = config_from_args(parser, args)
+    realtime = realtime_from_args("osc_router", args)
+    STARTUP.mark("configuration")
+
+    router = OSCRouter(verbose=args.verbose, config=config, realtime=realtime)
+    STARTUP.watch(router.dispatcher)
+    STARTUP.ready("clients et serveur OSC")
+    realtime.startup_done()
     router.run()
 
 if __name__ == "__main__":
@@ -0,0 +1,226 @@
+#!/usr/bin/env python3
+
+"""
+Enregistreur de session : la « partition » de chaque disque
+- Processus séparé, abonné à la sortie dev du routeur (module miroir "recorder" de network.json) :
+  l'enregistrement ne ralentit jamais le routeur ni les autres services
+- Un enregistrement par couleur analysée par vision : RGB/HSV bruts, valeurs lissées de logic,
+  vitesse du moteur, angle du servo, rotation estimée du disque et, en option, l'image
+  des secteurs du disque (--sectors)
+- Fichiers en colonnes mappés en mémoire (lib/score_file.py), rotation par taille ou par durée
+- Relecture d'une partition vers le routeur au rythme d'origine (--replay)
+"""
+
+import argparse
+import signal
+import sys
+import time
+from pathlib import Path
+
+# Ajout du dossier parent au path pour permettre l'importation de lib
+parent_dir = Path(__file__).resolve().parent.parent
+sys.path.append(str(parent_dir))
+from lib.startup import StartupProfiler
+STARTUP = StartupProfiler("recorder")
+
+import numpy as np
+from pythonosc import osc_server, udp_client
+from lib.config import BASE_DIR, add_config_arguments, add_disc_argument, config_from_args, disc_from_args, disc_prefix, osc_address
+from lib.constants import DISC_RPM
+from lib.osc_patterns import PatternDispatcher
+from lib.realtime import add_realtime_arguments, realtime_from_args
+from lib.score_file import RotatingScoreRecorder, ScoreFile, record_size, score_columns
+STARTUP.mark("imports")
+
+DEFAULT_OUTPUT_DIR = BASE_DIR / 'sessions'
+DEFAULT_MAX_MB = 64          # Taille maximale d'un fichier (rotation par taille)
+DEFAULT_ROTATE_MINUTES = 60  # Durée maximale d'un fichier (rotation par durée)
+STATS_INTERVAL = 60          # Période d'affichage des statistiques d'enregistrement (s)
+
+# Composantes reçues une à une ; la dernière composante HSV clôt une couleur de vision
+RGB_INDEX = {'r': 0, 'g': 1, 'b': 2}
+HSV_INDEX = {'h': 0, 's': 1, 'v': 2}
+LAST_COMPONENT = "/color/raw/hsv/v"
+
+
+class SessionRecorder:
+    """État courant du flux OSC, enregistré à chaque couleur complète de vision"""
+
+    def __init__(self, recorder, sectors=0, rpm=DISC_RPM, clock=time.time, disc=None):
+        self.recorder = recorder
+        self.disc = disc
+        self.rpm = rpm
+        self.clock = clock
+        self.rgb = np.zeros(3, dtype=np.uint8)
+        self.hsv = np.zeros(3, dtype=np.uint16)
+        self.ema_rgb = np.zeros(3, dtype=np.float32)
+        self.ema_hsv = np.zeros(3, dtype=np.float32)
+        self.motor_speed = 0
+        self.servo_angle = 0
+        self.running = True
+        # Rotation estimée comme dans SectorAnimation : le disque tourne à rpm tant que le moteur tourne
+        self.angle = 0.0
+        self.revolution = 0
+        self.__last_t = None
+        self.sectors = np.zeros((sectors, 3), dtype=np.uint8) if sectors else None
+        self.records = 0
+
+    def handle_rgb(self, address, value):
+        self.rgb[RGB_INDEX[address[-1]]] = max(0, min(255, int(value)))
+
+    def handle_hsv(self, address, value):
+        self.hsv[HSV_INDEX[address[-1]]] = max(0, int(value))
+        if address.endswith(LAST_COMPONENT):
+            self.record()
+
+    def handle_ema(self, address, value):
+        component = address[-1]
+        if component in RGB_INDEX:
+            self.ema_rgb[RGB_INDEX[component]] = value
+        else:
+            self.ema_hsv[HSV_INDEX[component]] = value
+
+    def handle_motor_speed(self, address, speed):
+        self.motor_speed = int(speed)
+        self.running = speed != 0
+
+    def handle_servo_angle(self, address, angle):
+        self.servo_angle = int(angle)
+
+    def advance(self, t):
+        """Met à jour la rotation estimée du disque jusqu'à l'instant t"""
+        if self.__last_t is not None and self.running:
+            turns = self.angle + (t - self.__last_t) * self.rpm / 60.0
+            self.revolution += int(turns)
+            self.angle = turns % 1.0
+        self.__last_t = t
+
+    def record(self):
+        t = self.clock()
+        self.advance(t)
+        row = {
+            't': t,
+            'rgb': self.rgb,
+            'hsv': self.hsv,
+            'ema_rgb': self.ema_rgb,
+            'ema_hsv': self.ema_hsv,
+            'motor_speed': self.motor_speed,
+            'servo_angle': self.servo_angle,
+            'angle': self.angle,
+            'revolution': self.revolution,
+        }
+        if self.sectors is not None:
+            # Secteur sous la caméra, même convention que SectorAnimation.set_color
+            sector = int(-self.angle % 1.0 * len(self.sectors)) % len(self.sectors)
+            self.sectors[sector] = self.rgb
+            row['sectors'] = self.sectors
+        self.recorder.append(row)
+        self.records += 1
+
+    def map(self, dispatcher):
+        vision, logic = disc_prefix("vision", self.disc), disc_prefix("logic", self.disc)
+        dispatcher.map(f"{vision}/color/raw/rgb/[rgb]", self.handle_rgb)
+        dispatcher.map(f"{vision}/color/raw/hsv/[hsv]", self.handle_hsv)
+        dispatcher.map(f"{logic}/color/ema/[rgbhsv]", self.handle_ema)
+        dispatcher.map("/arduino/motor/speed", self.handle_motor_speed)
+        dispatcher.map("/arduino/servo/angle", self.handle_servo_angle)
+
+
+def replay(path, client, speed=1.0):
+    """Renvoie une partition au routeur au rythme d'origine (speed : facteur d'accélération)"""
+    score = ScoreFile(path)
+    vision = disc_prefix("vision", score.meta.get('disc'))
+    print(f"Relecture de {path}: {len(score)} enregistrements, {len(score.revolution_ends())} tours complets")
+    if not len(score):
+        return
+    t, rgb, hsv, motor = score['t'], score['rgb'], score['hsv'], score['motor_speed']
+    start = time.monotonic()
+    last_speed = None
+    for i in range(len(score)):
+        delay = (t[i] - t[0]) / speed - (time.monotonic() - start)
+        if delay > 0:
+            time.sleep(delay)
+        if motor[i] != last_speed:
+            last_speed = int(motor[i])
+            client.send_message("/arduino/motor/speed", last_speed)
+        for c, value in zip("rgb", rgb[i].tolist()):
+            client.send_message(f"{vision}/color/raw/rgb/{c}", value)
+        for c, value in zip("hsv", hsv[i].tolist()):
+            client.send_message(f"{vision}/color/raw/hsv/{c}", value)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Enregistreur de session (partitions des disques)")
+    parser.add_argument("--output-dir", default=str(DEFAULT_OUTPUT_DIR), help="Dossier des partitions")
+    parser.add_argument("--max-mb", type=float, default=DEFAULT_MAX_MB,
+                        help="Taille maximale d'un fichier avant rotation (Mio)")
+    parser.add_argument("--rotate-minutes", type=float, default=DEFAULT_ROTATE_MINUTES,
+                        help="Durée maximale d'un fichier avant rotation (min, 0 : sans limite)")
+    parser.add_argument("--sectors", type=int, default=0,
+                        help="Enregistre l'image des N secteurs du disque (0 : désactivé)")
+    parser.add_argument("--rpm", type=float, default=DISC_RPM, help="Vitesse de rotation du disque (tours/min)")
+    parser.add_argument("--replay", metavar="FICHIER", help="Relit une partition vers le routeur au lieu d'enregistrer")
+    parser.add_argument("--speed", type=float, default=1.0, help="Facteur d'accélération de la relecture")
+    add_disc_argument(parser)
+    add_config_arguments(parser)
+    add_realtime_arguments(parser)
+    args = parser.parse_args()
+    config = config_from_args(parser, args)
+    disc = disc_from_args(parser, args, config)
+    realtime = realtime_from_args("recorder", args)
+    STARTUP.mark("configuration")
+
+    if args.replay:
+        client = udp_client.SimpleUDPClient(*osc_address(config, 'router'))
+        replay(args.replay, client, args.speed)
+        return
+
+    columns = score_columns(args.sectors)
+    capacity = max(1, int(args.max_mb * 2**20 / record_size(columns)))
+    recorder = RotatingScoreRecorder(
+        args.output_dir, columns, capacity,
+        max_age=args.rotate_minutes * 60 if args.rotate_minutes > 0 else None,
+        prefix=f"score-{disc}" if disc else "score",
+        meta={'sectors': args.sectors, 'rpm': args.rpm, 'disc': disc},
+    )
+    session = SessionRecorder(recorder, args.sectors, args.rpm, disc=disc)
+
+    dispatcher = PatternDispatcher()
+    session.map(dispatcher)
+    # Un seul thread de réception : les enregistrements sont ajoutés dans l'ordre d'arrivée
+    ip, port = osc_address(config, 'recorder')
+    server = osc_server.BlockingOSCUDPServer((ip, port), dispatcher)
+    server.timeout = 1.0
+    realtime.watch_server(server, "enregistrement", report_interval=0)
+    STARTUP.watch(dispatcher)
+    STARTUP.ready("fichier et serveur OSC")
+    realtime.startup_done()
+    print(f"Enregistreur démarré sur {ip}:{port} → {recorder.writer.path} "
+          f"({capacity} enregistrements de {record_size(columns)} octets par fichier)")
+
+    # Arrêt par systemd : les fichiers sont fermés proprement (bloc finally)
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+
+    if realtime.active:
+        realtime.enter_hot_thread()
+    last_stats = time.monotonic()
+    try:
+        while True:
+            server.handle_request()
+            if time.monotonic() - last_stats >= STATS_INTERVAL:
+                last_stats = time.monotonic()
+                print(f"Enregistreur: {session.records} enregistrements, {len(recorder.files)} fichier(s), "
+                      f"tour {session.revolution}, fichier courant {recorder.writer.path.name} "
+                      f"({recorder.writer.count}/{capacity})")
+                if recorder.stopped:
+                    print(f"Enregistreur: disque plein, {recorder.dropped} enregistrements perdus")
+                realtime.print_stats()
+    except KeyboardInterrupt:
+        print("\nArrêt de l'enregistreur")
+    finally:
+        server.server_close()
+        recorder.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,35 +1,286 @@
 #!/usr/bin/env python3
 
-import cv2
-import numpy as np
-from pythonosc import udp_client
+import os
+import threading
 import time
-import json
 import argparse
-import os
+import sys
 from pathlib import Path
 
+# Ajout du dossier parent au path pour permettre l'importation de lib
+# OpenCV et NumPy sont importés dans les fonctions qui les utilisent : les erreurs
+# d'arguments et de configuration sont signalées sans les charger
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+from lib.startup import StartupProfiler
+STARTUP = StartupProfiler("vision")
+
+from pythonosc import udp_client, osc_server
+from lib.config import ConfigError, add_config_arguments, add_disc_argument, disc_configs, disc_prefix, load_config, osc_address
+from lib.osc_patterns import PatternDispatcher
+from lib.realtime import add_realtime_arguments, realtime_from_args
+STARTUP.mark("imports")
+
+# Tailles des flux caméra
+MAIN_SIZE = (320, 240)      # Flux principal (aperçu de débogage et mode d'analyse "rgb")
+LORES_SIZE = (64, 48)       # Flux basse résolution analysé (mode "lores")
+FRAME_RATE = 15
+IDLE_FRAME_RATE = 5         # Cadence du capteur en veille
+
+# Cadence de capture adaptative (mode veille)
+ACTIVE_PERIOD = 0.15        # Période de capture active (s)
+IDLE_PERIOD = 1.0           # Période de capture en veille (s)
+IDLE_AFTER = 2.0            # Durée sans changement avant de ralentir (s)
+MOTION_THRESHOLD = 2.0      # Écart moyen (sur 255) entre frames réduites considéré comme un mouvement
+DIFF_SIZE = (16, 12)        # Taille de la frame réduite comparée
+MOTOR_SPEED_ADDRESS = "/arduino/motor/speed"
+STATS_INTERVAL = 30         # Période d'affichage des statistiques (s)
+SYNTHETIC_SECTORS = 12      # Caméra simulée (--synthetic) : secteurs colorés du disque
+SYNTHETIC_RPM = 33
+
+# Conversion YUV pleine échelle (BT.601 / JPEG, ColorSpace.Sycc) → RGB
+YUV_TO_RGB = (
+    (1.0, 0.0, 1.402),
+    (1.0, -0.344136, -0.714136),
+    (1.0, 1.772, 0.0),
+)
+
+def yuv420_planes(frame, width, height):
+    """Découpe un tableau YUV420 planaire (hauteur * 3/2 lignes) en plans Y, U, V
+
+    Format renvoyé par Picamera2.capture_array() : le plan Y, puis les plans U
+    et V sous-échantillonnés, chacun rangé sur hauteur/4 lignes de la largeur
+    du tampon (stride éventuellement supérieur à la largeur utile).
+    """
+    stride = frame.shape[1]
+    y = frame[:height, :width]
+    chroma = frame[height:height + height // 2]
+    u = chroma[:height // 4].reshape(height // 2, stride // 2)[:, :width // 2]
+    v = chroma[height // 4:].reshape(height // 2, stride // 2)[:, :width // 2]
+    return y, u, v
+
+def rgb_to_yuv420(rgb):
+    """Encode une frame RGB en YUV420 planaire pleine échelle (Sycc), comme le flux lores
+
+    COLOR_RGB2YUV_I420 d'OpenCV produit du BT.601 à échelle réduite (Y 16-235) :
+    décodé par YUV_TO_RGB, le noir deviendrait 16 et le blanc 235. La conversion
+    YCrCb d'OpenCV suit la matrice JPEG pleine échelle ; la chrominance est
+    ensuite sous-échantillonnée 2×2 et rangée comme dans Picamera2.capture_array().
+    """
+    import cv2
+    import numpy as np
+    height, width = rgb.shape[:2]
+    y, cr, cb = cv2.split(cv2.cvtColor(rgb, cv2.COLOR_RGB2YCrCb))
+    half = (width // 2, height // 2)
+    u = cv2.resize(cb, half, interpolation=cv2.INTER_AREA).reshape(height // 4, width)
+    v = cv2.resize(cr, half, interpolation=cv2.INTER_AREA).reshape(height // 4, width)
+    return np.vstack((y, u, v))
+
+def yuv_mean_to_rgb(y, u, v):
+    """Convertit une couleur YUV moyenne en RGB (une seule conversion par frame)"""
+    import numpy as np
+    u, v = u - 128.0, v - 128.0
+    rgb = np.array([ky * y + ku * u + kv * v for ky, ku, kv in YUV_TO_RGB], dtype=np.float32)
+    return np.clip(rgb, 0, 255)
+
+def color_messages(rgb, hsv, prefix="/vision"):
+    """Messages OSC envoyés pour une couleur analysée : (adresse, valeur entière)
+
+    Composantes envoyées individuellement (les envois de listes ont été
+    supprimés pour une meilleure compatibilité), RGB puis HSV. prefix vaut
+    /vision/<disque> quand plusieurs disques sont configurés.
+    """
+    r, g, b = map(int, rgb)
+    h, s, v = map(int, hsv)
+    return [
+        (f"{prefix}/color/raw/rgb/r", r),
+        (f"{prefix}/color/raw/rgb/g", g),
+        (f"{prefix}/color/raw/rgb/b", b),
+        (f"{prefix}/color/raw/hsv/h", h),
+        (f"{prefix}/color/raw/hsv/s", s),
+        (f"{prefix}/color/raw/hsv/v", v),
+    ]
+
+class MotionGate:
+    """Cadence de capture adaptative selon le mouvement de la scène et du moteur
+
+    Chaque frame est réduite à DIFF_SIZE et comparée à la dernière frame
+    analysée : tant que l'écart moyen reste sous le seuil, la scène est
+    statique et l'analyse couleur (et l'envoi OSC) est sautée. Sans changement
+    pendant idle_after secondes, ou dès que le moteur est à l'arrêt, la période
+    de capture double à chaque frame jusqu'à idle_period. Un changement de la
+    scène ou le redémarrage du moteur rétablit la période active dès la frame
+    suivante.
+    """
+
+    def __init__(self, active_period=ACTIVE_PERIOD, idle_period=IDLE_PERIOD,
+                 idle_after=IDLE_AFTER, threshold=MOTION_THRESHOLD, clock=time.monotonic):
+        self.active_period = active_period
+        self.idle_period = idle_period
+        self.idle_after = idle_after
+        self.threshold = threshold
+        self.clock = clock
+        self.period = active_period
+        self.reference = None
+        self.last_change = clock()
+        self.motor_speed = None  # None : pas de télémétrie moteur reçue
+        self.wakeup = threading.Event()
+        self.frames = 0
+        self.analysed = 0
+        self.wakeups = 0
+
+    @property
+    def idle(self):
+        """Vrai dès que la cadence est ralentie"""
+        return self.period > self.active_period
+
+    def reduce(self, frame):
+        """Frame réduite (niveaux de gris DIFF_SIZE) utilisée pour la comparaison"""
+        import cv2
+        small = cv2.resize(frame, DIFF_SIZE, interpolation=cv2.INTER_AREA)
+        if small.ndim == 3:
+            small = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+        return small
+
+    def update(self, frame):
+        """Compare la frame à la référence ; retourne True si elle doit être analysée"""
+        return self.update_reduced(self.reduce(frame))
+
+    def update_reduced(self, small):
+        """Comme update, pour une frame déjà réduite (analyse hors ligne)"""
+        import cv2
+        now = self.clock()
+        self.frames += 1
+        if self.reference is None or cv2.norm(small, self.reference, cv2.NORM_L1) / small.size > self.threshold:
+            # Changement : la frame devient la référence et la cadence active est rétablie
+            self.reference = small
+            self.last_change = now
+            self.period = self.active_period
+            self.analysed += 1
+            return True
+
+        if self.motor_speed == 0 or now - self.last_change >= self.idle_after:
+            self.period = min(self.period * 2, self.idle_period)
+        return False
+
+    def handle_motor_speed(self, address, speed):
+        """Handler OSC pour /arduino/motor/speed"""
+        previous = self.motor_speed
+        self.motor_speed = speed
+        if speed and not previous:
+            # Redémarrage du disque : retour immédiat à la cadence active
+            self.wake()
+
+    def wake(self):
+        """Force l'analyse de la prochaine frame et interrompt l'attente en cours"""
+        self.period = self.active_period
+        self.last_change = self.clock()
+        self.reference = None
+        self.wakeups += 1
+        self.wakeup.set()
+
+    def wait(self):
+        """Attend la prochaine capture (interrompue par un réveil)"""
+        self.wakeup.wait(self.period)
+        self.wakeup.clear()
+
+    def stats(self):
+        """Retourne les compteurs de capture"""
+        return {
+            'frames': self.frames,
+            'analysed': self.analysed,
+            'skipped': self.frames - self.analysed,
+            'wakeups': self.wakeups,
+        }
+
+class SyntheticCamera:
+    """Caméra simulée (essais de charge sans caméra) : disque à secteurs colorés
+
+    Même interface que Picamera2 pour capture_array, set_controls et stop.
+    capture_array renvoie la dernière frame du capteur simulé (cadence du
+    capteur respectée : attente si aucune nouvelle frame n'est disponible).
+    """
+
+    def __init__(self, seed=0):
+        import numpy as np
+        rng = np.random.default_rng(seed)
+        colors = rng.integers(0, 256, (SYNTHETIC_SECTORS, 3), dtype=np.uint8)
+        width, height = LORES_SIZE
+        # Flux lores pleine échelle (Sycc), comme celui du FAI : mêmes couleurs que le flux principal
+        self.lores = [rgb_to_yuv420(np.full((height, width, 3), c, np.uint8)) for c in colors]
+        width, height = MAIN_SIZE
+        self.main = [np.full((height, width, 3), c, np.uint8) for c in colors]
+        self.frame_rate = FRAME_RATE
+        self.start = time.monotonic()
+        self.last = -1
+
+    def capture_array(self, name="main"):
+        n = int((time.monotonic() - self.start) * self.frame_rate)
+        if n <= self.last:
+            n = self.last + 1
+            time.sleep(max(0.0, self.start + n / self.frame_rate - time.monotonic()))
+        self.last = n
+        sector = int(n / self.frame_rate * SYNTHETIC_RPM / 60 * SYNTHETIC_SECTORS) % SYNTHETIC_SECTORS
+        return (self.lores if name == "lores" else self.main)[sector]
+
+    def set_controls(self, controls):
+        if "FrameRate" in controls:
+            self.frame_rate = controls["FrameRate"]
+
+    def stop(self):
+        pass
+
 class ColorDetector:
-    def __init__(self):
+    def __init__(self, analysis="lores", preview=False, camera=True, camera_num=0, synthetic=False):
+        # analysis="lores" : statistiques sur le petit flux YUV420 du FAI (ISP)
+        # analysis="rgb"   : ancien mode, flux principal RGB888 320×240
+        # camera=False     : analyse de frames BGR fournies (vidéo enregistrée), sans caméra
+        # camera_num       : caméra du disque (plusieurs disques), synthetic : caméra simulée
+        self.analysis = analysis
+        self.preview = preview
+        self.camera_num = camera_num
+        self.synthetic = synthetic
         self.using_picamera2 = False
         self.picam2 = None
         self.cap = None
-        self.setup_camera()
+        self.lores_size = LORES_SIZE
+        if camera:
+            self.setup_camera()
 
     def setup_camera(self):
+        if self.synthetic:
+            # Mêmes formats que picamera2 (YUV420 en lores), sans caméra
+            self.picam2 = SyntheticCamera(seed=self.camera_num)
+            self.using_picamera2 = True
+            print(f"Caméra simulée {self.camera_num} (analyse {self.analysis})")
+            return
         try:
             # Try to use picamera2 (recommended for Raspberry Pi 5)
             from picamera2 import Picamera2 # type: ignore
             
             # Initialize the camera
-            self.picam2 = Picamera2()
+            self.picam2 = Picamera2(self.camera_num)
             
             # Configure the camera
-            config = self.picam2.create_preview_configuration(
-                main={"size": (320, 240), "format": "RGB888"},
-                controls={"FrameRate": 15}
-            )
+            if self.analysis == "lores":
+                import libcamera # type: ignore
+                # Le flux principal n'est jamais copié hors aperçu : on le garde
+                # au minimum (YUV420) et on n'analyse que le flux lores
+                main_format = "RGB888" if self.preview else "YUV420"
+                config = self.picam2.create_video_configuration(
+                    main={"size": MAIN_SIZE, "format": main_format},
+                    lores={"size": LORES_SIZE, "format": "YUV420"},
+                    colour_space=libcamera.ColorSpace.Sycc(),
+                    buffer_count=2,
+                    controls={"FrameRate": FRAME_RATE}
+                )
+            else:
+                config = self.picam2.create_preview_configuration(
+                    main={"size": MAIN_SIZE, "format": "RGB888"},
+                    controls={"FrameRate": FRAME_RATE}
+                )
             self.picam2.configure(config)
+            if self.analysis == "lores":
+                self.lores_size = tuple(self.picam2.camera_configuration()['lores']['size'])
             
             # Start the camera
             self.picam2.start()
@@ -37,58 +288,124 @@ class ColorDetector:
             # Set cap to None to indicate we're using picamera2
             self.cap = None
             self.using_picamera2 = True
-            print("Using picamera2 for camera capture")
+            print(f"Using picamera2 for camera capture (analyse {self.analysis})")
             
         except (ImportError, RuntimeError) as e:
             # Fallback to OpenCV if picamera2 is not available
+            import cv2
             print(f"Warning: {str(e)}")
             print("Falling back to OpenCV for camera capture")
-            gst_pipeline = "libcamerasrc ! video/x-raw,width=320,height=240,framerate=15/1 ! videoconvert ! video/x-raw,format=BGR ! appsink drop=true max-buffers=1 sync=false"
-            self.cap = cv2.VideoCapture(gst_pipeline, cv2.CAP_GSTREAMER)
             self.using_picamera2 = False
+
+            if self.camera_num:
+                # Caméras supplémentaires (disques suivants) : périphériques V4L2
+                self.cap = cv2.VideoCapture(self.camera_num)
+                if not self.cap.isOpened():
+                    raise RuntimeError(f"Impossible d'ouvrir la caméra {self.camera_num}")
+                return
             
-            if not self.cap.isOpened():
+            # En mode lores, la mise à l'échelle est faite avant videoconvert :
+            # la conversion de couleur ne traite que 64×48 pixels
+            width, height = LORES_SIZE if self.analysis == "lores" and not self.preview else MAIN_SIZE
+            pipelines = [
+                f"libcamerasrc ! video/x-raw,width={MAIN_SIZE[0]},height={MAIN_SIZE[1]},framerate={FRAME_RATE}/1 ! "
+                f"videoscale ! video/x-raw,width={width},height={height} ! "
+                "videoconvert ! video/x-raw,format=BGR ! appsink drop=true max-buffers=1 sync=false",
                 # Try a simpler pipeline as a last resort
-                print("Trying simpler pipeline...")
-                gst_pipeline = "libcamerasrc ! video/x-raw,width=320,height=240 ! videoconvert ! video/x-raw,format=BGR ! appsink"
+                f"libcamerasrc ! video/x-raw,width={MAIN_SIZE[0]},height={MAIN_SIZE[1]} ! videoconvert ! "
+                "video/x-raw,format=BGR ! appsink",
+            ]
+            for i, gst_pipeline in enumerate(pipelines):
+                if i > 0:
+                    print("Trying simpler pipeline...")
                 self.cap = cv2.VideoCapture(gst_pipeline, cv2.CAP_GSTREAMER)
-                
-                if not self.cap.isOpened():
-                    raise RuntimeError("Impossible d'initialiser la capture vidéo")
+                if self.cap.isOpened():
+                    break
+            else:
+                raise RuntimeError("Impossible d'initialiser la capture vidéo")
 
     def get_dominant_color(self, frame):
-        """Extrait la couleur dominante en RGB"""
-        frame = cv2.resize(frame, (10, 10), interpolation=cv2.INTER_AREA)
-        pixels = np.float32(frame.reshape(-1, 3))
-        criteria = (cv2.TERM_CRITERIA_EPS + cv2.TERM_CRITERIA_MAX_ITER, 5, 1.0)
-        _, _, palette = cv2.kmeans(pixels, 1, None, criteria, 1, cv2.KMEANS_RANDOM_CENTERS)
+        """Extrait la couleur dominante en RGB
+
+        Équivalent de l'ancien redimensionnement 10×10 (INTER_AREA) suivi d'un
+        kmeans à un seul cluster : le centre d'un unique cluster est la moyenne
+        des pixels, calculée ici directement sur toute la frame.
+        """
+        import cv2
+        import numpy as np
+        mean = np.asarray(cv2.mean(frame)[:3], dtype=np.float32)
         
         # Handle BGR vs RGB based on camera source
         if self.using_picamera2:
-            return palette[0]  # Already in RGB format
+            return mean  # Already in RGB format
         else:
-            return palette[0][::-1]  # BGR to RGB conversion
+            return mean[::-1]  # BGR to RGB conversion
+
+    def get_dominant_color_yuv(self, frame):
+        """Couleur dominante (RGB) calculée sur une frame YUV420 du flux lores
+
+        Les moyennes sont faites dans l'espace YUV ; seule la couleur finale
+        est convertie en RGB (conversion linéaire, donc même résultat que la
+        moyenne des pixels convertis).
+        """
+        import cv2
+        width, height = self.lores_size
+        y, u, v = yuv420_planes(frame, width, height)
+        return yuv_mean_to_rgb(cv2.mean(y)[0], cv2.mean(u)[0], cv2.mean(v)[0])
 
     def get_hsv(self, rgb):
         """Convertit RGB en HSV"""
+        import cv2
+        import numpy as np
         bgr = (rgb[2], rgb[1], rgb[0])
         color_pixel = np.uint8([[bgr]])
         return cv2.cvtColor(color_pixel, cv2.COLOR_BGR2HSV)[0][0]
 
-    def get_frame_colors(self):
-        """Capture une frame et retourne les couleurs RGB et HSV"""
+    def capture(self):
+        """Capture une frame brute (YUV420 lores, RGB ou BGR selon la source)"""
         if self.using_picamera2:
+            if self.analysis == "lores":
+                # Get the small YUV420 frame from picamera2
+                return self.picam2.capture_array("lores")
             # Get frame from picamera2
-            frame = self.picam2.capture_array()
+            return self.picam2.capture_array()
+        # Get frame from OpenCV
+        ret, frame = self.cap.read()
+        return frame if ret else None
+
+    def luma(self, frame):
+        """Vue de la frame utilisée pour la détection de mouvement (plan Y en lores)"""
+        if self.using_picamera2 and self.analysis == "lores":
+            width, height = self.lores_size
+            return frame[:height, :width]
+        return frame
+
+    def analyse(self, frame):
+        """Retourne les couleurs RGB et HSV d'une frame capturée"""
+        if self.using_picamera2 and self.analysis == "lores":
+            rgb = self.get_dominant_color_yuv(frame)
         else:
-            # Get frame from OpenCV
-            ret, frame = self.cap.read()
-            if not ret:
-                return None, None
+            rgb = self.get_dominant_color(frame)
+        return rgb, self.get_hsv(rgb)
+
+    def get_frame_colors(self):
+        """Capture une frame et retourne les couleurs RGB et HSV"""
+        frame = self.capture()
+        if frame is None:
+            return None, None
+        return self.analyse(frame)
 
-        rgb = self.get_dominant_color(frame)
-        hsv = self.get_hsv(rgb)
-        return rgb, hsv
+    def set_frame_rate(self, rate):
+        """Ajuste la cadence du capteur (picamera2 uniquement)"""
+        if self.using_picamera2:
+            self.picam2.set_controls({"FrameRate": rate})
+
+    def get_preview_frame(self):
+        """Frame pleine résolution (BGR) pour l'aperçu de débogage"""
+        if self.using_picamera2:
+            return self.picam2.capture_array("main")
+        ret, frame = self.cap.read()
+        return frame if ret else None
 
     def close(self):
         """Ferme proprement la capture vidéo"""
@@ -97,6 +414,99 @@ class ColorDetector:
         elif self.cap is not None:
             self.cap.release()
 
+def start_telemetry_server(ip, port, gates):
+    """Serveur OSC (thread) recevant la télémétrie moteur relayée par le routeur"""
+    dispatcher = PatternDispatcher()
+    for gate in gates:
+        dispatcher.map(MOTOR_SPEED_ADDRESS, gate.handle_motor_speed)
+    server = osc_server.ThreadingOSCUDPServer((ip, port), dispatcher)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    print(f"Écoute de la télémétrie moteur sur {ip}:{port}")
+    return server
+
+def pin_to_cpu(cpu, label):
+    """Fixe le thread appelant (et ceux qu'il crée ensuite) sur un cœur"""
+    try:
+        os.sched_setaffinity(0, {cpu})
+        print(f"{label}: fixé sur le cœur {cpu}")
+    except (AttributeError, OSError) as e:
+        print(f"{label}: impossible de fixer le cœur {cpu} ({e})")
+
+def capture_loop(detector, gate, osc_client, disc=None, preview=False, stop=None, realtime=None, report_gc=True):
+    """Boucle de capture d'un disque : analyse, envoi OSC et cadence adaptative
+
+    Un appel par disque (un thread chacun quand plusieurs disques sont
+    configurés) ; s'arrête quand l'événement stop est levé. Avec realtime,
+    le retard de réveil de chaque capture est mesuré (pauses du ramasse-miettes
+    affichées par la boucle report_gc).
+    """
+    label = f"Vision {disc}" if disc else "Vision"
+    prefix = disc_prefix("vision", disc)
+    lateness = realtime.histogram(f"réveil {label}") if realtime is not None else None
+    was_idle = False
+    idle_time = 0.0
+    last_stats = time.monotonic()
+    last_cpu = time.thread_time()
+    while stop is None or not stop.is_set():
+        frame = detector.capture()
+        if frame is not None and gate.update(detector.luma(frame)):
+            rgb, hsv = detector.analyse(frame)
+            for address, value in color_messages(rgb, hsv, prefix):
+                osc_client.send_message(address, value)
+
+        if preview:
+            frame = detector.get_preview_frame()
+            if frame is not None:
+                import cv2
+                cv2.imshow("vision", frame)
+                cv2.waitKey(1)
+
+        # Le capteur ralentit aussi en veille (moins de travail pour le FAI)
+        if gate.idle != was_idle:
+            was_idle = gate.idle
+            detector.set_frame_rate(IDLE_FRAME_RATE if was_idle else FRAME_RATE)
+            print(f"{label}: mode veille" if was_idle else f"{label}: reprise de la cadence active")
+
+        if realtime is not None:
+            # Collecte différée avant l'attente : la période entière est libre
+            realtime.maybe_collect(gate.period)
+        period = gate.period
+        start = time.monotonic()
+        gate.wait()  # 0.15 s en cadence active, jusqu'à IDLE_PERIOD en veille
+        waited = time.monotonic() - start
+        if was_idle:
+            idle_time += waited
+        if lateness is not None and waited >= period:
+            # Réveil à échéance (pas sur télémétrie) : retard sur la période demandée
+            lateness.record(waited - period)
+
+        now = time.monotonic()
+        if now - last_stats >= STATS_INTERVAL:
+            cpu = time.thread_time()
+            stats = gate.stats()
+            print(f"{label}: {stats['frames']} frames, {stats['analysed']} analysées, "
+                  f"{stats['skipped']} sautées, veille {idle_time / (now - last_stats):.0%}, "
+                  f"CPU {(cpu - last_cpu) / (now - last_stats):.1%}")
+            last_stats, last_cpu, idle_time = now, cpu, 0.0
+            if lateness is not None:
+                print(f"{label} gigue - {lateness.format()}")
+                lateness.reset()
+                if report_gc and realtime.gc_pauses.count:
+                    print(f"{label} gigue - {realtime.gc_pauses.format()}")
+                    realtime.gc_pauses.reset()
+
+def enter_capture_thread(disc, realtime):
+    """Début d'un thread de capture : cœur du disque et, en mode temps réel, priorité"""
+    if realtime is not None and realtime.active:
+        realtime.enter_hot_thread({disc['cpu']} if disc['cpu'] is not None else None)
+    elif disc['cpu'] is not None:
+        pin_to_cpu(disc['cpu'], f"Vision {disc['name']}")
+
+def run_disc(detector, gate, osc_client, disc, stop, realtime=None, report_gc=True):
+    """Thread d'un disque : fixé sur son cœur s'il est configuré"""
+    enter_capture_thread(disc, realtime)
+    capture_loop(detector, gate, osc_client, disc['name'], stop=stop, realtime=realtime, report_gc=report_gc)
+
 def main():
     # Parsing des arguments
     parser = argparse.ArgumentParser(description="Module de détection de couleurs")
@@ -104,24 +514,39 @@ def main():
     parser.add_argument("--router-port", type=int, default=5005, help="Port du routeur OSC")
     parser.add_argument("--config", action="store_true", 
                         help="Utiliser la configuration du fichier network.json")
+    parser.add_argument("--analysis", choices=("lores", "rgb"), default="lores",
+                        help="Analyse sur le flux YUV basse résolution (lores) ou sur le flux RGB 320×240")
+    parser.add_argument("--preview", action="store_true",
+                        help="Affiche l'aperçu de débogage (demande le flux principal pleine résolution)")
+    parser.add_argument("--telemetry-port", type=int, default=9004,
+                        help="Port d'écoute de la télémétrie moteur (0 : désactivé)")
+    parser.add_argument("--no-idle", action="store_true",
+                        help="Désactive la cadence adaptative (analyse et envoi à chaque frame)")
+    add_disc_argument(parser, help="Disque traité (section 'discs' de network.json, avec --config ; défaut : tous)")
+    parser.add_argument("--synthetic", action="store_true",
+                        help="Caméras simulées (disque à secteurs colorés) pour les essais sans caméra")
+    add_config_arguments(parser)
+    add_realtime_arguments(parser)
     args = parser.parse_args()
+    realtime = realtime_from_args("vision", args, hot_loop=True)
     
+    telemetry_ip = "127.0.0.1"
+    telemetry_port = args.telemetry_port
+    # Sans section "discs" : un seul disque, adresses /vision/color/...
+    discs = [{'name': None, 'camera': 0, 'cpu': None, 'destinations': []}]
+
     # Configuration OSC
     if args.config:
-        # Chemin parent pour accéder à network.json
-        parent_dir = Path(__file__).resolve().parent.parent
-        network_config_path = os.path.join(parent_dir, 'network.json')
-        
         try:
-            # Lire la configuration depuis le fichier
-            with open(network_config_path, 'r') as f:
-                config = json.load(f)
-                
-            # Utiliser la configuration du router depuis le fichier
-            router_ip = config['osc']['router']['ip']
-            router_port = config['osc']['router']['port']
+            # Configuration partagée (network.json, surcharges d'environnement et --osc)
+            config = load_config(args.network_config, args.osc)
+            router_ip, router_port = osc_address(config, 'router')
             print(f"Utilisation de la configuration réseau du routeur OSC central: {router_ip}:{router_port}")
-        except Exception as e:
+            if 'vision' in config['osc']:
+                telemetry_ip, telemetry_port = osc_address(config, 'vision')
+            if disc_configs(config):
+                discs = disc_configs(config)
+        except ConfigError as e:
             print(f"Erreur lors de la lecture de la configuration: {e}")
             print("Utilisation des valeurs par défaut pour le routeur OSC")
             router_ip = "127.0.0.1"
@@ -130,38 +555,65 @@ def main():
         # Utiliser les arguments ou les valeurs par défaut
         router_ip = args.router_ip
         router_port = args.router_port
+    if args.disc is not None:
+        # Un processus par disque : même sémantique et message d'erreur que disc_from_args
+        discs = [disc for disc in discs if disc['name'] == args.disc]
+        if not discs:
+            parser.error(f"disque inconnu dans la section 'discs' de network.json: {args.disc}")
+    if args.preview and len(discs) > 1:
+        parser.error("--preview n'est possible qu'avec un seul disque (--disc)")
     
     osc_client = udp_client.SimpleUDPClient(router_ip, router_port)
     print(f"Envoi des données couleur à {router_ip}:{router_port}")
+    STARTUP.mark("configuration")
 
-    detector = ColorDetector()
-
+    detectors = []
+    gates = []
     try:
-        while True:
-            rgb, hsv = detector.get_frame_colors()
-            if rgb is not None and hsv is not None:
-                # Conversion en entiers
-                r, g, b = map(int, rgb)
-                h, s, v = map(int, hsv)
-                
-                # Envoi individuel des composantes RGB
-                osc_client.send_message("/vision/color/raw/rgb/r", r)
-                osc_client.send_message("/vision/color/raw/rgb/g", g)
-                osc_client.send_message("/vision/color/raw/rgb/b", b)
-                
-                # Envoi individuel des composantes HSV
-                osc_client.send_message("/vision/color/raw/hsv/h", h)
-                osc_client.send_message("/vision/color/raw/hsv/s", s)
-                osc_client.send_message("/vision/color/raw/hsv/v", v)
-                
-                # Commentaire: les envois de listes ont été supprimés pour une meilleure compatibilité
-                
-            time.sleep(0.15)  # 10 Hz
+        for disc in discs:
+            detectors.append(ColorDetector(analysis=args.analysis, preview=args.preview,
+                                           camera_num=disc['camera'], synthetic=args.synthetic))
+            # Sans cadence adaptative, la période reste active et chaque frame est analysée
+            gates.append(MotionGate(idle_period=ACTIVE_PERIOD, threshold=-1) if args.no_idle else MotionGate())
+        STARTUP.mark("caméra")
+
+        # Un seul serveur de télémétrie : le moteur réveille tous les disques
+        if telemetry_port and not args.no_idle:
+            start_telemetry_server(telemetry_ip, telemetry_port, gates)
+        STARTUP.watch(osc_client, "send_message", "envoyé")
+        STARTUP.ready("télémétrie")
+        realtime.startup_done()
+
+        if len(discs) == 1:
+            enter_capture_thread(discs[0], realtime)
+            capture_loop(detectors[0], gates[0], osc_client, discs[0]['name'], args.preview, realtime=realtime)
+        else:
+            # Un thread par disque, chacun sur son cœur : l'analyse (OpenCV, NumPy) et
+            # les captures libèrent le GIL
+            stop = threading.Event()
+            threads = [
+                threading.Thread(target=run_disc, args=(detector, gate, osc_client, disc, stop, realtime, i == 0),
+                                 name=f"vision-{disc['name']}", daemon=True)
+                for i, (detector, gate, disc) in enumerate(zip(detectors, gates, discs))
+            ]
+            print(f"Vision: {len(discs)} disques ({', '.join(disc['name'] for disc in discs)})")
+            for thread in threads:
+                thread.start()
+            try:
+                while any(thread.is_alive() for thread in threads):
+                    threads[0].join(1.0)
+            finally:
+                stop.set()
+                for gate in gates:
+                    gate.wakeup.set()
+                for thread in threads:
+                    thread.join()
 
     except KeyboardInterrupt:
         print("\nArrêt de la capture")
     finally:
-        detector.close()
+        for detector in detectors:
+            detector.close()
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
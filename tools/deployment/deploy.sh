@@ -93,6 +93,7 @@ sshpass -p "${SSH_PASSWORD}" rsync -avz --exclude '.git/' \
            --exclude 'venv' \
            --exclude '.env' \
            --exclude 'logs' \
+           --exclude 'sessions' \
            -e "ssh ${SSH_OPTS}" \
            "${LOCAL_PATH}/src/raspberry/" \
            "${REMOTE_USER}@${REMOTE_HOST}:${REMOTE_PATH}/"
@@ -157,7 +158,7 @@ sshpass -p "${SSH_PASSWORD}" ssh ${SSH_OPTS} ${REMOTE_USER}@${REMOTE_HOST} "
     done
     
     # Restart all services except arduino_serial if Arduino upload wasn't requested
-    sudo systemctl restart osc_router.service vision.service logic.service puredata.service led_controller.service music_engine.service
+    sudo systemctl restart osc_router.service vision.service logic.service puredata.service led_controller.service music_engine.service recorder.service
     
     # Only restart arduino_serial service if Arduino upload was requested
     if [ \"$ARDUINO_UPLOAD\" -eq 1 ]; then